@@ -10,7 +10,11 @@ import os
 import json
 import yaml
 from datetime import datetime
+from analyzer.clients import get_router
+from analyzer.compaction import get_compactor, load_pipeline_keywords
 from analyzer.openai_analyzer import OpenAIAnalyzer
+from analyzer.resilience import get_resilient_caller
+from analyzer.response_cache import get_response_cache
 
 def load_config():
     """Load configuration from config file or use defaults"""
@@ -36,6 +40,9 @@ def create_default_config():
             'model': 'o1',  # Using the most advanced model available with free credits
             'api_key': None,  # Will prompt for this
         },
+        'cache': {
+            'path': 'data/llm_cache.sqlite'
+        },
         'scoring': {
             'seller_motivation_weight': 0.4,
             'transaction_complexity_weight': 0.3,
@@ -199,7 +206,16 @@ def main():
         # Create the OpenAI analyzer
         model = config['openai'].get('model', 'o1')
         print(f"\nUsing OpenAI model: {model} (most advanced model available)")
-        analyzer = OpenAIAnalyzer(api_key=api_key, model=model)
+        router_config = config.get('router', {})
+        analyzer = OpenAIAnalyzer(
+            api_key=api_key,
+            model=model,
+            cache=get_response_cache(config.get('cache')),
+            compactor=get_compactor(config.get('compaction'), load_pipeline_keywords()),
+            router=get_router(api_key, router_config) if model == "auto" else None,
+            min_quality=router_config.get('min_quality'),
+            resilience=get_resilient_caller(config.get('resilience'))
+        )
         
         # Ask if user wants to use sample or paste their own
         use_sample = input("\nDo you want to use the sample listing? (y/n): ").strip().lower() == 'y'
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+OpenAI Client Module
+
+This module keeps one pooled OpenAI client per API key for the whole
+process, so repeated analyses reuse warm keep-alive connections, and
+provides a router that sends each request to the fastest healthy model
+meeting a quality tier, based on rolling latency and error statistics.
+"""
+
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from analyzer.resilience import CallFailedError, CircuitOpenError
+logger = logging.getLogger(__name__)
+
+# Connection pool settings for the shared clients
+POOL_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120)
+REQUEST_TIMEOUT = httpx.Timeout(600, connect=10)
+
+# Per-model quality tier (higher is better) and request parameter differences:
+# reasoning models take max_completion_tokens and no temperature, and some
+# accept instructions only as developer messages or not at all
+MODEL_PROFILES = {
+    'o1': {'quality': 3, 'reasoning': True, 'instruction_role': 'developer', 'response_format': True},
+    'o1-mini': {'quality': 2, 'reasoning': True, 'instruction_role': None, 'response_format': False},
+    'o3-mini': {'quality': 2, 'reasoning': True, 'instruction_role': 'developer', 'response_format': True},
+    'gpt-4o': {'quality': 2, 'reasoning': False, 'instruction_role': 'system', 'response_format': True},
+    'gpt-4o-mini': {'quality': 1, 'reasoning': False, 'instruction_role': 'system', 'response_format': True}
+}
+
+# Profile assumed for models not listed above
+DEFAULT_PROFILE = {'quality': 1, 'reasoning': False, 'instruction_role': 'system', 'response_format': True}
+
+_clients = {}
+_async_clients = {}
+_routers = {}
+_registry_lock = threading.Lock()
+
+# httpx transports used by new clients instead of the network, e.g. the
+# recording and replaying transports in utils.replay
+_transports = {'sync': None, 'async': None}
+
+def set_transports(transport=None, async_transport=None):
+    """
+    Route the HTTP traffic of clients created from now on through transports.
+
+    Shared clients created earlier are dropped so they are rebuilt with the
+    new transports.
+
+    Args:
+        transport (httpx.BaseTransport, optional): Transport for synchronous
+            clients; None uses the network
+        async_transport (httpx.AsyncBaseTransport, optional): Transport for
+            asynchronous clients; None uses the network
+    """
+    with _registry_lock:
+        _transports['sync'] = transport
+        _transports['async'] = async_transport
+        _clients.clear()
+        _async_clients.clear()
+        _routers.clear()
+
+def get_client(api_key=None):
+    """
+    Get the process-wide OpenAI client for an API key.
+
+    Args:
+        api_key (str, optional): OpenAI API key. If not provided, the client
+            reads the OPENAI_API_KEY environment variable
+
+    Returns:
+        OpenAI: Client with a keep-alive connection pool shared by every caller
+    """
+    with _registry_lock:
+        if api_key not in _clients:
+            _clients[api_key] = OpenAI(
+                api_key=api_key,
+                http_client=httpx.Client(limits=POOL_LIMITS, timeout=REQUEST_TIMEOUT, transport=_transports['sync'])
+            )
+            logger.info("Created pooled OpenAI client")
+        return _clients[api_key]
+
+def get_async_client(api_key=None):
+    """
+    Get the process-wide AsyncOpenAI client for an API key.
+
+    Async clients are bound to the event loop they are first used in, so the
+    shared client must only be used on analyzer.rate_limit's shared loop.
+
+    Args:
+        api_key (str, optional): OpenAI API key
+
+    Returns:
+        AsyncOpenAI: Client shared by every batch and thread
+    """
+    with _registry_lock:
+        if api_key not in _async_clients:
+            _async_clients[api_key] = create_async_client(api_key)
+            logger.info("Created pooled AsyncOpenAI client")
+        return _async_clients[api_key]
+
+def create_async_client(api_key=None, max_retries=0):
+    """
+    Create an AsyncOpenAI client.
+
+    Async clients are bound to the event loop they are first used in. Calls
+    on the shared loop in analyzer.rate_limit use get_async_client instead;
+    a new client is only for code running a loop of its own.
+
+    Args:
+        api_key (str, optional): OpenAI API key
+        max_retries (int): Retries made by the client itself
+
+    Returns:
+        AsyncOpenAI: New client, using the configured async transport if any
+    """
+    if _transports['async'] is None:
+        return AsyncOpenAI(api_key=api_key, max_retries=max_retries)
+    return AsyncOpenAI(
+        api_key=api_key,
+        max_retries=max_retries,
+        http_client=httpx.AsyncClient(limits=POOL_LIMITS, timeout=REQUEST_TIMEOUT, transport=_transports['async'])
+    )
+
+def get_profile(model):
+    """
+    Get the quality tier and parameter profile of a model.
+
+    Args:
+        model (str): Model name
+
+    Returns:
+        dict: Model profile
+    """
+    return MODEL_PROFILES.get(model, DEFAULT_PROFILE)
+
+def adapt_params(params, model=None):
+    """
+    Adapt chat completion parameters to what a model accepts.
+
+    Args:
+        params (dict): Chat completion parameters
+        model (str, optional): Target model. Defaults to params['model']
+
+    Returns:
+        dict: New parameters for the model
+    """
+    model = model or params['model']
+    profile = get_profile(model)
+    adapted = dict(params, model=model)
+
+    if profile['reasoning']:
+        # Reasoning models only support the default temperature
+        adapted.pop('temperature', None)
+        if 'max_tokens' in adapted:
+            adapted['max_completion_tokens'] = adapted.pop('max_tokens')
+
+    if not profile['response_format']:
+        adapted.pop('response_format', None)
+
+    messages = []
+    instructions = []
+    for message in params['messages']:
+        if message['role'] not in ('system', 'developer'):
+            messages.append(message)
+        elif profile['instruction_role'] is None:
+            instructions.append(message['content'])
+        else:
+            messages.append(dict(message, role=profile['instruction_role']))
+
+    # Without an instruction role, instructions lead the first user message
+    if instructions:
+        for index, message in enumerate(messages):
+            if message['role'] == 'user':
+                messages[index] = dict(message, content="\n\n".join(instructions + [message['content']]))
+                break
+
+    adapted['messages'] = messages
+    return adapted
+
+
+class ModelRouter:
+    """
+    Latency- and health-aware choice between models.
+
+    Keeps a time-bounded window of (latency, success) samples per model.
+    Models whose error rate in the window exceeds max_error_rate are
+    skipped until their failures age out; among the healthy models meeting
+    the quality tier the one with the lowest tail (p95) latency is chosen.
+    A model's last measured latency is kept after its samples expire, and
+    models without recent samples are measured with a small share of
+    requests instead of being tried first.
+    """
+
+    def __init__(self, client, models=None, min_quality=1, window_seconds=300, window_size=200,
+                 max_error_rate=0.5, min_samples=3, probe_fraction=0.05):
+        """
+        Initialize the router.
+
+        Args:
+            client (OpenAI): Client used for requests
+            models (list, optional): Candidate models in order of preference
+                for untried models. Defaults to every model in MODEL_PROFILES
+            min_quality (int): Default minimum quality tier
+            window_seconds (float): Age after which samples are dropped
+            window_size (int): Maximum samples kept per model
+            max_error_rate (float): Error rate above which a model is unhealthy
+            min_samples (int): Samples needed before a model can be judged unhealthy
+            probe_fraction (float): Share of requests sent first to a model
+                without recent samples, to measure it
+        """
+        self.client = client
+        self.models = list(models or MODEL_PROFILES)
+        self.min_quality = min_quality
+        self.window_seconds = window_seconds
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.probe_fraction = probe_fraction
+
+        self._samples = {model: deque(maxlen=window_size) for model in self.models}
+        # p95 latency and time of the last window with successes, kept after samples expire
+        self._last_latency = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, latency, success):
+        """
+        Record the outcome of one request.
+
+        Args:
+            model (str): Model used
+            latency (float): Request duration in seconds
+            success (bool): Whether the request succeeded
+        """
+        with self._lock:
+            self._samples.setdefault(model, deque(maxlen=self.window_size)).append((time.monotonic(), latency, success))
+
+    def stats(self, model):
+        """
+        Rolling statistics for a model.
+
+        Args:
+            model (str): Model name
+
+        Returns:
+            dict: count, error_rate, p50 and p95 latency in seconds (None without
+                successes), and last_p95, the p95 of the latest window with successes
+                (kept after the samples expire; None if the model was never measured)
+        """
+        now = time.monotonic()
+        cutoff = now - self.window_seconds
+        with self._lock:
+            samples = self._samples.get(model, deque())
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            recent = list(samples)
+
+        latencies = sorted(latency for _, latency, success in recent if success)
+        errors = sum(1 for _, _, success in recent if not success)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        p95 = percentile(0.95)
+        with self._lock:
+            if p95 is not None:
+                self._last_latency[model] = (p95, now)
+            last_p95, _ = self._last_latency.get(model, (None, None))
+
+        return {
+            'count': len(recent),
+            'error_rate': errors / len(recent) if recent else 0.0,
+            'p50': percentile(0.5),
+            'p95': p95,
+            'last_p95': last_p95
+        }
+
+    def is_healthy(self, stats):
+        """Check a model's statistics against the error rate limit."""
+        if stats['count'] and stats['p50'] is None:
+            # Every recent request failed
+            return False
+        return stats['count'] < self.min_samples or stats['error_rate'] <= self.max_error_rate
+
+    def rank(self, min_quality=None):
+        """
+        Order the candidate models meeting a quality tier.
+
+        Healthy models come first by p95 latency, using the last known p95
+        for models whose samples have expired; then models never measured,
+        in configured order; then unhealthy models by error rate as a last
+        resort. With probability probe_fraction a model without recent
+        samples is moved to the front so its latency is measured again. With
+        no measurements at all, models are tried in configured order.
+
+        Args:
+            min_quality (int, optional): Minimum quality tier. Defaults to the router's
+
+        Returns:
+            list: Model names in the order they should be tried
+        """
+        min_quality = self.min_quality if min_quality is None else min_quality
+
+        measured = []
+        untried = []
+        unhealthy = []
+        unsampled = []
+        for position, model in enumerate(self.models):
+            if get_profile(model)['quality'] < min_quality:
+                continue
+            stats = self.stats(model)
+            if stats['count'] == 0:
+                unsampled.append(model)
+                if stats['last_p95'] is None:
+                    untried.append(model)
+                else:
+                    measured.append((stats['last_p95'], position, model))
+            elif not self.is_healthy(stats):
+                unhealthy.append((stats['error_rate'], position, model))
+            else:
+                latency = stats['p95'] if stats['p95'] is not None else stats['last_p95']
+                if latency is None:
+                    untried.append(model)
+                else:
+                    measured.append((latency, position, model))
+
+        ranked = [model for _, _, model in sorted(measured)] + untried + [model for _, _, model in sorted(unhealthy)]
+        if unsampled and ranked[0] not in unsampled and random.random() < self.probe_fraction:
+            probe = random.choice(unsampled)
+            logger.debug(f"Probing {probe}, which has no recent latency samples")
+            ranked.remove(probe)
+            ranked.insert(0, probe)
+        return ranked
+
+    def complete(self, params, min_quality=None, caller=None):
+        """
+        Send a chat completion to the best model, falling back to the next
+        candidates on errors.
+
+        Args:
+            params (dict): Chat completion parameters; the model is replaced
+            min_quality (int, optional): Minimum quality tier
+            caller (ResilientCaller, optional): Runs each model's call with
+                retries, circuit breaking and hedging
+
+        Returns:
+            tuple: (response, model used, attempt records)
+
+        Raises:
+            CallFailedError: If every candidate failed; holds the attempts
+        """
+        candidates = self.rank(min_quality)
+        if not candidates:
+            raise ValueError(f"No configured model meets quality tier {min_quality}")
+
+        attempts = []
+        last_error = None
+        for model in candidates:
+            model_params = adapt_params(params, model)
+            started = time.monotonic()
+            try:
+                if caller:
+                    response, model_attempts = caller.call(
+                        model, lambda: self.client.with_options(max_retries=0).chat.completions.create(**model_params)
+                    )
+                else:
+                    response = self.client.chat.completions.create(**model_params)
+                    model_attempts = []
+            except CircuitOpenError as e:
+                logger.info(f"Skipping {model}: {e}")
+                last_error = e
+                continue
+            except Exception as e:
+                if isinstance(e, CallFailedError):
+                    attempts.extend(e.attempts)
+                    e = e.last_error
+                self.record(model, time.monotonic() - started, False)
+                logger.warning(f"Request to {model} failed, trying the next model: {e}")
+                last_error = e
+                continue
+
+            attempts.extend(model_attempts)
+            self.record(model, time.monotonic() - started, True)
+            return response, model, attempts
+
+        raise CallFailedError(last_error, attempts)
+
+
+def get_router(api_key=None, router_config=None):
+    """
+    Get the process-wide model router for an API key.
+
+    Args:
+        api_key (str, optional): OpenAI API key
+        router_config (dict, optional): Router configuration with 'models',
+            'min_quality', 'window_seconds', 'max_error_rate' and 'probe_fraction'
+
+    Returns:
+        ModelRouter: Router shared by every caller with the same key
+    """
+    router_config = router_config or {}
+    client = get_client(api_key)
+
+    with _registry_lock:
+        if api_key not in _routers:
+            _routers[api_key] = ModelRouter(
+                client,
+                models=router_config.get('models'),
+                min_quality=router_config.get('min_quality', 1),
+                window_seconds=router_config.get('window_seconds', 300),
+                max_error_rate=router_config.get('max_error_rate', 0.5),
+                probe_fraction=router_config.get('probe_fraction', 0.05)
+            )
+        return _routers[api_key]
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Description Compaction Module
+
+This module shortens long broker descriptions before they are sent to a
+language model. Descriptions are split into sentences, each sentence is
+scored by the keywords and contextual clues it contains, and the
+highest-signal sentences are kept, in their original order, up to a token
+budget counted with a local tokenizer.
+"""
+
+import os
+import re
+import logging
+from functools import lru_cache
+
+import yaml
+
+from analyzer.rate_limit import CHARS_PER_TOKEN, estimate_tokens
+from analyzer.simple_nlp import get_scanner
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Sentence ends, line breaks and bullet markers
+SENTENCE_BOUNDARY = re.compile(r'\s*\n+\s*(?:[-*•]\s*)?|(?<=[.!?])\s+')
+
+# Pipeline configuration files holding the nlp keywords, in order of preference
+PIPELINE_CONFIG_PATHS = ('config/config.yaml', 'config/config.example.yaml')
+
+@lru_cache(maxsize=8)
+def get_encoding(encoding_name):
+    """
+    Load a tiktoken encoding.
+
+    Args:
+        encoding_name (str): Encoding name, e.g. 'o200k_base'
+
+    Returns:
+        tiktoken.Encoding: The encoding, or None if tiktoken or its data is unavailable
+    """
+    if tiktoken is None:
+        logger.warning("tiktoken not installed, estimating token counts from text length")
+        return None
+
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding {encoding_name}, estimating token counts: {e}")
+        return None
+
+def load_pipeline_keywords(paths=PIPELINE_CONFIG_PATHS):
+    """
+    Load the nlp keywords of the pipeline configuration, so entry points with
+    their own configuration compact descriptions the same way the pipeline
+    does (and so send, and cache, the same requests).
+
+    Args:
+        paths (tuple): Configuration files to try, in order
+
+    Returns:
+        dict: Dictionary of keywords by category, or None if no file has any
+    """
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, 'r') as file:
+                config = yaml.safe_load(file) or {}
+        except Exception as e:
+            logger.warning(f"Could not read keywords from {path}: {e}")
+            continue
+        keywords = (config.get('nlp') or {}).get('keywords')
+        if keywords:
+            return keywords
+    return None
+
+def split_sentences(text):
+    """
+    Split a description into sentences and list items.
+
+    Args:
+        text (str): Description text
+
+    Returns:
+        list: Non-empty sentences in order
+    """
+    return [sentence.strip() for sentence in SENTENCE_BOUNDARY.split(text) if sentence and sentence.strip()]
+
+
+class DescriptionCompactor:
+    """
+    Keeps the highest-signal sentences of a description within a token budget.
+    """
+
+    def __init__(self, keywords=None, token_budget=600, encoding_name='o200k_base'):
+        """
+        Initialize the compactor.
+
+        Args:
+            keywords (dict, optional): Dictionary of keywords by category
+            token_budget (int): Maximum tokens of description to keep
+            encoding_name (str): tiktoken encoding used to count tokens
+        """
+        self.scanner = get_scanner(keywords or {})
+        self.token_budget = token_budget
+        self.encoding = get_encoding(encoding_name)
+
+    def count_tokens(self, text):
+        """
+        Count the tokens in a piece of text.
+
+        Args:
+            text (str): Text to measure
+
+        Returns:
+            int: Token count (estimated when no tokenizer is available)
+        """
+        if self.encoding is None:
+            return estimate_tokens(text)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text, tokens):
+        """
+        Cut text down to its first tokens.
+
+        Args:
+            text (str): Text to cut
+            tokens (int): Tokens to keep
+
+        Returns:
+            str: Leading part of the text within the token count
+        """
+        if self.encoding is None:
+            # Inverse of estimate_tokens
+            return text[:max(tokens - 1, 0) * CHARS_PER_TOKEN]
+        return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:tokens])
+
+    def score_sentence(self, sentence):
+        """
+        Score a sentence by the keywords and clues it contains.
+
+        Args:
+            sentence (str): Sentence text
+
+        Returns:
+            int: Number of distinct keywords and clues found
+        """
+        hits = self.scanner.scan(sentence.lower())
+        return len(hits['keywords']) + len(hits['clues'])
+
+    def compact(self, text):
+        """
+        Compact a description to the token budget.
+
+        Sentences with keyword or clue hits are kept first (highest score
+        first, earlier sentences breaking ties), then the earliest remaining
+        sentences fill whatever budget is left. Descriptions already within
+        the budget are returned unchanged. When no sentence fits on its own,
+        e.g. a description without sentence breaks, the highest-scoring one
+        is cut to the budget, so the result is never empty.
+
+        Args:
+            text (str): Description text
+
+        Returns:
+            tuple: (compacted text, stats dict with original_tokens,
+                compacted_tokens, tokens_saved, sentences_kept, sentences_total)
+        """
+        original_tokens = self.count_tokens(text)
+        sentences = split_sentences(text)
+
+        if original_tokens <= self.token_budget:
+            return text, {
+                'original_tokens': original_tokens,
+                'compacted_tokens': original_tokens,
+                'tokens_saved': 0,
+                'sentences_kept': len(sentences),
+                'sentences_total': len(sentences)
+            }
+
+        scored = [
+            (self.score_sentence(sentence), index, self.count_tokens(sentence))
+            for index, sentence in enumerate(sentences)
+        ]
+        ranked = sorted(scored, key=lambda item: (-item[0], item[1]))
+
+        kept = []
+        used = 0
+        for score, index, tokens in ranked:
+            # Separating spaces are absorbed into the neighboring tokens
+            if used + tokens <= self.token_budget:
+                kept.append(index)
+                used += tokens
+
+        if kept:
+            compacted = " ".join(sentences[index] for index in sorted(kept))
+        else:
+            compacted = self.truncate(sentences[ranked[0][1]], self.token_budget).strip() if ranked else ''
+            if not compacted:
+                # Nothing useful survives the cut; send the description as is
+                compacted = text
+            kept = [ranked[0][1]] if ranked else []
+        compacted_tokens = self.count_tokens(compacted)
+
+        return compacted, {
+            'original_tokens': original_tokens,
+            'compacted_tokens': compacted_tokens,
+            'tokens_saved': original_tokens - compacted_tokens,
+            'sentences_kept': len(kept),
+            'sentences_total': len(sentences)
+        }
+
+
+def get_compactor(compaction_config, keywords=None):
+    """
+    Create a compactor from configuration.
+
+    Args:
+        compaction_config (dict): Compaction configuration with 'enabled',
+            'token_budget' and 'encoding'
+        keywords (dict, optional): Dictionary of keywords by category
+
+    Returns:
+        DescriptionCompactor: Compactor, or None if compaction is disabled
+    """
+    if not compaction_config or not compaction_config.get('enabled', True):
+        return None
+
+    return DescriptionCompactor(
+        keywords,
+        token_budget=compaction_config.get('token_budget', 600),
+        encoding_name=compaction_config.get('encoding', 'o200k_base')
+    )
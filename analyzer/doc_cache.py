@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+spaCy Document Cache Module
+
+This module provides an on-disk cache of parsed spaCy documents so that
+descriptions seen in earlier runs (the same scraped snapshot, re-posted
+listings) are not parsed again. Every cache on the same directory in a
+process shares one LRU index, so analysis workers see each other's entries
+and the size bound applies to the directory as a whole.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from spacy.tokens import DocBin
+
+logger = logging.getLogger(__name__)
+
+# LRU indexes shared by every DocCache, keyed by real cache directory path
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def normalize_text(text):
+    """
+    Normalize description text for cache keys.
+
+    Args:
+        text (str): Description text
+
+    Returns:
+        str: Text with whitespace runs collapsed to single spaces
+    """
+    return " ".join(text.split())
+
+
+class DocCacheIndex:
+    """
+    LRU index of the entries in one cache directory.
+
+    Holds each entry's size, least recently used first, for every DocCache
+    on the directory; lock guards the entries and their total size.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Initialize the index from the entries already on disk.
+
+        Args:
+            cache_dir (str): Directory for cached entries
+        """
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.lock = threading.RLock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.spacy'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, filename))
+            except OSError:
+                # Evicted by another run while listing
+                continue
+            entries.append((stat.st_mtime, filename[:-len('.spacy')], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self.entries[key] = size
+            self.total_bytes += size
+
+        logger.info(f"Loaded spaCy doc cache index with {len(self.entries)} entries from {self.cache_dir}")
+
+    def touch(self, key, size):
+        """Record an entry as most recently used."""
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(key, 0)
+            self.entries[key] = size
+
+    def discard(self, key):
+        """Forget an entry."""
+        with self.lock:
+            self.total_bytes -= self.entries.pop(key, 0)
+
+
+def get_doc_cache_index(cache_dir):
+    """
+    Get the process-wide LRU index of a cache directory.
+
+    Args:
+        cache_dir (str): Directory for cached entries
+
+    Returns:
+        DocCacheIndex: Index shared by every DocCache on the directory
+    """
+    path = os.path.realpath(cache_dir)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = DocCacheIndex(cache_dir)
+        return _indexes[path]
+
+
+class DocCache:
+    """
+    Size-bounded LRU cache of serialized spaCy DocBin entries on disk.
+
+    Entries are keyed by a hash of the normalized text together with the
+    model name, version and active pipeline components, so changing the model
+    never returns stale parses. Recency is tracked with file modification
+    times, which lets the LRU order survive between runs, and in an index
+    shared by every cache on the directory.
+    """
+
+    def __init__(self, cache_dir, nlp, max_size_mb=512):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir (str): Directory for cached entries
+            nlp (spacy.Language): Pipeline whose Docs are cached
+            max_size_mb (float): Maximum total size of cached entries in megabytes
+        """
+        self.cache_dir = cache_dir
+        self.nlp = nlp
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+
+        meta = nlp.meta
+        self.model_key = "|".join([
+            f"{meta.get('lang', '')}_{meta.get('name', '')}",
+            meta.get('version', ''),
+            ",".join(nlp.pipe_names)
+        ])
+
+        self.hits = 0
+        self.misses = 0
+
+        # Shared with the caches of other analysis workers on the same directory
+        self.index = get_doc_cache_index(cache_dir)
+
+    def key(self, text):
+        """
+        Compute the cache key for a description.
+
+        Args:
+            text (str): Description text
+
+        Returns:
+            str: Hex digest identifying the text and model
+        """
+        digest = hashlib.sha256()
+        digest.update(self.model_key.encode('utf-8'))
+        digest.update(b"\0")
+        digest.update(normalize_text(text).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        """Path of the file holding a cache entry."""
+        return os.path.join(self.cache_dir, f"{key}.spacy")
+
+    def get(self, text):
+        """
+        Look up the parsed Doc for a description.
+
+        Args:
+            text (str): Description text
+
+        Returns:
+            spacy.tokens.Doc: Cached Doc, or None on a miss
+        """
+        key = self.key(text)
+
+        # Entries are looked up on disk, so ones written by other runs are hits too
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            doc_bin = DocBin().from_bytes(data)
+            doc = next(iter(doc_bin.get_docs(self.nlp.vocab)))
+
+            # Mark as most recently used on disk; another run may have evicted
+            # the entry since it was read
+            os.utime(path)
+        except FileNotFoundError:
+            self.index.discard(key)
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable doc cache entry {key}: {e}")
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.index.touch(key, len(data))
+
+        self.hits += 1
+        return doc
+
+    def put(self, text, doc):
+        """
+        Store the parsed Doc for a description.
+
+        Args:
+            text (str): Description text
+            doc (spacy.tokens.Doc): Parsed Doc
+        """
+        key = self.key(text)
+        doc_bin = DocBin(store_user_data=False)
+        doc_bin.add(doc)
+        data = doc_bin.to_bytes()
+
+        # Write atomically so concurrent runs never read partial entries; the
+        # temp file is unique per call, so threads of one process don't collide
+        path = self._path(key)
+        handle, temp_path = tempfile.mkstemp(prefix=f"{key}.", suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+        with self.index.lock:
+            self.index.touch(key, len(data))
+            self._evict()
+
+    def _remove(self, key):
+        """Remove an entry from the index and disk."""
+        self.index.discard(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Evict least recently used entries until the directory fits the size bound."""
+        evicted = 0
+        with self.index.lock:
+            while self.index.total_bytes > self.max_bytes and self.index.entries:
+                key = next(iter(self.index.entries))
+                self._remove(key)
+                evicted += 1
+
+        if evicted:
+            logger.debug(f"Evicted {evicted} spaCy doc cache entries")
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits, misses, hit rate, entry count and total size in bytes
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate,
+            'entries': len(self.index.entries),
+            'size_bytes': self.index.total_bytes
+        }
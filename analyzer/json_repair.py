@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+JSON Repair Module
+
+This module turns slightly malformed model output into usable results without
+asking the model again. Responses that fail to parse are re-tokenized and
+rebuilt: code fences and surrounding prose are dropped, single-quoted strings,
+bare keys and Python literals are converted, missing and trailing commas are
+fixed, and truncated output is closed off. The parsed data is then checked
+against a result schema, coercing numbers sent as strings. Only output that
+cannot be recovered raises InvalidResponseError, so callers know when a new
+request is actually needed.
+"""
+
+import re
+import json
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# JSON number syntax; other numeric literals are normalized with float()
+JSON_NUMBER = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+
+# Scores written as strings: "7", "7.5", "7/10", "7 out of 10"
+NUMERIC_STRING = re.compile(r'\s*(-?\d+(?:\.\d+)?)\s*(?:(?:/|out of)\s*10)?\s*')
+
+# Python literals models sometimes emit instead of JSON ones
+LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+
+# New requests allowed when a response cannot be repaired
+INVALID_RESPONSE_RETRIES = 1
+
+# Characters ending a bare word
+DELIMITERS = set(',:{}[]"\'')
+
+# Escapes copied unchanged into a double-quoted JSON string
+JSON_ESCAPES = set('"\\/bfnrtu')
+
+
+class InvalidResponseError(ValueError):
+    """Raised when a response cannot be repaired or does not match the schema."""
+
+
+def repair_json(text):
+    """
+    Parse model output as JSON, repairing common defects.
+
+    Args:
+        text (str): Response message content
+
+    Returns:
+        dict or list: Parsed JSON
+
+    Raises:
+        InvalidResponseError: If the output holds no recoverable JSON
+    """
+    if not text:
+        raise InvalidResponseError("Empty response")
+
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+
+    match = re.search(r'[{\[]', text)
+    if match is None:
+        raise InvalidResponseError("No JSON object in response")
+
+    repaired = _rebuild(_tokenize(text[match.start():]))
+    try:
+        data = json.loads(repaired)
+    except ValueError as e:
+        raise InvalidResponseError(f"Unrecoverable JSON: {e}") from e
+
+    logger.info("Repaired malformed JSON response")
+    return data
+
+def _tokenize(text):
+    """
+    Split JSON-like text into tokens, stopping after the first top-level value.
+
+    Args:
+        text (str): Text starting at the opening bracket
+
+    Returns:
+        list: (kind, text) tuples; kind is 'punct', 'string' (text already
+            encoded as a JSON string) or 'bare' (unquoted word)
+    """
+    tokens = []
+    depth = 0
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char.isspace():
+            index += 1
+        elif char in '{[':
+            depth += 1
+            tokens.append(('punct', char))
+            index += 1
+        elif char in '}]':
+            depth -= 1
+            tokens.append(('punct', char))
+            index += 1
+            if depth <= 0:
+                break
+        elif char in ':,':
+            tokens.append(('punct', char))
+            index += 1
+        elif char in '"\'':
+            encoded, index = _read_string(text, index)
+            tokens.append(('string', encoded))
+        else:
+            end = index
+            while end < len(text) and not text[end].isspace() and text[end] not in DELIMITERS:
+                end += 1
+            tokens.append(('bare', text[index:end]))
+            index = end
+
+    return tokens
+
+def _read_string(text, start):
+    """
+    Read a quoted string, re-encoding it as a JSON string.
+
+    Single-quoted strings are converted, raw control characters escaped, and
+    an unterminated string is closed at the end of the text.
+
+    Args:
+        text (str): Text being tokenized
+        start (int): Index of the opening quote
+
+    Returns:
+        tuple: (JSON string, index after the closing quote)
+    """
+    quote = text[start]
+    parts = ['"']
+    index = start + 1
+    while index < len(text):
+        char = text[index]
+        if char == '\\':
+            if index + 1 == len(text):
+                # Truncated mid-escape
+                break
+            escaped = text[index + 1]
+            if escaped in JSON_ESCAPES:
+                parts.append('\\' + escaped)
+            elif escaped == "'":
+                parts.append("'")
+            else:
+                # Invalid escape: keep the backslash as a literal character
+                parts.append('\\\\' + escaped)
+            index += 2
+            continue
+        if char == quote:
+            index += 1
+            break
+        if char == '"':
+            parts.append('\\"')
+        elif char < ' ':
+            parts.append(json.dumps(char)[1:-1])
+        else:
+            parts.append(char)
+        index += 1
+
+    parts.append('"')
+    return "".join(parts), index
+
+def _rebuild(tokens):
+    """
+    Reassemble tokens into valid JSON text.
+
+    Args:
+        tokens (list): Tokens from _tokenize
+
+    Returns:
+        str: JSON text
+    """
+    output = []
+    stack = []
+
+    for kind, text in tokens:
+        if kind == 'punct' and text in '}]':
+            _trim_incomplete(output, stack)
+            if stack:
+                output.append('}' if stack.pop() == '{' else ']')
+        elif kind == 'punct' and text == ',':
+            if output and output[-1] not in ('{', '[', ',', ':'):
+                output.append(',')
+        elif kind == 'punct' and text == ':':
+            output.append(':')
+        else:
+            # A value or key directly after another value is missing its comma
+            if output and output[-1] not in ('{', '[', ',', ':'):
+                output.append(',')
+
+            if kind == 'punct':
+                stack.append(text)
+                output.append(text)
+            elif kind == 'string':
+                output.append(text)
+            elif stack and stack[-1] == '{' and output and output[-1] in ('{', ','):
+                # Bare key
+                output.append(json.dumps(text))
+            else:
+                output.append(_encode_bare_value(text))
+
+    _trim_incomplete(output, stack)
+    while stack:
+        output.append('}' if stack.pop() == '{' else ']')
+
+    return "".join(output)
+
+def _trim_incomplete(output, stack):
+    """Drop trailing commas, colons and keys without a value before a container closes."""
+    while output:
+        if output[-1] == ',':
+            output.pop()
+        elif output[-1] == ':':
+            output.pop()
+            if output:
+                output.pop()
+        elif (stack and stack[-1] == '{' and output[-1] not in ('{', '}', ']')
+              and len(output) >= 2 and output[-2] in ('{', ',')):
+            output.pop()
+        else:
+            break
+
+def _encode_bare_value(text):
+    """Encode an unquoted word as a JSON literal, number or string."""
+    if text in ('true', 'false', 'null'):
+        return text
+    if text in LITERALS:
+        return LITERALS[text]
+    if JSON_NUMBER.fullmatch(text):
+        return text
+    try:
+        number = float(text)
+    except ValueError:
+        return json.dumps(text)
+    return json.dumps(number) if number == number and abs(number) != float('inf') else json.dumps(text)
+
+def validate(data, schema, path=""):
+    """
+    Check parsed data against a schema, coercing values where possible.
+
+    Schema values are float (a number; numeric strings such as "7" or "7/10"
+    are converted), str, list (a single string becomes a one-item list), a
+    nested schema dict, or a (type, default) tuple for optional fields.
+    Fields not in the schema are kept unchanged.
+
+    Args:
+        data (dict): Parsed response
+        schema (dict): Field name -> expected type
+        path (str): Field path for error messages
+
+    Returns:
+        dict: Copy of data with coerced values and defaults filled in
+
+    Raises:
+        InvalidResponseError: If required fields are missing or cannot be coerced
+    """
+    if not isinstance(data, dict):
+        raise InvalidResponseError(f"Expected an object{' at ' + path if path else ''}, got {type(data).__name__}")
+
+    result = dict(data)
+    errors = []
+    for field, expected in schema.items():
+        field_path = f"{path}.{field}" if path else field
+        if isinstance(expected, tuple):
+            expected, default = expected
+            if result.get(field) is None:
+                result[field] = default
+                continue
+        elif field not in result:
+            errors.append(f"missing {field_path}")
+            continue
+
+        try:
+            result[field] = _coerce(result[field], expected, field_path)
+        except InvalidResponseError as e:
+            errors.append(str(e))
+
+    if errors:
+        raise InvalidResponseError("; ".join(errors))
+    return result
+
+def _coerce(value, expected, path):
+    """Coerce one value to the type a schema expects."""
+    if isinstance(expected, dict):
+        return validate(value, expected, path)
+
+    if expected is float:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # json.loads accepts NaN and Infinity, which no score can be
+            if not math.isfinite(value):
+                raise InvalidResponseError(f"{path} is not a finite number: {value!r}")
+            return value
+        if isinstance(value, str):
+            match = NUMERIC_STRING.fullmatch(value)
+            if match:
+                number = float(match.group(1))
+                return int(number) if number.is_integer() else number
+        raise InvalidResponseError(f"{path} is not a number: {value!r}")
+
+    if expected is str:
+        if isinstance(value, str):
+            return value
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        raise InvalidResponseError(f"{path} is not a string: {value!r}")
+
+    if expected is list:
+        if isinstance(value, list):
+            return value
+        if isinstance(value, str):
+            return [value] if value else []
+        raise InvalidResponseError(f"{path} is not a list: {value!r}")
+
+    raise TypeError(f"Unsupported schema type for {path}: {expected!r}")
+
+def parse_response(text, schema=None):
+    """
+    Repair and validate a model response.
+
+    Args:
+        text (str): Response message content
+        schema (dict, optional): Schema the parsed object must match
+
+    Returns:
+        dict: Parsed, validated result
+
+    Raises:
+        InvalidResponseError: If the response is unrecoverable
+    """
+    data = repair_json(text)
+    if schema is None:
+        return data
+    return validate(data, schema)
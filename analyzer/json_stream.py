@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Incremental JSON Module
+
+This module parses a JSON object while its text is still streaming in from a
+language model. Each top-level field is reported as soon as its value is
+complete, so the UI can show the scores long before the explanations and
+summary have finished generating.
+"""
+
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """
+    Reports the top-level fields of a streamed JSON object as they complete.
+
+    Text before the opening brace (such as a code fence) and after the closing
+    brace is ignored. Only string, bracket and delimiter state is tracked
+    while scanning; each finished value is decoded with json.loads.
+    """
+
+    def __init__(self):
+        """Initialize the parser."""
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.complete = False
+        self.segment_start = None
+        self.key = None
+        self.fields = {}
+
+    def feed(self, text):
+        """
+        Add streamed text and collect the fields it completes.
+
+        Args:
+            text (str): Next piece of the response
+
+        Returns:
+            list: (field name, value) tuples completed by this text, in order
+        """
+        self.buffer += text
+        completed = []
+
+        while self.position < len(self.buffer) and not self.complete:
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif not self.started:
+                if char == '{':
+                    self.started = True
+                    self.depth = 1
+                    self.segment_start = self.position + 1
+            elif char == '"':
+                self.in_string = True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    self._end_value(completed)
+                    self.complete = True
+            elif self.depth == 1 and char == ':':
+                self._end_key()
+            elif self.depth == 1 and char == ',':
+                self._end_value(completed)
+
+            self.position += 1
+
+        return completed
+
+    def _end_key(self):
+        """Decode the key that ends at the current position."""
+        try:
+            self.key = json.loads(self.buffer[self.segment_start:self.position])
+        except ValueError:
+            logger.debug(f"Unreadable key in streamed JSON: {self.buffer[self.segment_start:self.position]!r}")
+            self.key = None
+        self.segment_start = self.position + 1
+
+    def _end_value(self, completed):
+        """Decode the value that ends at the current position and record its field."""
+        value_text = self.buffer[self.segment_start:self.position]
+        self.segment_start = self.position + 1
+
+        key, self.key = self.key, None
+        if key is None:
+            return
+
+        try:
+            value = json.loads(value_text)
+        except ValueError:
+            logger.debug(f"Unreadable value for {key} in streamed JSON")
+            return
+
+        self.fields[key] = value
+        completed.append((key, value))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher Module
+
+This module compiles the configured investment keywords into a single
+Aho-Corasick automaton so that a listing description can be scanned once,
+no matter how many keywords are configured.
+"""
+
+import logging
+import re
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Word tokens use the same definition of a "word character" as the regex \b
+# anchor, so aligning keywords to whole tokens is equivalent to r'\bkeyword\b'
+WORD_PATTERN = re.compile(r'\w+')
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher built once from a keyword configuration.
+
+    Keywords are split into alternating word/separator symbols (e.g. "must sell"
+    becomes "must", " ", "sell") and inserted into an Aho-Corasick trie over those
+    symbols. Descriptions are tokenized the same way, so every match starts and
+    ends on a word boundary and the scan costs one pass over the text regardless
+    of the number of keywords.
+    """
+
+    def __init__(self, keywords):
+        """
+        Compile the keyword configuration into an automaton.
+
+        Args:
+            keywords (dict): Dictionary of keyword lists by category
+        """
+        self.keywords = keywords or {}
+
+        # Normalized phrase -> categories it belongs to (in config order)
+        self.phrase_categories = {}
+        for category, category_keywords in self.keywords.items():
+            for keyword in category_keywords:
+                phrase = keyword.lower()
+                categories = self.phrase_categories.setdefault(phrase, [])
+                if category not in categories:
+                    categories.append(category)
+
+        # Keywords that count towards more than one category (e.g. "foreclosure")
+        self.shared_keywords = {
+            phrase: tuple(categories)
+            for phrase, categories in self.phrase_categories.items()
+            if len(categories) > 1
+        }
+
+        # Trie state tables: goto transitions, failure links and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        # Phrases that don't start and end with a word character can't be
+        # aligned to word tokens, so they keep a dedicated regex
+        self._fallback_patterns = []
+
+        for phrase in self.phrase_categories:
+            symbols = self._phrase_symbols(phrase)
+            if symbols is None:
+                pattern = re.compile(r'\b' + re.escape(phrase) + r'\b')
+                self._fallback_patterns.append((phrase, pattern))
+            else:
+                self._insert(phrase, symbols)
+
+        self._build_failure_links()
+
+        logger.debug(
+            f"Compiled {len(self.phrase_categories)} keywords into an automaton with "
+            f"{len(self._goto)} states ({len(self._fallback_patterns)} regex fallbacks)"
+        )
+
+    def _phrase_symbols(self, phrase):
+        """
+        Split a normalized phrase into alternating word/separator symbols.
+
+        Args:
+            phrase (str): Lowercase keyword
+
+        Returns:
+            list: Symbols for the trie, or None if the phrase needs a regex fallback
+        """
+        words = list(WORD_PATTERN.finditer(phrase))
+        if not words or words[0].start() != 0 or words[-1].end() != len(phrase):
+            return None
+
+        symbols = [words[0].group()]
+        for previous, word in zip(words, words[1:]):
+            symbols.append(phrase[previous.end():word.start()])
+            symbols.append(word.group())
+        return symbols
+
+    def _insert(self, phrase, symbols):
+        """
+        Add a phrase to the trie.
+
+        Args:
+            phrase (str): Lowercase keyword
+            symbols (list): Word/separator symbols of the phrase
+        """
+        state = 0
+        for symbol in symbols:
+            next_state = self._goto[state].get(symbol)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][symbol] = next_state
+            state = next_state
+        # Outputs store the phrase with its length in symbols for offset recovery
+        self._output[state].append((phrase, len(symbols)))
+
+    def _build_failure_links(self):
+        """Compute failure links breadth-first and merge outputs along them."""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            queue.append(state)
+
+        while queue:
+            state = queue.popleft()
+            for symbol, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and symbol not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(symbol, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_matches(self, text):
+        """
+        Scan text once and return every keyword occurrence.
+
+        Args:
+            text (str): Text to scan (lowercased before matching)
+
+        Returns:
+            list: Match dicts with 'keyword', 'categories', 'start' and 'end' offsets
+                into the lowercased text, ordered by end offset
+        """
+        text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        matches = []
+        # Start offsets of the symbols seen so far, used to recover match spans
+        starts = []
+        state = 0
+        previous_end = None
+
+        for word in WORD_PATTERN.finditer(text):
+            symbols = []
+            if previous_end is not None:
+                symbols.append((text[previous_end:word.start()], previous_end))
+            symbols.append((word.group(), word.start()))
+            previous_end = word.end()
+
+            for symbol, start in symbols:
+                starts.append(start)
+
+                while state and symbol not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(symbol, 0)
+
+                # Only word symbols can complete a phrase
+                if output[state] and start == word.start():
+                    for phrase, length in output[state]:
+                        matches.append({
+                            'keyword': phrase,
+                            'categories': tuple(self.phrase_categories[phrase]),
+                            'start': starts[-length],
+                            'end': word.end()
+                        })
+
+        for phrase, pattern in self._fallback_patterns:
+            for match in pattern.finditer(text):
+                matches.append({
+                    'keyword': phrase,
+                    'categories': tuple(self.phrase_categories[phrase]),
+                    'start': match.start(),
+                    'end': match.end()
+                })
+
+        if self._fallback_patterns:
+            matches.sort(key=lambda match: (match['end'], match['start']))
+
+        return matches
+
+    def matched_keywords(self, text):
+        """
+        Return the configured keywords found in text, grouped by category.
+
+        Args:
+            text (str): Text to scan
+
+        Returns:
+            dict: Category -> list of matched keywords in configuration order
+        """
+        found = {match['keyword'] for match in self.find_matches(text)}
+
+        return {
+            category: [keyword for keyword in category_keywords if keyword.lower() in found]
+            for category, category_keywords in self.keywords.items()
+        }
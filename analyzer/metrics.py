@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Analyzer Metrics Module
+
+This module collects one structured record per analyzer call (keyword,
+spaCy or OpenAI): model, token usage, wall latency, retries, cache hit or
+miss and estimated cost. Records go to a process-wide registry that always
+aggregates them in memory for an end-of-run summary and forwards them to
+configurable sinks: a JSONL file and a Prometheus text-format file for the
+node exporter's textfile collector.
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Prefix of every exported Prometheus metric
+PROMETHEUS_PREFIX = 'cre_analyzer'
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def percentile(values, fraction):
+    """
+    Nearest-rank percentile of a list of numbers.
+
+    Args:
+        values (list): Numbers to summarize
+        fraction (float): Percentile as a fraction, e.g. 0.95
+
+    Returns:
+        float: The percentile, or None for an empty list
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class JSONLMetricsSink:
+    """
+    Appends each metrics record as one JSON line.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize the sink.
+
+        Args:
+            path (str): JSONL file to append to
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a')
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        """Write one record."""
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+
+    def flush(self):
+        """Flush buffered records to disk."""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class MemoryMetricsSink:
+    """
+    Aggregates records in memory per (analyzer, model).
+    """
+
+    def __init__(self):
+        """Initialize the aggregator."""
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record):
+        """Add one record to its group's totals."""
+        key = (record['analyzer'], record['model'] or '')
+        with self._lock:
+            group = self._groups.setdefault(key, {
+                'calls': 0,
+                'listings': 0,
+                'cache_hits': 0,
+                'errors': 0,
+                'retries': 0,
+                'prompt_tokens': 0,
+                'completion_tokens': 0,
+                'cost': 0.0,
+                'latencies': []
+            })
+            group['calls'] += 1
+            group['listings'] += record['listings']
+            group['cache_hits'] += 1 if record['cache_hit'] else 0
+            group['errors'] += 1 if record['error'] else 0
+            group['retries'] += record['retries']
+            group['prompt_tokens'] += record['prompt_tokens']
+            group['completion_tokens'] += record['completion_tokens']
+            group['cost'] += record['cost'] or 0.0
+            if record['latency'] is not None:
+                group['latencies'].append(record['latency'])
+
+    def summary(self):
+        """
+        Totals and latency percentiles per (analyzer, model).
+
+        Returns:
+            list: Dicts with analyzer, model, calls, listings, cache_hits,
+                cache_hit_rate, errors, retries, prompt_tokens, completion_tokens,
+                cost, latency_total, p50 and p95
+        """
+        with self._lock:
+            groups = {key: dict(group, latencies=list(group['latencies'])) for key, group in self._groups.items()}
+
+        rows = []
+        for (analyzer, model), group in sorted(groups.items()):
+            latencies = group.pop('latencies')
+            rows.append(dict(
+                group,
+                analyzer=analyzer,
+                model=model,
+                cache_hit_rate=group['cache_hits'] / group['calls'] if group['calls'] else 0.0,
+                latency_total=sum(latencies),
+                p50=percentile(latencies, 0.5),
+                p95=percentile(latencies, 0.95)
+            ))
+        return rows
+
+    def flush(self):
+        """Nothing to flush; kept for the sink interface."""
+
+    def close(self):
+        """Nothing to close; kept for the sink interface."""
+
+
+class PrometheusMetricsSink:
+    """
+    Writes aggregated metrics in Prometheus text exposition format.
+
+    The file is rewritten atomically on flush, and at most every
+    flush_interval seconds while records arrive, so a textfile collector
+    never reads a partial file.
+    """
+
+    def __init__(self, path, flush_interval=15.0):
+        """
+        Initialize the sink.
+
+        Args:
+            path (str): .prom file to write
+            flush_interval (float): Minimum seconds between rewrites while recording
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.aggregator = MemoryMetricsSink()
+        self._last_flush = time.monotonic()
+        # Analysis workers flush from their own threads through one temp file
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def emit(self, record):
+        """Aggregate one record, rewriting the file if the interval has passed."""
+        self.aggregator.emit(record)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Rewrite the metrics file."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w') as file:
+                file.write(self.render())
+            os.replace(temp_path, self.path)
+
+    def close(self):
+        """Write the final metrics."""
+        self.flush()
+
+    def render(self):
+        """
+        Render the aggregated metrics.
+
+        Returns:
+            str: Prometheus text exposition format
+        """
+        rows = self.aggregator.summary()
+        counters = [
+            ('calls_total', 'calls', 'Analyzer calls'),
+            ('listings_total', 'listings', 'Listings analyzed'),
+            ('cache_hits_total', 'cache_hits', 'Calls served from a cache'),
+            ('errors_total', 'errors', 'Calls that failed'),
+            ('retries_total', 'retries', 'Retried attempts'),
+            ('prompt_tokens_total', 'prompt_tokens', 'Prompt tokens used'),
+            ('completion_tokens_total', 'completion_tokens', 'Completion tokens used'),
+            ('cost_usd_total', 'cost', 'Estimated cost in USD')
+        ]
+
+        lines = []
+        for name, field, help_text in counters:
+            lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} counter")
+            for row in rows:
+                lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{self._labels(row)}}} {row[field]}")
+
+        name = f"{PROMETHEUS_PREFIX}_latency_seconds"
+        lines.append(f"# HELP {name} Wall latency of analyzer calls")
+        lines.append(f"# TYPE {name} summary")
+        for row in rows:
+            labels = self._labels(row)
+            for quantile, field in (('0.5', 'p50'), ('0.95', 'p95')):
+                if row[field] is not None:
+                    lines.append(f"{name}{{{labels},quantile=\"{quantile}\"}} {row[field]}")
+            lines.append(f"{name}_sum{{{labels}}} {row['latency_total']}")
+            lines.append(f"{name}_count{{{labels}}} {row['calls']}")
+
+        return "\n".join(lines) + "\n"
+
+    def _labels(self, row):
+        """Format the analyzer and model labels of a row."""
+        def escape(value):
+            return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return f'analyzer="{escape(row["analyzer"])}",model="{escape(row["model"])}"'
+
+
+class MetricsRegistry:
+    """
+    Receives analyzer metrics records and forwards them to the sinks.
+    """
+
+    def __init__(self, sinks=None):
+        """
+        Initialize the registry.
+
+        Args:
+            sinks (list, optional): Sinks with emit, flush and close methods. An
+                in-memory aggregator for the run summary is always added
+        """
+        self.aggregator = MemoryMetricsSink()
+        self.sinks = [self.aggregator] + list(sinks or [])
+
+    def record(self, analyzer, model=None, latency=None, prompt_tokens=0, completion_tokens=0,
+               retries=0, cache_hit=False, cost=None, error=None, listings=1, batch=False):
+        """
+        Record one analyzer call.
+
+        Args:
+            analyzer (str): Analyzer or provider name, e.g. 'keyword', 'spacy', 'openai'
+            model (str, optional): Model used, for model-backed analyzers
+            latency (float, optional): Wall time of the call in seconds; None when
+                unknown, e.g. for Batch API results
+            prompt_tokens (int): Prompt tokens used
+            completion_tokens (int): Completion tokens used
+            retries (int): Attempts made beyond the first
+            cache_hit (bool): Whether the result came from a cache
+            cost (float, optional): Estimated cost in USD
+            error (str, optional): Error message if the call failed
+            listings (int): Listings covered by the call
+            batch (bool): Whether the call went through the Batch API
+
+        Returns:
+            dict: The record
+        """
+        record = {
+            'timestamp': time.time(),
+            'analyzer': analyzer,
+            'model': model,
+            'listings': listings,
+            'latency': round(latency, 6) if latency is not None else None,
+            'prompt_tokens': prompt_tokens or 0,
+            'completion_tokens': completion_tokens or 0,
+            'retries': retries,
+            'cache_hit': cache_hit,
+            'cost': cost,
+            'error': str(error) if error else None,
+            'batch': batch
+        }
+
+        for sink in self.sinks:
+            try:
+                sink.emit(record)
+            except Exception as e:
+                logger.warning(f"Metrics sink {type(sink).__name__} failed: {e}")
+        return record
+
+    def add_sink(self, sink):
+        """
+        Forward future records to another sink.
+
+        Args:
+            sink: Object with emit, flush and close methods
+        """
+        self.sinks.append(sink)
+
+    def summary(self):
+        """
+        Aggregated totals per (analyzer, model).
+
+        Returns:
+            list: Summary rows as returned by MemoryMetricsSink.summary
+        """
+        return self.aggregator.summary()
+
+    def format_summary(self):
+        """
+        Format the summary as a table for logs or the console.
+
+        Returns:
+            str: One line per (analyzer, model), or a note if nothing was recorded
+        """
+        rows = self.summary()
+        if not rows:
+            return "No analyzer calls recorded"
+
+        def seconds(value):
+            return f"{value:.3f}s" if value is not None else "-"
+
+        lines = [
+            f"{'analyzer':<12} {'model':<14} {'calls':>7} {'cache':>6} {'errors':>6} {'retries':>7} "
+            f"{'prompt tok':>11} {'compl tok':>10} {'cost':>10} {'p50':>9} {'p95':>9}"
+        ]
+        for row in rows:
+            lines.append(
+                f"{row['analyzer']:<12} {row['model'] or '-':<14} {row['calls']:>7} "
+                f"{row['cache_hit_rate']:>6.1%} {row['errors']:>6} {row['retries']:>7} "
+                f"{row['prompt_tokens']:>11} {row['completion_tokens']:>10} {'$' + format(row['cost'], '.4f'):>10} "
+                f"{seconds(row['p50']):>9} {seconds(row['p95']):>9}"
+            )
+        return "\n".join(lines)
+
+    def flush(self):
+        """Flush every sink."""
+        for sink in self.sinks:
+            sink.flush()
+
+    def close(self):
+        """Flush and close every sink."""
+        for sink in self.sinks:
+            sink.close()
+
+
+def get_metrics():
+    """
+    Get the process-wide metrics registry, creating one with only the
+    in-memory aggregator if configure_metrics has not been called.
+
+    Returns:
+        MetricsRegistry: Shared registry
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+        return _registry
+
+def configure_metrics(metrics_config=None):
+    """
+    Replace the process-wide registry with one using the configured sinks.
+
+    Args:
+        metrics_config (dict, optional): Metrics configuration with 'enabled',
+            'jsonl_path', 'prometheus_path' and 'prometheus_flush_seconds'
+
+    Returns:
+        MetricsRegistry: The new registry
+    """
+    global _registry
+    metrics_config = metrics_config or {}
+
+    sinks = []
+    if metrics_config.get('enabled', True):
+        if metrics_config.get('jsonl_path'):
+            sinks.append(JSONLMetricsSink(metrics_config['jsonl_path']))
+        if metrics_config.get('prometheus_path'):
+            sinks.append(PrometheusMetricsSink(
+                metrics_config['prometheus_path'],
+                flush_interval=metrics_config.get('prometheus_flush_seconds', 15)
+            ))
+
+    with _registry_lock:
+        if _registry is not None:
+            _registry.close()
+        _registry = MetricsRegistry(sinks)
+        return _registry
@@ -6,13 +6,46 @@ This module provides functions for analyzing LoopNet listings using
 Natural Language Processing techniques to identify investment opportunities.
 """
 
-import logging
+import os
 import re
+import copy
+import json
+import time
+import asyncio
+import logging
+import numpy as np
 import spacy
-from openai import OpenAI
+from spacy.matcher import PhraseMatcher
+
+from analyzer.batch import BatchJob, LocalBatchBackend, OpenAIBatchBackend
+from analyzer.compaction import get_compactor
+from analyzer.doc_cache import DocCache
+from analyzer.json_repair import InvalidResponseError, parse_response
+from analyzer.keyword_matcher import KeywordMatcher
+from analyzer.metrics import get_metrics
+from analyzer.openai_analyzer import ANALYZER_VERSION, RESULT_SCHEMA, OpenAIAnalyzer
+from analyzer.pricing import estimate_cost
+from analyzer.rate_limit import run_async
+from analyzer.resilience import get_resilient_caller
+from analyzer.response_cache import ResponseCache, get_response_cache
+from analyzer.scoring import analysis_failed
 
 logger = logging.getLogger(__name__)
 
+# Cascade used when nlp.cascade.tiers is not configured: cheap local
+# analysis first, escalating to a small and then a large model
+DEFAULT_CASCADE_TIERS = [
+    {'provider': 'keyword'},
+    {'provider': 'spacy'},
+    {'provider': 'openai', 'model': 'gpt-4o-mini'},
+    {'provider': 'openai', 'model': 'o1'}
+]
+
+# Categories of an OpenAI result, mapped onto this module's per-category format.
+# Requests, cache keys and result validation are OpenAIAnalyzer's, so the
+# pipeline and the other entry points share cached responses
+OPENAI_CATEGORIES = ['seller_motivation', 'transaction_complexity', 'property_characteristics']
+
 class NLPAnalyzer:
     """Class for analyzing real estate listings using NLP techniques."""
     
@@ -29,6 +62,9 @@ class NLPAnalyzer:
         # Load keywords for keyword-based analysis
         self.keywords = config.get('keywords', {})
         
+        # Compile keywords once so each description is scanned in a single pass
+        self.keyword_matcher = KeywordMatcher(self.keywords)
+        
         # Initialize NLP models if needed
         if self.provider == 'spacy':
             logger.info("Initializing spaCy NLP model")
@@ -38,11 +74,86 @@ class NLPAnalyzer:
                 logger.warning("spaCy model not found. Downloading model...")
                 spacy.cli.download('en_core_web_md')
                 self.nlp = spacy.load('en_core_web_md')
+            
+            # Only tokens and vectors are used, so skip the unused components
+            spacy_config = config.get('spacy', {})
+            disabled = [
+                name for name in spacy_config.get('disable', ['parser', 'ner', 'lemmatizer'])
+                if name in self.nlp.pipe_names
+            ]
+            if disabled:
+                self.nlp.select_pipes(disable=disabled)
+                logger.info(f"Disabled spaCy components: {', '.join(disabled)}")
+            
+            # Batch settings for nlp.pipe
+            self.batch_size = spacy_config.get('batch_size', 256)
+            self.n_process = spacy_config.get('n_process', 1)
+            
+            # Optional on-disk cache of parsed documents
+            self.doc_cache = None
+            if spacy_config.get('cache_dir'):
+                self.doc_cache = DocCache(
+                    spacy_config['cache_dir'],
+                    self.nlp,
+                    max_size_mb=spacy_config.get('cache_max_mb', 512)
+                )
+            
+            # Embed keywords once instead of re-running the pipeline per token
+            self.similarity_threshold = spacy_config.get('similarity_threshold', 0.7)
+            self._build_keyword_vectors()
+            self._build_phrase_matcher()
+        
+        elif self.provider == 'vectorized':
+            # Corpus-level keyword scoring shares the compiled keyword matcher
+            from analyzer.vectorized import KeywordMatrixScorer
+            self.matrix_scorer = KeywordMatrixScorer(self.keywords, matcher=self.keyword_matcher)
+        
+        elif self.provider == 'cascade':
+            self._build_cascade()
         
         elif self.provider == 'openai':
             logger.info("Initializing OpenAI client")
-            self.openai_client = OpenAI(api_key=config.get('openai_api_key'))
             self.model = config.get('model', 'gpt-4')
+            
+            # Optional cache of responses shared with the other entry points
+            self.response_cache = get_response_cache(config['cache']) if config.get('cache') else None
+            
+            # Prompts, cache keys, retries, circuit breaking and hedging are the
+            # same as app.py's and analyze_with_openai.py's; long descriptions
+            # are cut down to their highest-signal sentences
+            self.openai_analyzer = OpenAIAnalyzer(
+                api_key=config.get('openai_api_key'),
+                model=self.model,
+                cache=self.response_cache,
+                compactor=get_compactor(config.get('compaction'), self.keywords),
+                resilience=get_resilient_caller(config.get('resilience'))
+            )
+            self.openai_client = self.openai_analyzer.client
+            
+            # Token usage reported by the API, for cost reporting
+            self.usage = self.openai_analyzer.usage
+            
+            # Several short listings per request, sharing one system prompt
+            packing_config = config.get('packing', {})
+            self.packing = packing_config if packing_config.get('enabled') else None
+            
+            # Batch API mode for runs where cost matters more than latency
+            batch_config = config.get('batch', {})
+            self.batch_job = None
+            if batch_config.get('enabled'):
+                state_dir = batch_config.get('state_dir', 'data/batch')
+                if batch_config.get('backend', 'openai') == 'local':
+                    backend = LocalBatchBackend(os.path.join(state_dir, 'local'))
+                else:
+                    backend = OpenAIBatchBackend(self.openai_client)
+                # null polls until the batch finishes
+                timeout_hours = batch_config.get('timeout_hours', 24)
+                self.batch_job = BatchJob(
+                    backend,
+                    state_dir=state_dir,
+                    poll_interval=batch_config.get('poll_interval_seconds', 60),
+                    timeout=timeout_hours * 3600 if timeout_hours is not None else None
+                )
     
     def analyze_listing(self, listing):
         """
@@ -61,22 +172,304 @@ class NLPAnalyzer:
             logger.warning(f"No description found for listing {listing.get('id', 'unknown')}")
             return self._add_empty_analysis(listing)
         
-        # Choose analysis method based on provider
-        if self.provider == 'keyword':
+        # Choose analysis method based on provider; OpenAI calls record their own metrics
+        started = time.monotonic()
+        if self.provider in ('keyword', 'vectorized'):
             analysis = self._analyze_with_keywords(description)
+            self._record_call(time.monotonic() - started)
         elif self.provider == 'spacy':
             analysis = self._analyze_with_spacy(description)
+            self._record_call(time.monotonic() - started)
         elif self.provider == 'openai':
             analysis = self._analyze_with_openai(description, listing)
+        elif self.provider == 'cascade':
+            return self._analyze_batch_cascade([listing])[0]
         else:
             logger.error(f"Unknown NLP provider: {self.provider}")
-            return self._add_empty_analysis(listing)
+            return self._add_empty_analysis(listing, error=ValueError(f"Unknown NLP provider: {self.provider}"))
         
         # Add analysis results to listing
         listing.update(analysis)
         
         return listing
     
+    def analyze_batch(self, listings):
+        """
+        Analyze a batch of listings, using corpus-level processing where the
+        provider supports it.
+        
+        Args:
+            listings (list): Listings to analyze
+            
+        Returns:
+            list: Listings with added analysis results, in input order
+        """
+        if self.provider == 'vectorized':
+            return self._analyze_batch_vectorized(listings)
+        if self.provider == 'spacy':
+            return self._analyze_batch_spacy(listings)
+        if self.provider == 'openai':
+            return self._analyze_batch_openai(listings)
+        if self.provider == 'cascade':
+            return self._analyze_batch_cascade(listings)
+        
+        return [self.analyze_listing(listing) for listing in listings]
+    
+    async def analyze_batch_async(self, listings):
+        """
+        Analyze a batch of listings from a coroutine without blocking its event loop.
+        
+        Args:
+            listings (list): Listings to analyze
+            
+        Returns:
+            list: Listings with added analysis results, in input order
+        """
+        return await asyncio.to_thread(self.analyze_batch, listings)
+    
+    def _build_cascade(self):
+        """
+        Create one analyzer per cascade tier from nlp.cascade.
+        
+        Each tier is an nlp configuration override (provider, model, ...) on
+        top of this analyzer's configuration, and may set its own
+        uncertainty_band and promise_threshold for escalating past it.
+        """
+        cascade_config = self.config.get('cascade', {})
+        self.cascade_prices = cascade_config.get('prices')
+        self.cascade_report = []
+        
+        self.cascade_tiers = []
+        for position, tier in enumerate(cascade_config.get('tiers', DEFAULT_CASCADE_TIERS)):
+            tier_config = dict(self.config, **tier)
+            tier_config.pop('cascade', None)
+            
+            name = tier.get('name') or (
+                f"{tier['provider']}:{tier_config.get('model', 'gpt-4')}"
+                if tier['provider'] == 'openai' else tier['provider']
+            )
+            
+            # Each tier resumes its own Batch API run, so tiers never overwrite each other's state
+            batch_config = tier_config.get('batch', {})
+            if batch_config.get('enabled'):
+                tier_config['batch'] = dict(batch_config, state_dir=os.path.join(
+                    batch_config.get('state_dir', 'data/batch'),
+                    f"tier_{position + 1}_{re.sub(r'[^A-Za-z0-9._-]', '_', name)}"
+                ))
+            self.cascade_tiers.append({
+                'name': name,
+                'analyzer': NLPAnalyzer(tier_config),
+                'uncertainty_band': tier.get('uncertainty_band', cascade_config.get('uncertainty_band', [3, 6])),
+                'promise_threshold': tier.get('promise_threshold', cascade_config.get('promise_threshold', 6))
+            })
+        
+        logger.info(f"Initialized analyzer cascade: {' -> '.join(tier['name'] for tier in self.cascade_tiers)}")
+    
+    def _should_escalate(self, score, tier):
+        """
+        Check whether a score from a tier calls for the next, more expensive tier.
+        
+        Args:
+            score (float): Total score from the tier
+            tier (dict): Cascade tier the score came from
+            
+        Returns:
+            bool: True if the score is in the uncertainty band or at or above
+                the promise threshold
+        """
+        low, high = tier['uncertainty_band']
+        return low <= score <= high or score >= tier['promise_threshold']
+    
+    def _analyze_batch_cascade(self, listings):
+        """
+        Run listings through the cascade, sending only uncertain or promising
+        listings on to each more expensive tier.
+        
+        Each listing keeps the analysis of the last tier it reached, recorded
+        under 'analysis_tier', with 'escalated' set when that is not the first
+        tier. When a tier's analysis fails, the previous tier's result is kept,
+        'escalated' is False and the failure is recorded under
+        'escalation_error'. Per-tier counts and estimated costs are logged and
+        kept in cascade_report.
+        
+        Args:
+            listings (list): Listings to analyze
+            
+        Returns:
+            list: Listings with added analysis results
+        """
+        remaining = []
+        for listing in listings:
+            if self._extract_text_for_analysis(listing):
+                remaining.append(listing)
+            else:
+                logger.warning(f"No description found for listing {listing.get('id', 'unknown')}")
+                self._add_empty_analysis(listing)
+        
+        self.cascade_report = []
+        for position, tier in enumerate(self.cascade_tiers):
+            if not remaining:
+                break
+            
+            analyzer = tier['analyzer']
+            usage_before = dict(getattr(analyzer, 'usage', {}))
+            
+            # A failed tier must not replace the previous tier's result with zeros
+            previous = [copy.deepcopy(listing) for listing in remaining] if position else None
+            
+            analyzer.analyze_batch(remaining)
+            kept = []
+            for index, listing in enumerate(remaining):
+                if previous and analysis_failed(listing):
+                    error = listing['analysis_metadata'].get('error')
+                    logger.warning(
+                        f"Cascade tier {tier['name']} failed for listing {listing.get('id', 'unknown')}, "
+                        f"keeping the {previous[index].get('analysis_tier')} result: {error}"
+                    )
+                    listing.clear()
+                    listing.update(previous[index])
+                    listing['escalated'] = False
+                    listing['escalation_error'] = {'tier': tier['name'], 'error': error}
+                    continue
+                listing['analysis_tier'] = tier['name']
+                listing['escalated'] = position > 0
+                kept.append(listing)
+            
+            self.cascade_report.append(self._cascade_tier_report(tier, len(remaining), usage_before))
+            remaining = kept
+            
+            if position < len(self.cascade_tiers) - 1:
+                remaining = [
+                    listing for listing in remaining
+                    if self._should_escalate(listing.get('total_score', 0), tier)
+                ]
+        
+        for report in self.cascade_report:
+            cost = f"${report['cost']:.4f}" if report['cost'] is not None else "unknown cost"
+            logger.info(
+                f"Cascade tier {report['tier']}: {report['listings']} listings "
+                f"({report['listings'] / max(len(listings), 1):.1%}), {report['requests']} requests, {cost}"
+            )
+        
+        return listings
+    
+    def _cascade_tier_report(self, tier, listing_count, usage_before):
+        """
+        Summarize what one cascade tier processed and spent.
+        
+        Args:
+            tier (dict): Cascade tier
+            listing_count (int): Listings analyzed by the tier
+            usage_before (dict): The tier analyzer's usage totals before this run
+            
+        Returns:
+            dict: tier, listings, requests, prompt_tokens, completion_tokens and cost
+        """
+        analyzer = tier['analyzer']
+        if analyzer.provider != 'openai':
+            return {'tier': tier['name'], 'listings': listing_count, 'requests': 0,
+                    'prompt_tokens': 0, 'completion_tokens': 0, 'cost': 0.0}
+        
+        usage = {key: analyzer.usage[key] - usage_before.get(key, 0) for key in analyzer.usage}
+        cost = estimate_cost(
+            analyzer.model,
+            usage['prompt_tokens'],
+            usage['completion_tokens'],
+            batch=analyzer.batch_job is not None,
+            prices=self.cascade_prices
+        )
+        return dict(usage, tier=tier['name'], listings=listing_count, cost=cost)
+    
+    def _analyze_batch_vectorized(self, listings):
+        """
+        Score all listings at once with a sparse keyword hit matrix.
+        
+        Args:
+            listings (list): Listings to analyze
+            
+        Returns:
+            list: Listings with added analysis results
+        """
+        texts = [self._extract_text_for_analysis(listing) for listing in listings]
+        
+        started = time.monotonic()
+        self.matrix_scorer.fit(texts)
+        total_scores = self.matrix_scorer.average_scores()
+        self._record_call(time.monotonic() - started, listings=len(listings))
+        
+        for row, (listing, text) in enumerate(zip(listings, texts)):
+            if not text:
+                logger.warning(f"No description found for listing {listing.get('id', 'unknown')}")
+                self._add_empty_analysis(listing)
+                continue
+            
+            # Match the rounding of the per-listing keyword analysis
+            total_score = min(round(float(total_scores[row]), 1), 10) if self.matrix_scorer.categories else 0
+            listing.update(self.matrix_scorer.analysis(row, total_score))
+        
+        return listings
+    
+    def _analyze_batch_spacy(self, listings):
+        """
+        Stream all descriptions through nlp.pipe and map the Docs back to
+        their listings in order.
+        
+        Args:
+            listings (list): Listings to analyze
+            
+        Returns:
+            list: Listings with added analysis results
+        """
+        pending = []
+        for listing in listings:
+            text = self._extract_text_for_analysis(listing)
+            if text:
+                pending.append((listing, text))
+            else:
+                logger.warning(f"No description found for listing {listing.get('id', 'unknown')}")
+                self._add_empty_analysis(listing)
+        
+        # Serve previously parsed descriptions from the doc cache
+        if self.doc_cache:
+            uncached = []
+            for listing, text in pending:
+                started = time.monotonic()
+                doc = self.doc_cache.get(text)
+                if doc is None:
+                    uncached.append((listing, text))
+                else:
+                    listing.update(self._analyze_spacy_doc(doc))
+                    self._record_call(time.monotonic() - started, cache_hit=True)
+            pending = uncached
+        
+        logger.info(
+            f"Processing {len(pending)} descriptions with nlp.pipe "
+            f"(batch_size={self.batch_size}, n_process={self.n_process})"
+        )
+        
+        # nlp.pipe yields Docs in input order, including with several processes
+        started = time.monotonic()
+        docs = self.nlp.pipe(
+            (text for _, text in pending),
+            batch_size=self.batch_size,
+            n_process=self.n_process
+        )
+        for (listing, text), doc in zip(pending, docs):
+            if self.doc_cache:
+                self.doc_cache.put(text, doc)
+            listing.update(self._analyze_spacy_doc(doc))
+        if pending:
+            self._record_call(time.monotonic() - started, listings=len(pending))
+        
+        if self.doc_cache:
+            stats = self.doc_cache.stats()
+            logger.info(
+                f"spaCy doc cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate)"
+            )
+        
+        return listings
+    
     def _extract_text_for_analysis(self, listing):
         """
         Extract text from listing for analysis.
@@ -109,12 +502,15 @@ class NLPAnalyzer:
         
         return text.strip()
     
-    def _add_empty_analysis(self, listing):
+    def _add_empty_analysis(self, listing, error=None):
         """
         Add empty analysis results to a listing.
         
         Args:
             listing (dict): Original listing
+            error (Exception, optional): Error that stopped the analysis; the
+                listing is then marked as failed in 'analysis_metadata', so
+                its zeros are not mistaken for a real low score
             
         Returns:
             dict: Listing with empty analysis results
@@ -134,6 +530,15 @@ class NLPAnalyzer:
             },
             'total_score': 0
         })
+        if error is not None:
+            listing['summary'] = f"Error analyzing listing: {error}"
+            listing['analysis_metadata'] = {
+                'model': getattr(self, 'model', self.provider),
+                'attempts': getattr(error, 'attempts', []),
+                'cached': False,
+                'failed': True,
+                'error': str(error)
+            }
         return listing
     
     def _analyze_with_keywords(self, text):
@@ -146,22 +551,13 @@ class NLPAnalyzer:
         Returns:
             dict: Analysis results
         """
-        # Normalize text for consistent matching
-        text = text.lower()
-        
         results = {}
         
+        # Scan the text once for whole word matches of every keyword
+        category_matches = self.keyword_matcher.matched_keywords(text)
+        
         # For each category of keywords
-        for category, keywords in self.keywords.items():
-            matches = []
-            
-            # Check each keyword for matches
-            for keyword in keywords:
-                # Use regex to find whole word matches
-                pattern = r'\b' + re.escape(keyword.lower()) + r'\b'
-                if re.search(pattern, text):
-                    matches.append(keyword)
-            
+        for category, matches in category_matches.items():
             # Calculate score based on number of matches
             score = min(len(matches) * 2, 10) if matches else 0
             
@@ -185,6 +581,78 @@ class NLPAnalyzer:
         
         return results
     
+    def _build_keyword_vectors(self):
+        """
+        Embed every keyword once into a normalized NumPy matrix.
+        
+        Each keyword is represented by the vector of its first token, matching
+        the token-level similarity comparison. Keywords without a vector are
+        left out of the matrix.
+        """
+        vectors = []
+        self.category_keyword_columns = {}
+        
+        for category, keywords in self.keywords.items():
+            columns = []
+            for keyword in keywords:
+                # Vectors come from the vocab, so the tokenizer alone is enough
+                keyword_doc = self.nlp.make_doc(keyword)
+                if len(keyword_doc) == 0 or not keyword_doc[0].has_vector:
+                    continue
+                columns.append(len(vectors))
+                vectors.append(keyword_doc[0].vector)
+            self.category_keyword_columns[category] = np.array(columns, dtype=int)
+        
+        width = self.nlp.vocab.vectors_length
+        self.keyword_vectors = self._normalize_rows(
+            np.array(vectors, dtype=np.float32).reshape(len(vectors), width)
+        )
+        
+        logger.info(f"Embedded {len(vectors)} keyword vectors for similarity matching")
+    
+    def _build_phrase_matcher(self):
+        """
+        Build a case-insensitive PhraseMatcher with one match key per category,
+        so multi-word keywords like "must sell" are found exactly.
+        """
+        self.phrase_matcher = PhraseMatcher(self.nlp.vocab, attr='LOWER')
+        for category, keywords in self.keywords.items():
+            patterns = [self.nlp.make_doc(keyword) for keyword in keywords if keyword]
+            if patterns:
+                self.phrase_matcher.add(category, patterns)
+    
+    def _normalize_rows(self, matrix):
+        """
+        Scale each row of a matrix to unit length, leaving zero rows at zero.
+        
+        Args:
+            matrix (numpy.ndarray): Matrix of vectors
+            
+        Returns:
+            numpy.ndarray: Row-normalized matrix
+        """
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    
+    def _token_similarities(self, tokens):
+        """
+        Cosine similarity of tokens against every keyword vector.
+        
+        Args:
+            tokens (list): spaCy tokens to compare
+            
+        Returns:
+            numpy.ndarray: Tokens x keywords similarity matrix (zero for tokens without vectors)
+        """
+        width = self.keyword_vectors.shape[1]
+        token_vectors = np.zeros((len(tokens), width), dtype=np.float32)
+        for index, token in enumerate(tokens):
+            if token.has_vector:
+                token_vectors[index] = token.vector
+        
+        # One matrix multiply scores every token against every keyword
+        return self._normalize_rows(token_vectors) @ self.keyword_vectors.T
+    
     def _analyze_with_spacy(self, text):
         """
         Analyze text using spaCy NLP.
@@ -195,31 +663,55 @@ class NLPAnalyzer:
         Returns:
             dict: Analysis results
         """
-        # Process text with spaCy
-        doc = self.nlp(text)
+        # Process text with spaCy, unless it was parsed before
+        doc = self.doc_cache.get(text) if self.doc_cache else None
+        if doc is None:
+            doc = self.nlp(text)
+            if self.doc_cache:
+                self.doc_cache.put(text, doc)
+        
+        return self._analyze_spacy_doc(doc)
+    
+    def _analyze_spacy_doc(self, doc):
+        """
+        Analyze a parsed spaCy document.
+        
+        Args:
+            doc (spacy.tokens.Doc): Parsed text
+            
+        Returns:
+            dict: Analysis results
+        """
+        # Exact phrase hits, keyed by the token where each phrase starts
+        phrase_starts = {category: {} for category in self.keywords}
+        claimed = np.zeros(len(doc), dtype=bool)
+        for match_id, start, end in self.phrase_matcher(doc):
+            category = self.nlp.vocab.strings[match_id]
+            phrase_starts[category].setdefault(start, []).append(doc[start:end].text)
+            claimed[start:end] = True
+        
+        # Semantic similarity only runs on tokens the matcher left unclaimed
+        unclaimed = np.flatnonzero(~claimed)
+        similarities = self._token_similarities([doc[int(index)] for index in unclaimed])
         
         # Similar structure to keyword matching, but with more sophisticated NLP
         results = {}
         
         # For each category of keywords
-        for category, keywords in self.keywords.items():
+        for category in self.keywords:
             matches = []
             
-            # Create a combined pattern for this category
-            category_keywords = [k.lower() for k in keywords]
+            # Unclaimed tokens semantically similar to any keyword in this category
+            columns = self.category_keyword_columns[category]
+            similar = np.zeros(len(doc), dtype=bool)
+            similar[unclaimed] = (similarities[:, columns] > self.similarity_threshold).any(axis=1)
             
-            # Find phrases that match keywords semantically
+            # Collect exact phrases and similar tokens in document order
             for token in doc:
-                if token.text.lower() in category_keywords:
+                if token.i in phrase_starts[category]:
+                    matches.extend(phrase_starts[category][token.i])
+                elif similar[token.i] and token.text not in matches:
                     matches.append(token.text)
-                else:
-                    # Check for semantic similarity
-                    for keyword in keywords:
-                        keyword_doc = self.nlp(keyword)
-                        if token.has_vector and keyword_doc[0].has_vector:
-                            similarity = token.similarity(keyword_doc[0])
-                            if similarity > 0.7 and token.text not in matches:
-                                matches.append(token.text)
             
             # Calculate score based on number of matches
             score = min(len(matches) * 2, 10) if matches else 0
@@ -246,7 +738,7 @@ class NLPAnalyzer:
     
     def _analyze_with_openai(self, text, listing):
         """
-        Analyze text using OpenAI's API.
+        Analyze text using OpenAI's API, through the shared OpenAIAnalyzer.
         
         Args:
             text (str): Text to analyze
@@ -255,63 +747,306 @@ class NLPAnalyzer:
         Returns:
             dict: Analysis results
         """
-        try:
-            # Construct prompt for OpenAI
-            prompt = f"""
-            Analyze the following commercial real estate listing description to evaluate its investment potential.
-            Focus on three key areas:
-            1. Seller Motivation: Signs of distress, urgency, or financial issues (e.g., "must sell," "priced to sell quickly").
-            2. Transaction Complexity: Indicators like legal complexities or title issues (e.g., "foreclosure," "bankruptcy").
-            3. Property Characteristics: Upside potential factors (e.g., "below-market rents," "deferred maintenance").
-            
-            For each category, provide:
-            - A score from 0-10 (higher = stronger indicators)
-            - A list of specific factors found in the text
+        listing_data = self._openai_listing(listing, text)
+        result = self.openai_analyzer.analyze_listing(listing_data)
+        self._copy_compaction(listing_data, listing)
+        return self._category_analysis(result)
+    
+    def _openai_listing(self, listing, text):
+        """
+        Describe a listing the way OpenAIAnalyzer builds its prompts from, so
+        every entry point sends (and caches) the same request for the same listing.
+        
+        Args:
+            listing (dict): Listing data as scraped
+            text (str): Text extracted for analysis
             
-            Finally, calculate a total investment score (0-10).
+        Returns:
+            dict: name, property_type, location, price and description
+        """
+        return {
+            'name': listing.get('title') or listing.get('name') or 'Unknown',
+            'property_type': listing.get('propertyType') or listing.get('property_type') or 'Unknown',
+            'location': listing.get('address') or listing.get('location') or 'Unknown',
+            'price': listing.get('price', 'Unknown'),
+            'description': text
+        }
+    
+    def _openai_request(self, listing, text):
+        """
+        Build the OpenAI request for a listing.
+        
+        Args:
+            listing (dict): Listing data as scraped
+            text (str): Text extracted for analysis
             
-            Respond in JSON format only.
+        Returns:
+            tuple: (chat completion parameters, response cache key)
+        """
+        listing_data = self._openai_listing(listing, text)
+        params = self.openai_analyzer.request_params(listing_data)
+        self._copy_compaction(listing_data, listing)
+        return params, ResponseCache.key_for_params(params, ANALYZER_VERSION)
+    
+    def _copy_compaction(self, listing_data, listing):
+        """Keep the compaction statistics OpenAIAnalyzer recorded on the listing."""
+        if 'compaction' in listing_data:
+            listing['compaction'] = listing_data['compaction']
+    
+    def _category_analysis(self, result):
+        """
+        Convert an OpenAIAnalyzer result to this analyzer's per-category format.
+        
+        Args:
+            result (dict): Result as returned by OpenAIAnalyzer
             
-            Property Type: {listing.get('propertyType', 'Unknown')}
-            Price: {listing.get('price', 'Unknown')}
-            Location: {listing.get('address', 'Unknown')}
+        Returns:
+            dict: score and factors (plus the model's explanation) per category,
+                total_score, summary and analysis_metadata (model, attempts,
+                cached, failed and error)
+        """
+        analysis = {}
+        for category in OPENAI_CATEGORIES:
+            section = result.get(f"{category}_analysis") or {}
+            analysis[category] = {
+                'score': result.get(f"{category}_score", 0),
+                'factors': section.get('keywords', []),
+                'explanation': section.get('explanation', '')
+            }
+        analysis['total_score'] = result.get('total_score', 0)
+        analysis['summary'] = result.get('summary', '')
+        
+        # Whether the analysis failed and every attempt made, as in OpenAIAnalyzer's metadata
+        metadata = result.get('metadata') or {}
+        analysis['analysis_metadata'] = {
+            'model': metadata.get('model', self.model),
+            'attempts': metadata.get('attempts', []),
+            'cached': metadata.get('cached', False),
+            'failed': metadata.get('failed', False),
+            'error': analysis['summary'].removeprefix("Error analyzing listing: ") if metadata.get('failed') else None
+        }
+        return analysis
+    
+    def _parse_openai_analysis(self, content):
+        """
+        Parse an OpenAI response, repairing malformed JSON, and check its structure.
+        
+        Args:
+            content (str): Response message content
             
-            Description: {text}
-            """
+        Returns:
+            dict: Result in OpenAIAnalyzer's format, as stored in the response cache
             
-            # Make API call
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a commercial real estate investment analyst. Analyze listings for investment potential."},
-                    {"role": "user", "content": prompt}
-                ],
-                response_format={"type": "json_object"}
+        Raises:
+            InvalidResponseError: If the response cannot be repaired or lacks required fields
+        """
+        return parse_response(content, RESULT_SCHEMA)
+    
+    def _record_call(self, latency, usage=None, retries=0, cache_hit=False, error=None, listings=1, batch=False):
+        """
+        Emit a metrics record for one analyzer call. OpenAI calls are recorded
+        by the OpenAI analyzer, which also keeps the token usage totals.
+        
+        Args:
+            latency (float): Wall time of the call in seconds, or None if unknown
+            usage: Usage object or dict from an OpenAI response, or None
+            retries (int): Attempts made beyond the first
+            cache_hit (bool): Whether the result came from a cache
+            error (Exception, optional): Error if the call failed
+            listings (int): Listings covered by the call
+            batch (bool): Whether the call went through the Batch API
+        """
+        if self.provider == 'openai':
+            self.openai_analyzer.record_call(
+                self.model, latency, usage, retries=retries, cache_hit=cache_hit,
+                error=error, listings=listings, batch=batch
             )
+            return
+        
+        get_metrics().record(
+            self.provider,
+            latency=latency,
+            retries=retries,
+            cache_hit=cache_hit,
+            cost=0.0,
+            error=error,
+            listings=listings
+        )
+    
+    def _cached_openai_analysis(self, cache_key):
+        """
+        Look up a stored OpenAI result, recording the cache hit.
+        
+        Args:
+            cache_key (str): Response cache key
             
-            # Parse response
-            result = response.choices[0].message.content
-            import json
-            analysis = json.loads(result)
+        Returns:
+            dict: Analysis results, or None if not cached or unreadable
+        """
+        if not self.response_cache:
+            return None
+        
+        started = time.monotonic()
+        content = self.response_cache.get(cache_key)
+        if content is None:
+            return None
+        try:
+            result = self._parse_openai_analysis(content)
+            result['metadata'] = {'model': self.model, 'attempts': [], 'cached': True, 'failed': False}
+            analysis = self._category_analysis(result)
+        except InvalidResponseError:
+            logger.warning(f"Ignoring unreadable cached response {cache_key}")
+            return None
+        
+        self._record_call(time.monotonic() - started, cache_hit=True)
+        return analysis
+    
+    def _cache_openai_analysis(self, cache_key, result):
+        """
+        Store a validated result in the response cache.
+        
+        The repaired JSON is stored, in OpenAIAnalyzer's format, so cache hits
+        never need repairing again and every entry point can read it. Invalid
+        responses are never passed here; they fall back to the empty analysis
+        and are retried next run.
+        
+        Args:
+            cache_key (str): Response cache key
+            result (dict): Result returned by _parse_openai_analysis
+        """
+        if self.response_cache:
+            self.response_cache.put(cache_key, self.model, json.dumps(result))
+    
+    def _analyze_batch_openai(self, listings):
+        """
+        Analyze listings concurrently with AsyncOpenAI instead of one blocking
+        call at a time, through the Batch API when batch mode is enabled, or
+        several listings per request when packing is enabled.
+        
+        Args:
+            listings (list): Listings to analyze
             
-            # Ensure proper structure
-            if not all(k in analysis for k in ['seller_motivation', 'transaction_complexity', 'property_characteristics', 'total_score']):
-                logger.warning("OpenAI response missing required fields")
-                return self._add_empty_analysis(listing)
+        Returns:
+            list: Listings with added analysis results
+        """
+        pending = []
+        for listing in listings:
+            text = self._extract_text_for_analysis(listing)
+            if text:
+                pending.append((listing, text))
+            else:
+                logger.warning(f"No description found for listing {listing.get('id', 'unknown')}")
+                self._add_empty_analysis(listing)
+        
+        if pending and self.batch_job:
+            self._analyze_openai_with_batch_api(pending)
+        elif pending and self.packing:
+            self._analyze_openai_packed(pending)
+        elif pending:
+            # On the shared event loop, so this also works when the calling
+            # thread already runs one (Streamlit, notebooks)
+            run_async(self._analyze_openai_concurrently(pending))
+        
+        return listings
+    
+    def _analyze_openai_with_batch_api(self, pending):
+        """
+        Submit the OpenAI requests for pending listings as one Batch API job
+        and join the results back by custom_id.
+        
+        Args:
+            pending (list): (listing, text) tuples
+        """
+        # Identical requests share a custom_id, so each is only paid for once
+        requests = {}
+        waiting = {}
+        for listing, text in pending:
+            params, custom_id = self._openai_request(listing, text)
             
-            return analysis
+            analysis = self._cached_openai_analysis(custom_id)
+            if analysis is not None:
+                listing.update(analysis)
+                continue
             
-        except Exception as e:
-            logger.error(f"Error analyzing with OpenAI: {e}")
-            return self._add_empty_analysis(listing)
+            requests[custom_id] = params
+            waiting.setdefault(custom_id, []).append(listing)
+        
+        if self.response_cache:
+            logger.info(f"Served {len(pending) - sum(len(group) for group in waiting.values())} listings from the response cache")
+        
+        results = self.batch_job.run(requests)
+        
+        for custom_id, listings in waiting.items():
+            result = results[custom_id]
+            # Per-request latency is not known for batches
+            self._record_call(None, result.get('usage'), error=result['error'], listings=len(listings), batch=True)
+            for listing in listings:
+                try:
+                    if result['error']:
+                        raise ValueError(result['error'])
+                    parsed = self._parse_openai_analysis(result['content'])
+                    self._cache_openai_analysis(custom_id, parsed)
+                    parsed['metadata'] = {'model': self.model, 'attempts': [], 'cached': False, 'failed': False}
+                    listing.update(self._category_analysis(parsed))
+                except Exception as e:
+                    logger.error(f"Error analyzing with OpenAI: {e}")
+                    self._add_empty_analysis(listing, error=e)
+    
+    def _analyze_openai_packed(self, pending):
+        """
+        Analyze pending listings with several listings packed into each
+        request, through OpenAIAnalyzer.analyze_packed.
+        
+        Args:
+            pending (list): (listing, text) tuples
+        """
+        listing_data = [self._openai_listing(listing, text) for listing, text in pending]
+        results = self.openai_analyzer.analyze_packed(
+            listing_data,
+            max_listings=self.packing.get('max_listings', 8),
+            max_request_tokens=self.packing.get('max_request_tokens', 8000)
+        )
+        
+        for (listing, _), data, result in zip(pending, listing_data, results):
+            self._copy_compaction(data, listing)
+            listing.update(self._category_analysis(result))
+    
+    async def _analyze_openai_concurrently(self, pending):
+        """
+        Run the OpenAI requests for pending listings concurrently under the
+        rate limiter, through OpenAIAnalyzer.analyze_many.
+        
+        Args:
+            pending (list): (listing, text) tuples
+        """
+        concurrency = self.config.get('concurrency', {})
+        listing_data = [self._openai_listing(listing, text) for listing, text in pending]
+        
+        completed = 0
+        async for index, result in self.openai_analyzer.analyze_many(
+            listing_data,
+            max_concurrency=concurrency.get('max_concurrency', 8),
+            requests_per_minute=concurrency.get('requests_per_minute', 500),
+            tokens_per_minute=concurrency.get('tokens_per_minute', 200000),
+            max_retries=concurrency.get('max_retries', 5)
+        ):
+            listing = pending[index][0]
+            self._copy_compaction(listing_data[index], listing)
+            listing.update(self._category_analysis(result))
+            
+            completed += 1
+            if completed % 100 == 0:
+                logger.info(f"Completed OpenAI analysis for {completed}/{len(pending)} listings")
 
-def analyze_listings(listings, nlp_config):
+def analyze_listings(listings, nlp_config, analyzer=None):
     """
     Analyze a list of listings using NLP techniques.
     
     Args:
         listings (list): List of listings from LoopNet
         nlp_config (dict): NLP configuration
+        analyzer (NLPAnalyzer, optional): Analyzer to reuse, e.g. across the
+            batches of a pipeline, instead of loading one for this call
         
     Returns:
         list: Listings with added analysis
@@ -320,13 +1055,10 @@ def analyze_listings(listings, nlp_config):
         logger.info(f"Analyzing {len(listings)} listings with NLP")
         
         # Initialize NLP analyzer
-        analyzer = NLPAnalyzer(nlp_config)
+        analyzer = analyzer or NLPAnalyzer(nlp_config)
         
-        # Process each listing
-        analyzed_listings = []
-        for listing in listings:
-            analyzed_listing = analyzer.analyze_listing(listing)
-            analyzed_listings.append(analyzed_listing)
+        # Process the listings, in one batch where the provider supports it
+        analyzed_listings = analyzer.analyze_batch(listings)
         
         logger.info(f"Completed NLP analysis for {len(analyzed_listings)} listings")
         return analyzed_listings
@@ -10,29 +10,77 @@ and property characteristics.
 import logging
 import os
 import json
-from openai import OpenAI
+import time
+import threading
+
+from analyzer.clients import adapt_params, get_async_client, get_client, get_profile
+from analyzer.json_repair import INVALID_RESPONSE_RETRIES, InvalidResponseError, parse_response, repair_json, validate
+from analyzer.json_stream import IncrementalJSONParser
+from analyzer.metrics import get_metrics
+from analyzer.pricing import estimate_cost
+from analyzer.rate_limit import estimate_request_tokens, estimate_tokens, get_rate_limiter, run_concurrently
+from analyzer.resilience import CallFailedError, count_retries, get_resilient_caller, is_retryable
+from analyzer.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompts or result format change so cached responses are not reused.
+# Shared by every entry point (including NLPAnalyzer's openai provider), so they reuse each other's results
+ANALYZER_VERSION = "openai-analyzer-1"
+
+# Fields every per-listing analysis must contain
+RESULT_SCORE_FIELDS = ['seller_motivation_score', 'transaction_complexity_score',
+                       'property_characteristics_score', 'total_score']
+RESULT_ANALYSIS_FIELDS = ['seller_motivation_analysis', 'transaction_complexity_analysis',
+                          'property_characteristics_analysis']
+
+# Schema results are repaired and validated against; see analyzer.json_repair
+RESULT_SCHEMA = dict(
+    {field: float for field in RESULT_SCORE_FIELDS},
+    **{field: {'explanation': str, 'keywords': list} for field in RESULT_ANALYSIS_FIELDS},
+    summary=str
+)
+
+# Completion allowance per listing in a packed request
+PACKED_COMPLETION_TOKENS_PER_LISTING = 600
+
 class OpenAIAnalyzer:
     """
     Class for analyzing commercial real estate listings using OpenAI
     """
     
-    def __init__(self, api_key=None, model="o1"):
+    def __init__(self, api_key=None, model="o1", cache=None, compactor=None, router=None, min_quality=None,
+                 resilience=None):
         """
         Initialize the OpenAI analyzer
         
         Args:
             api_key (str, optional): OpenAI API key. If not provided, will look for OPENAI_API_KEY environment variable
             model (str, optional): OpenAI model to use. Defaults to 'o1'
+            cache (ResponseCache, optional): Cache of previous responses, shared across entry points
+            compactor (DescriptionCompactor, optional): Shortens long descriptions before they are sent
+            router (ModelRouter, optional): Picks the fastest healthy model per request instead of 'model'
+            min_quality (int, optional): Minimum model quality tier for the router
+            resilience (ResilientCaller, optional): Retry, circuit breaker and hedging
+                policy for model calls. Defaults to the shared default policy
         """
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not provided and not found in environment variables")
         
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        self.cache = cache
+        self.compactor = compactor
+        self.router = router
+        self.min_quality = min_quality
+        self.resilience = resilience or get_resilient_caller()
+        
+        # Token usage reported by the API, for cost reporting
+        self.usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self._usage_lock = threading.Lock()
+        
+        # Pooled client shared by every analyzer in the process
+        self.client = get_client(self.api_key)
         logger.info(f"Initialized OpenAI analyzer with model: {model}")
     
     def analyze_listing(self, listing_data):
@@ -45,10 +93,592 @@ class OpenAIAnalyzer:
                 'name', 'property_type', 'location', 'price'
         
         Returns:
-            dict: Analysis results with scores and explanations
+            dict: Analysis results with scores and explanations, plus 'metadata'
+                with the model used, every attempt made and whether the
+                analysis failed or came from the cache
+        """
+        property_name = listing_data.get('name', 'Unknown')
+        params = self.request_params(listing_data)
+        
+        # Reuse the stored response if this exact request was analyzed before
+        started = time.monotonic()
+        cached, cached_model = self.cached_routed_result(params)
+        if cached is not None:
+            logger.info(f"Using cached OpenAI analysis for listing: {property_name}")
+            self.record_call(cached_model, time.monotonic() - started, cache_hit=True)
+            cached['metadata'] = {'model': cached_model, 'attempts': [], 'cached': True, 'failed': False}
+            return cached
+        
+        metadata = {'model': self.model, 'attempts': [], 'cached': False, 'failed': False}
+        try:
+            # Malformed responses are repaired locally; only unrecoverable ones are requested again
+            for request_number in range(INVALID_RESPONSE_RETRIES + 1):
+                started = time.monotonic()
+                response = None
+                attempts = []
+                try:
+                    # Call OpenAI API, retrying transient errors
+                    logger.info(f"Sending request to OpenAI for listing: {property_name}")
+                    if self.router:
+                        response, metadata['model'], attempts = self.router.complete(
+                            params, self.min_quality, caller=self.resilience
+                        )
+                        logger.info(f"Routed request for {property_name} to {metadata['model']}")
+                    else:
+                        response, attempts = self.resilience.call(
+                            self.model,
+                            lambda: self.client.with_options(max_retries=0).chat.completions.create(**params)
+                        )
+                    
+                    # Extract and parse the response
+                    result_text = response.choices[0].message.content
+                    logger.debug(f"OpenAI response: {result_text}")
+                    result = parse_response(result_text, RESULT_SCHEMA)
+                except Exception as e:
+                    attempts = getattr(e, 'attempts', attempts)
+                    metadata['attempts'].extend(attempts)
+                    self.record_call(
+                        metadata['model'],
+                        time.monotonic() - started,
+                        response.usage if response else None,
+                        retries=count_retries(attempts),
+                        error=e
+                    )
+                    if not isinstance(e, InvalidResponseError) or request_number == INVALID_RESPONSE_RETRIES:
+                        raise
+                    logger.warning(f"Unrecoverable response for {property_name}, requesting again: {e}")
+                    continue
+                
+                metadata['attempts'].extend(attempts)
+                self.record_call(
+                    metadata['model'], time.monotonic() - started, response.usage, retries=count_retries(attempts)
+                )
+                break
+            
+            if self.cache:
+                # Stored under the model that answered, which the router may have picked
+                self.cache.put(self.cache_key(params, metadata['model']), metadata['model'], json.dumps(result))
+            
+            result['metadata'] = metadata
+            return result
+            
+        except Exception as e:
+            if isinstance(e, CallFailedError):
+                e = e.last_error
+            logger.error(f"Error in OpenAI API call: {e}")
+            # Return a default response structure in case of error, marked as failed
+            result = self._error_result(e)
+            metadata['failed'] = True
+            result['metadata'] = metadata
+            return result
+    
+    def analyze_listing_stream(self, listing_data):
+        """
+        Analyze a listing, streaming the response and yielding partial results
+        
+        Each top-level field is added to the partial result as soon as its value
+        has finished streaming, so the scores are available long before the
+        explanations and summary. Retries only cover establishing the stream;
+        an error mid-stream ends the analysis with a failed result.
+        
+        Args:
+            listing_data (dict): Dictionary containing listing details, as for analyze_listing
+        
+        Yields:
+            dict: The result so far, growing by one field at a time. The last
+                result is complete and carries 'metadata' as in analyze_listing
+        """
+        property_name = listing_data.get('name', 'Unknown')
+        params = self.request_params(listing_data)
+        
+        started = time.monotonic()
+        cached, cached_model = self.cached_routed_result(params)
+        if cached is not None:
+            logger.info(f"Using cached OpenAI analysis for listing: {property_name}")
+            self.record_call(cached_model, time.monotonic() - started, cache_hit=True)
+            cached['metadata'] = {'model': cached_model, 'attempts': [], 'cached': True, 'failed': False}
+            yield cached
+            return
+        
+        metadata = {'model': self.model, 'attempts': [], 'cached': False, 'failed': False}
+        # The final chunk carries the token usage
+        stream_params = dict(params, stream=True, stream_options={'include_usage': True})
+        usage = None
+        try:
+            logger.info(f"Streaming request to OpenAI for listing: {property_name}")
+            if self.router:
+                stream, metadata['model'], metadata['attempts'] = self.router.complete(
+                    stream_params, self.min_quality, caller=self.resilience
+                )
+                logger.info(f"Routed request for {property_name} to {metadata['model']}")
+            else:
+                stream, metadata['attempts'] = self.resilience.call(
+                    self.model,
+                    lambda: self.client.with_options(max_retries=0).chat.completions.create(**stream_params)
+                )
+            
+            parser = IncrementalJSONParser()
+            partial = {}
+            chunks = []
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                chunks.append(chunk.choices[0].delta.content)
+                for field, value in parser.feed(chunks[-1]):
+                    partial[field] = value
+                    yield partial
+            
+            # The complete text is parsed again so only valid results are cached
+            result_text = "".join(chunks)
+            logger.debug(f"OpenAI response: {result_text}")
+            result = parse_response(result_text, RESULT_SCHEMA)
+            self.record_call(
+                metadata['model'], time.monotonic() - started, usage, retries=count_retries(metadata['attempts'])
+            )
+            
+            if self.cache:
+                # Stored under the model that answered, which the router may have picked
+                self.cache.put(self.cache_key(params, metadata['model']), metadata['model'], json.dumps(result))
+            
+            result['metadata'] = metadata
+            yield result
+            
+        except Exception as e:
+            if isinstance(e, CallFailedError):
+                metadata['attempts'] = e.attempts
+                e = e.last_error
+            self.record_call(
+                metadata['model'], time.monotonic() - started, usage,
+                retries=count_retries(metadata['attempts']), error=e
+            )
+            logger.error(f"Error in streaming OpenAI API call: {e}")
+            result = self._error_result(e)
+            metadata['failed'] = True
+            result['metadata'] = metadata
+            yield result
+    
+    async def analyze_many(self, listings, max_concurrency=8, requests_per_minute=500,
+                           tokens_per_minute=200000, max_retries=5):
+        """
+        Analyze many listings concurrently with AsyncOpenAI.
+        
+        Requests run under a bounded, adaptive concurrency limit and token
+        buckets for requests and tokens per minute, shared with every other
+        call using the same API key and model in this process. Results are
+        yielded as soon as each call completes, so the order differs from the
+        input order. Run this on the shared event loop, with
+        analyzer.rate_limit.run_async.
+        
+        Args:
+            listings (list): Listing dicts as accepted by analyze_listing
+            max_concurrency (int): Maximum number of requests in flight
+            requests_per_minute (int): Request budget per minute
+            tokens_per_minute (int): Token budget per minute
+                (the limits of the first call in the process apply)
+            max_retries (int): Retries per listing after 429 responses
+            
+        Yields:
+            tuple: (index, result) where index is the listing's position in
+                listings and result matches analyze_listing, including 'metadata'
+        """
+        # Retries are handled by run_concurrently
+        client = get_async_client(self.api_key)
+        limiter = get_rate_limiter(
+            self.api_key,
+            self.model,
+            max_concurrency=max_concurrency,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute
+        )
+        
+        jobs = []
+        attempts = {}
+        for index, listing_data in enumerate(listings):
+            params = self.request_params(listing_data)
+            cache_key = ResponseCache.key_for_params(params, ANALYZER_VERSION)
+            
+            started = time.monotonic()
+            cached = self.cached_result(cache_key)
+            if cached is not None:
+                self.record_call(self.model, time.monotonic() - started, cache_hit=True)
+                cached['metadata'] = {'model': self.model, 'attempts': [], 'cached': True, 'failed': False}
+                yield index, cached
+                continue
+            
+            attempts[index] = []
+            jobs.append((
+                index, estimate_request_tokens(params), self._async_call(client, params, cache_key, attempts[index])
+            ))
+        
+        if self.cache:
+            logger.info(f"Served {len(listings) - len(jobs)} listings from the response cache")
+        if not jobs:
+            return
+        
+        logger.info(f"Analyzing {len(jobs)} listings with up to {limiter.max_concurrency} concurrent requests")
+        
+        async for index, result, error in run_concurrently(
+            jobs, limiter, max_retries=max_retries, retryable=is_retryable
+        ):
+            if error is not None:
+                logger.error(f"Error in OpenAI API call for listing {listings[index].get('name', index)}: {error}")
+                result = self._error_result(error)
+            result['metadata'] = {
+                'model': self.model, 'attempts': attempts[index], 'cached': False, 'failed': error is not None
+            }
+            yield index, result
+    
+    def analyze_packed(self, listings, max_listings=8, max_request_tokens=8000):
+        """
+        Analyze listings with several listings packed into each request.
+        
+        The system prompt is sent once per group instead of once per listing.
+        Groups are filled greedily up to max_listings and an estimated token
+        budget per request. Listings missing from a packed response, or with a
+        malformed entry, fall back to a single-listing analyze_listing call.
+        Reasoning models are never packed: their reasoning tokens count against
+        the completion allowance, so packed responses are regularly cut off and
+        every listing would be requested again.
+        
+        Args:
+            listings (list): Listing dicts as accepted by analyze_listing
+            max_listings (int): Maximum listings per request
+            max_request_tokens (int): Estimated prompt plus completion token budget per request
+            
+        Returns:
+            list: Analysis results in input order, each with 'metadata' as
+                returned by analyze_listing
+        """
+        if get_profile(self.model)['reasoning']:
+            logger.info(f"Not packing requests for reasoning model {self.model}")
+            return [self.analyze_listing(listing_data) for listing_data in listings]
+        
+        results = [None] * len(listings)
+        
+        # Listings analyzed before, in either mode, are served from the cache
+        pending = []
+        for index, listing_data in enumerate(listings):
+            cache_key = ResponseCache.key_for_params(self.request_params(listing_data), ANALYZER_VERSION)
+            started = time.monotonic()
+            cached = self.cached_result(cache_key)
+            if cached is not None:
+                self.record_call(self.model, time.monotonic() - started, cache_hit=True)
+                cached['metadata'] = {'model': self.model, 'attempts': [], 'cached': True, 'failed': False}
+                results[index] = cached
+            else:
+                pending.append((index, cache_key))
+        
+        groups = self._pack_groups(listings, pending, max_listings, max_request_tokens)
+        logger.info(f"Analyzing {len(pending)} listings in {len(groups)} packed requests")
+        
+        fallback = []
+        for group in groups:
+            if len(group) == 1:
+                fallback.extend(group)
+                continue
+            
+            packed_results, attempts = self._analyze_group(listings, group)
+            for position, (index, cache_key) in enumerate(group):
+                result = packed_results.get(position)
+                if result is None:
+                    fallback.append((index, cache_key))
+                    continue
+                
+                if self.cache:
+                    self.cache.put(cache_key, self.model, json.dumps(result))
+                result['metadata'] = {'model': self.model, 'attempts': attempts, 'cached': False, 'failed': False}
+                results[index] = result
+        
+        if fallback:
+            logger.info(f"Analyzing {len(fallback)} listings with single-listing requests")
+        for index, _ in fallback:
+            results[index] = self.analyze_listing(listings[index])
+        
+        return results
+    
+    def _pack_groups(self, listings, pending, max_listings, max_request_tokens):
+        """
+        Group pending listings greedily under the per-request limits.
+        
+        Args:
+            listings (list): All listings
+            pending (list): (index, cache_key) tuples of listings to analyze
+            max_listings (int): Maximum listings per request
+            max_request_tokens (int): Estimated token budget per request
+            
+        Returns:
+            list: Lists of (index, cache_key) tuples, one per request
+        """
+        base_tokens = estimate_tokens(self._create_packed_system_prompt())
+        
+        groups = []
+        group = []
+        group_tokens = base_tokens
+        for index, cache_key in pending:
+            listing_tokens = estimate_tokens(
+                self._create_listing_block(len(group) + 1, listings[index])
+            ) + PACKED_COMPLETION_TOKENS_PER_LISTING
+            
+            if group and (len(group) >= max_listings or group_tokens + listing_tokens > max_request_tokens):
+                groups.append(group)
+                group = []
+                group_tokens = base_tokens
+            
+            group.append((index, cache_key))
+            group_tokens += listing_tokens
+        
+        if group:
+            groups.append(group)
+        
+        return groups
+    
+    def _analyze_group(self, listings, group):
+        """
+        Send one packed request and extract the valid per-listing results.
+        
+        Listings are introduced by their position in the request (1, 2, ...)
+        rather than their own IDs, which may be missing or repeated.
+        
+        Args:
+            listings (list): All listings
+            group (list): (index, cache_key) tuples in this request
+            
+        Returns:
+            tuple: (position in group -> analysis result for valid entries only,
+                attempts made by the resilient caller)
+        """
+        blocks = [self._create_listing_block(position + 1, listings[index]) for position, (index, _) in enumerate(group)]
+        params = adapt_params({
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": self._create_packed_system_prompt()},
+                {"role": "user", "content": self._create_packed_user_prompt(blocks)}
+            ],
+            'temperature': 0.2,
+            'max_tokens': PACKED_COMPLETION_TOKENS_PER_LISTING * len(group),
+            'response_format': {"type": "json_object"}
+        })
+        
+        started = time.monotonic()
+        response = None
+        attempts = []
+        try:
+            logger.info(f"Sending packed request to OpenAI for {len(group)} listings")
+            response, attempts = self.resilience.call(
+                self.model,
+                lambda: self.client.with_options(max_retries=0).chat.completions.create(**params)
+            )
+            result_text = response.choices[0].message.content
+            logger.debug(f"OpenAI response: {result_text}")
+            data = repair_json(result_text)
+            entries = data.get('results', []) if isinstance(data, dict) else data
+        except Exception as e:
+            attempts = getattr(e, 'attempts', attempts)
+            if isinstance(e, CallFailedError):
+                e = e.last_error
+            logger.error(f"Error in packed OpenAI API call: {e}")
+            self.record_call(
+                self.model, time.monotonic() - started, response.usage if response else None,
+                retries=count_retries(attempts), error=e, listings=len(group)
+            )
+            return {}, attempts
+        
+        self.record_call(
+            self.model, time.monotonic() - started, response.usage,
+            retries=count_retries(attempts), listings=len(group)
+        )
+        
+        results = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict) or 'listing_id' not in entry:
+                continue
+            listing_id = entry.pop('listing_id')
+            try:
+                position = int(str(listing_id).strip()) - 1
+            except ValueError:
+                logger.warning(f"Packed result for unknown listing {listing_id}")
+                continue
+            if not 0 <= position < len(group) or position in results:
+                logger.warning(f"Packed result for unknown or repeated listing {listing_id}")
+                continue
+            try:
+                results[position] = validate(entry, RESULT_SCHEMA)
+            except InvalidResponseError as e:
+                logger.warning(f"Malformed packed result for listing {listing_id}: {e}")
+        
+        return results, attempts
+    
+    def _async_call(self, client, params, cache_key=None, attempts=None):
+        """
+        Create a coroutine function for one request.
+        
+        Each attempt goes through the model's circuit breaker (and hedging)
+        in the resilient caller; retries are made by run_concurrently.
+        
+        Args:
+            client (AsyncOpenAI): Async client
+            params (dict): Chat completion parameters
+            cache_key (str, optional): Response cache key to store the result under
+            attempts (list, optional): Attempt records to append to, for the result metadata
+            
+        Returns:
+            callable: Coroutine function returning (parsed result, response headers)
+        """
+        attempts = attempts if attempts is not None else []
+        calls = []
+        
+        async def call():
+            # Each attempt is its own record; attempts after the first count as one retry
+            started = time.monotonic()
+            calls.append(started)
+            retries = 1 if len(calls) > 1 else 0
+            usage = None
+            try:
+                raw_response = await self.resilience.attempt_async(
+                    self.model,
+                    lambda: client.chat.completions.with_raw_response.create(**params),
+                    len(calls) - 1,
+                    attempts
+                )
+                response = raw_response.parse()
+                usage = response.usage
+                result_text = response.choices[0].message.content
+                logger.debug(f"OpenAI response: {result_text}")
+                result = parse_response(result_text, RESULT_SCHEMA)
+            except Exception as e:
+                self.record_call(self.model, time.monotonic() - started, usage, retries=retries, error=e)
+                raise
+            
+            self.record_call(self.model, time.monotonic() - started, usage, retries=retries)
+            if self.cache and cache_key:
+                self.cache.put(cache_key, self.model, json.dumps(result))
+            return result, raw_response.headers
+        
+        return call
+    
+    def record_call(self, model, latency, usage=None, retries=0, cache_hit=False, error=None, listings=1,
+                    batch=False):
+        """
+        Emit a metrics record for one OpenAI call, adding any token usage to
+        the running totals in 'usage'.
+        
+        Args:
+            model (str): Model used
+            latency (float): Wall time of the call in seconds, or None if unknown
+            usage: Usage object or dict from the response, or None
+            retries (int): Attempts made beyond the first
+            cache_hit (bool): Whether the result came from the response cache
+            error (Exception, optional): Error if the call failed
+            listings (int): Listings covered by the call
+            batch (bool): Whether the call went through the Batch API
+        """
+        if isinstance(usage, dict):
+            prompt_tokens = usage.get('prompt_tokens', 0) or 0
+            completion_tokens = usage.get('completion_tokens', 0) or 0
+        else:
+            prompt_tokens = getattr(usage, 'prompt_tokens', 0) or 0
+            completion_tokens = getattr(usage, 'completion_tokens', 0) or 0
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, batch=batch) if prompt_tokens or completion_tokens else 0.0
+        
+        if usage is not None:
+            with self._usage_lock:
+                self.usage['requests'] += 1
+                self.usage['prompt_tokens'] += prompt_tokens
+                self.usage['completion_tokens'] += completion_tokens
+        
+        get_metrics().record(
+            'openai',
+            model=model,
+            latency=latency,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            retries=retries,
+            cache_hit=cache_hit,
+            cost=cost,
+            error=error,
+            listings=listings,
+            batch=batch
+        )
+    
+    def cache_key(self, params, model=None):
+        """
+        Compute the response cache key of a request sent to a model.
+        
+        Args:
+            params (dict): Chat completion parameters from request_params
+            model (str, optional): Model the request goes to. Defaults to params['model']
+            
+        Returns:
+            str: Response cache key
+        """
+        if model and model != params['model']:
+            params = adapt_params(params, model)
+        return ResponseCache.key_for_params(params, ANALYZER_VERSION)
+    
+    def cached_routed_result(self, params):
+        """
+        Look up a stored analysis of a request from any model it may be sent to.
+        
+        Without a router that is the configured model; with one, every
+        candidate meeting the quality tier, in configured order.
+        
+        Args:
+            params (dict): Chat completion parameters from request_params
+            
+        Returns:
+            tuple: (parsed cached result, model that produced it), or (None, None)
+        """
+        if not self.cache:
+            return None, None
+        
+        models = [self.model]
+        if self.router:
+            min_quality = self.router.min_quality if self.min_quality is None else self.min_quality
+            models = [model for model in self.router.models if get_profile(model)['quality'] >= min_quality]
+        
+        for model in models:
+            cached = self.cached_result(self.cache_key(params, model))
+            if cached is not None:
+                return cached, model
+        return None, None
+    
+    def cached_result(self, cache_key):
+        """
+        Look up a previously stored analysis.
+        
+        Args:
+            cache_key (str): Response cache key
+            
+        Returns:
+            dict: Parsed cached result, or None if not cached
+        """
+        if not self.cache:
+            return None
+        
+        content = self.cache.get(cache_key)
+        if content is None:
+            return None
+        
+        try:
+            return json.loads(content)
+        except ValueError:
+            logger.warning(f"Ignoring unreadable cached response {cache_key}")
+            return None
+    
+    def request_params(self, listing_data):
+        """
+        Build the chat completion parameters for a listing.
+        
+        Args:
+            listing_data (dict): Dictionary containing listing details
+            
+        Returns:
+            dict: Parameters for chat.completions.create
         """
         # Extract the description and any other relevant fields
-        description = listing_data['description']
+        description = self._prepare_description(listing_data)
         property_name = listing_data.get('name', 'Unknown')
         property_type = listing_data.get('property_type', 'Unknown')
         location = listing_data.get('location', 'Unknown')
@@ -58,51 +688,73 @@ class OpenAIAnalyzer:
         system_prompt = self._create_system_prompt()
         user_prompt = self._create_user_prompt(description, property_name, property_type, location, price)
         
-        try:
-            # Call OpenAI API
-            logger.info(f"Sending request to OpenAI for listing: {property_name}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.2,  # Lower temperature for more consistent results
-                max_tokens=2000,
-                response_format={"type": "json_object"}
-            )
-            
-            # Extract and parse the response
-            result_text = response.choices[0].message.content
-            logger.debug(f"OpenAI response: {result_text}")
-            
-            # Parse JSON response
-            result = json.loads(result_text)
+        # Reasoning models need different parameters; see analyzer.clients
+        return adapt_params({
+            'model': self.model,
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': 0.2,  # Lower temperature for more consistent results
+            'max_tokens': 2000,
+            'response_format': {"type": "json_object"}
+        })
+    
+    def _prepare_description(self, listing_data):
+        """
+        Get the description to send, compacted to the token budget if enabled.
+        
+        The token counts before and after compaction are recorded on the
+        listing under 'compaction'.
+        
+        Args:
+            listing_data (dict): Dictionary containing listing details
             
-            return result
+        Returns:
+            str: Description text for the prompt
+        """
+        description = listing_data['description']
+        if not self.compactor:
+            return description
+        
+        compacted, stats = self.compactor.compact(description)
+        listing_data['compaction'] = stats
+        if stats['tokens_saved']:
+            logger.debug(
+                f"Compacted description of {listing_data.get('name', 'Unknown')} from "
+                f"{stats['original_tokens']} to {stats['compacted_tokens']} tokens"
+            )
+        return compacted
+    
+    def _error_result(self, error):
+        """
+        Create the default response structure returned when analysis fails.
+        
+        Args:
+            error (Exception): The error that occurred
             
-        except Exception as e:
-            logger.error(f"Error in OpenAI API call: {e}")
-            # Return a default response structure in case of error
-            return {
-                "seller_motivation_score": 0,
-                "transaction_complexity_score": 0,
-                "property_characteristics_score": 0,
-                "total_score": 0,
-                "seller_motivation_analysis": {
-                    "explanation": f"Error analyzing listing: {e}",
-                    "keywords": []
-                },
-                "transaction_complexity_analysis": {
-                    "explanation": f"Error analyzing listing: {e}",
-                    "keywords": []
-                },
-                "property_characteristics_analysis": {
-                    "explanation": f"Error analyzing listing: {e}",
-                    "keywords": []
-                },
-                "summary": f"Error analyzing listing: {e}"
-            }
+        Returns:
+            dict: Zero scores with the error as explanation
+        """
+        return {
+            "seller_motivation_score": 0,
+            "transaction_complexity_score": 0,
+            "property_characteristics_score": 0,
+            "total_score": 0,
+            "seller_motivation_analysis": {
+                "explanation": f"Error analyzing listing: {error}",
+                "keywords": []
+            },
+            "transaction_complexity_analysis": {
+                "explanation": f"Error analyzing listing: {error}",
+                "keywords": []
+            },
+            "property_characteristics_analysis": {
+                "explanation": f"Error analyzing listing: {error}",
+                "keywords": []
+            },
+            "summary": f"Error analyzing listing: {error}"
+        }
     
     def _create_system_prompt(self):
         """
@@ -208,3 +860,62 @@ class OpenAIAnalyzer:
         Analyze this listing for signs of seller motivation, transaction complexity, and valuable property characteristics.
         Return your analysis in the requested JSON format with scores, explanations, and keywords for each category.
         """
+    
+    def _create_packed_system_prompt(self):
+        """
+        Create system prompt for requests covering several listings
+        
+        Returns:
+            str: System prompt asking for one result per listing
+        """
+        return self._create_system_prompt() + """
+        You will be given several listings, each introduced by its Listing ID. Analyze each listing
+        independently and respond with a JSON object of the form:
+        {
+            "results": [
+                {"listing_id": "<Listing ID>", <all fields of the structure above>},
+                ...
+            ]
+        }
+        Include exactly one entry per listing, using the Listing ID exactly as given.
+        """
+    
+    def _create_listing_block(self, listing_id, listing_data):
+        """
+        Format one listing for a packed user prompt
+        
+        Args:
+            listing_id (int): Position of the listing in the request, used to key the result
+            listing_data (dict): Dictionary containing listing details
+            
+        Returns:
+            str: Listing details introduced by the Listing ID
+        """
+        return f"""
+        Listing ID: {listing_id}
+        Property Name: {listing_data.get('name', 'Unknown')}
+        Property Type: {listing_data.get('property_type', 'Unknown')}
+        Location: {listing_data.get('location', 'Unknown')}
+        Price: {listing_data.get('price', 'Unknown')}
+        
+        Listing Description:
+        {self._prepare_description(listing_data)}
+        """
+    
+    def _create_packed_user_prompt(self, blocks):
+        """
+        Create user prompt covering several listings
+        
+        Args:
+            blocks (list): Formatted listing blocks
+            
+        Returns:
+            str: User prompt with every listing's details
+        """
+        listings_text = "\n        ---\n".join(blocks)
+        return f"""
+        Please analyze each of the following {len(blocks)} commercial real estate listings:
+        {listings_text}
+        
+        Return one result per Listing ID in the requested JSON format with scores, explanations, and keywords for each category.
+        """
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Model Pricing Module
+
+This module estimates the cost of model calls from token usage, so runs can
+report what each analysis tier spent.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# USD per million (prompt, completion) tokens; override with the pricing config
+MODEL_PRICES = {
+    'o1': (15.00, 60.00),
+    'o1-mini': (1.10, 4.40),
+    'o3-mini': (1.10, 4.40),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4': (30.00, 60.00),
+    'gpt-3.5-turbo': (0.50, 1.50)
+}
+
+# Batch API requests are billed at half price
+BATCH_DISCOUNT = 0.5
+
+def estimate_cost(model, prompt_tokens, completion_tokens, batch=False, prices=None):
+    """
+    Estimate the cost of model usage.
+
+    Args:
+        model (str): Model name
+        prompt_tokens (int): Prompt tokens used
+        completion_tokens (int): Completion tokens used
+        batch (bool): Whether the requests went through the Batch API
+        prices (dict, optional): Model -> [prompt, completion] USD per million
+            tokens, overriding MODEL_PRICES
+
+    Returns:
+        float: Estimated cost in USD, or None if the model's price is unknown
+    """
+    price = (prices or {}).get(model) or MODEL_PRICES.get(model)
+    if price is None:
+        logger.warning(f"No price configured for model {model}")
+        return None
+
+    cost = (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting Module
+
+This module provides asyncio primitives for running many model calls
+concurrently without exceeding API limits: token buckets for requests and
+tokens per minute, an adaptive (AIMD) concurrency limit that reacts to 429
+responses and x-ratelimit-* headers, and a runner that yields results in
+completion order. Async calls run on one event loop per process, in a
+background thread, so synchronous callers in any thread can use them.
+"""
+
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Event loop shared by every thread for async model calls, started on first use
+_loop = None
+_loop_lock = threading.Lock()
+
+# Rate limiters shared by every caller, keyed by API key and model
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+# Rough characters-per-token ratio for English text, used for budgeting
+CHARS_PER_TOKEN = 4
+
+def get_event_loop():
+    """
+    Get the process-wide event loop for async model calls.
+
+    The loop runs forever in a daemon thread, so async clients and rate
+    limiters bound to it can be shared by every thread, and callers that run
+    an event loop of their own (Streamlit, notebooks) can still wait on it.
+
+    Returns:
+        asyncio.AbstractEventLoop: The running loop
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-model-calls", daemon=True).start()
+        return _loop
+
+def run_async(coroutine):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+
+    Unlike asyncio.run, this works whether or not the calling thread is
+    already running an event loop.
+
+    Args:
+        coroutine: Coroutine to run
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        RuntimeError: If called from a coroutine on the shared loop itself,
+            which would deadlock
+        Exception: Whatever the coroutine raised
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run_async cannot wait on the shared event loop from inside it; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+def estimate_tokens(text):
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def estimate_request_tokens(params):
+    """
+    Estimate the tokens a chat completion request counts against the limit.
+
+    Args:
+        params (dict): Chat completion parameters
+
+    Returns:
+        int: Approximate prompt tokens plus the completion token allowance
+    """
+    prompt_tokens = sum(estimate_tokens(message['content']) for message in params.get('messages', []))
+    completion_tokens = params.get('max_completion_tokens') or params.get('max_tokens') or 0
+    return prompt_tokens + completion_tokens
+
+def parse_reset_duration(value):
+    """
+    Parse an x-ratelimit-reset-* header value such as "1s", "250ms" or "6m0s".
+
+    Args:
+        value (str): Header value
+
+    Returns:
+        float: Duration in seconds, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+
+    seconds = 0.0
+    parts = re.findall(r'(\d+(?:\.\d+)?)(ms|h|m|s)', value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    for amount, unit in parts:
+        amount = float(amount)
+        if unit == 'ms':
+            seconds += amount / 1000
+        elif unit == 'h':
+            seconds += amount * 3600
+        elif unit == 'm':
+            seconds += amount * 60
+        else:
+            seconds += amount
+    return seconds
+
+def retry_after_seconds(headers):
+    """
+    Read the server's requested retry delay from response headers.
+
+    Args:
+        headers (Mapping): Response headers
+
+    Returns:
+        float: Delay in seconds, or None if the headers don't specify one
+    """
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    return None
+
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at a per-minute rate.
+    """
+
+    def __init__(self, per_minute, capacity=None):
+        """
+        Initialize the bucket.
+
+        Args:
+            per_minute (float): Refill rate per minute
+            capacity (float, optional): Maximum burst size. Defaults to the per-minute rate
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        """Add the amount accrued since the last update."""
+        now = time.monotonic()
+        if now >= self.blocked_until:
+            elapsed = now - max(self.updated, self.blocked_until)
+            self.available = min(self.capacity, self.available + elapsed * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        """
+        Wait until the bucket holds enough capacity, then take it.
+
+        Args:
+            amount (float): Amount to take (capped at the bucket capacity)
+        """
+        amount = min(amount, self.capacity)
+
+        # Waiters are served in order so large requests aren't starved
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+
+                wait = (amount - self.available) / self.rate
+                wait += max(0.0, self.blocked_until - time.monotonic())
+                await asyncio.sleep(wait)
+
+    def sync(self, remaining, reset_seconds=None):
+        """
+        Align the bucket with the remaining quota reported by the server.
+
+        Args:
+            remaining (float): Remaining quota from an x-ratelimit-remaining-* header
+            reset_seconds (float, optional): Seconds until the quota resets
+        """
+        self._refill()
+        self.available = min(self.available, remaining)
+        if remaining <= 0 and reset_seconds:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + reset_seconds)
+
+
+class AsyncRateLimiter:
+    """
+    Bounded, adaptive concurrency combined with request and token buckets.
+
+    The concurrency limit follows AIMD: it grows by one after a full window of
+    successful calls and halves on every 429 response. x-ratelimit-* headers
+    keep the buckets in step with the quota the server actually reports.
+    """
+
+    def __init__(self, max_concurrency=8, requests_per_minute=500, tokens_per_minute=200000,
+                 min_concurrency=1):
+        """
+        Initialize the limiter.
+
+        Args:
+            max_concurrency (int): Upper bound on in-flight requests
+            requests_per_minute (float): Request budget per minute
+            tokens_per_minute (float): Token budget per minute
+            min_concurrency (int): Lower bound the limit never drops below
+        """
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, tokens):
+        """
+        Wait for a concurrency slot and for request and token budget.
+
+        Args:
+            tokens (int): Estimated tokens for the request
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+        try:
+            await self.request_bucket.acquire(1)
+            await self.token_bucket.acquire(tokens)
+        except BaseException:
+            await self.release()
+            raise
+
+    async def release(self):
+        """Release a concurrency slot."""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def record_success(self, headers=None):
+        """
+        Additively increase the limit and sync the buckets with response headers.
+
+        Args:
+            headers (Mapping, optional): Response headers
+        """
+        self._sync_headers(headers)
+
+        async with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_concurrency:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    async def record_rate_limited(self, headers=None):
+        """
+        Multiplicatively decrease the limit after a 429 response.
+
+        Args:
+            headers (Mapping, optional): Response headers of the 429 response
+        """
+        self.rate_limited += 1
+        self._sync_headers(headers)
+
+        async with self._condition:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._successes = 0
+
+        logger.warning(f"Rate limited by the API, concurrency limit lowered to {self.limit}")
+
+    def _sync_headers(self, headers):
+        """Apply x-ratelimit-remaining-* and x-ratelimit-reset-* headers to the buckets."""
+        if not headers:
+            return
+
+        for kind, bucket in (('requests', self.request_bucket), ('tokens', self.token_bucket)):
+            remaining = headers.get(f'x-ratelimit-remaining-{kind}')
+            if remaining is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            reset = parse_reset_duration(headers.get(f'x-ratelimit-reset-{kind}'))
+            bucket.sync(remaining, reset)
+
+
+def get_rate_limiter(api_key=None, model=None, max_concurrency=8, requests_per_minute=500,
+                     tokens_per_minute=200000):
+    """
+    Get the process-wide rate limiter for an API key and model.
+
+    Every thread and batch analyzing with the same key and model draws on
+    one set of buckets and one concurrency limit, so the configured rate is
+    the total rate of the process. The limiter is created with the settings
+    of the first caller and must only be used on the shared event loop.
+
+    Args:
+        api_key (str, optional): OpenAI API key the limits belong to
+        model (str, optional): Model the limits belong to
+        max_concurrency (int): Upper bound on in-flight requests
+        requests_per_minute (float): Request budget per minute
+        tokens_per_minute (float): Token budget per minute
+
+    Returns:
+        AsyncRateLimiter: The shared limiter
+    """
+    with _limiters_lock:
+        key = (api_key, model)
+        if key not in _limiters:
+            _limiters[key] = AsyncRateLimiter(
+                max_concurrency=max_concurrency,
+                requests_per_minute=requests_per_minute,
+                tokens_per_minute=tokens_per_minute
+            )
+            logger.info(
+                f"Created rate limiter for {model or 'default model'}: {max_concurrency} concurrent requests, "
+                f"{requests_per_minute} requests and {tokens_per_minute} tokens per minute"
+            )
+        return _limiters[key]
+
+def is_rate_limit_error(error):
+    """
+    Check whether an exception is a 429 response from the API.
+
+    Args:
+        error (Exception): Exception raised by the client
+
+    Returns:
+        bool: True for rate limit errors
+    """
+    return getattr(error, 'status_code', None) == 429
+
+async def run_concurrently(jobs, limiter, max_retries=5, retryable=None):
+    """
+    Run jobs under a rate limiter and yield their results in completion order.
+
+    Each job is a (key, estimated_tokens, call) tuple where call is a
+    zero-argument coroutine function returning (result, response_headers).
+    Retryable errors (429 responses by default) are retried after the
+    server's Retry-After delay or a jittered exponential backoff; other
+    exceptions are returned to the caller. Only 429 responses lower the
+    concurrency limit.
+
+    Args:
+        jobs (iterable): (key, estimated_tokens, call) tuples
+        limiter (AsyncRateLimiter): Limiter shared by all jobs
+        max_retries (int): Retries per job after retryable errors
+        retryable (callable, optional): Decides whether an exception is retried
+
+    Yields:
+        tuple: (key, result, error) with error set to the exception on failure
+    """
+    retryable = retryable or is_rate_limit_error
+
+    async def run(key, tokens, call):
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            error = None
+            try:
+                result, headers = await call()
+            except Exception as e:
+                error = e
+            finally:
+                # Also on cancellation, or the shared limiter loses the slot for good
+                await limiter.release()
+
+            if error is not None:
+                if retryable(error) and attempt < max_retries:
+                    response_headers = getattr(getattr(error, 'response', None), 'headers', None)
+                    if is_rate_limit_error(error):
+                        await limiter.record_rate_limited(response_headers)
+                    delay = retry_after_seconds(response_headers) or random.uniform(0, min(60, 2 ** attempt))
+                    attempt += 1
+                    await asyncio.sleep(delay)
+                    continue
+                return key, None, error
+
+            await limiter.record_success(headers)
+            return key, result, None
+
+    tasks = [asyncio.ensure_future(run(key, tokens, call)) for key, tokens, call in jobs]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Let cancelled calls release their slots before the caller moves on
+        await asyncio.gather(*tasks, return_exceptions=True)
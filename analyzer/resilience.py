@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Resilience Module
+
+This module wraps model calls with jittered exponential backoff that
+respects Retry-After, a circuit breaker per model, and optional hedged
+requests fired once a call runs past the model's p95 latency. Every
+attempt is recorded so callers can tell a failed analysis from a real
+low score.
+"""
+
+import time
+import random
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import openai
+
+from analyzer.json_repair import InvalidResponseError
+from analyzer.rate_limit import retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+_callers = {}
+_callers_lock = threading.Lock()
+
+def is_retryable(error):
+    """
+    Check whether a failed call may succeed when retried.
+
+    Args:
+        error (Exception): Exception raised by the client
+
+    Returns:
+        bool: True for connection errors, timeouts, rate limits, server errors
+            and responses that could not be repaired
+    """
+    if isinstance(error, (openai.APIConnectionError, InvalidResponseError)):
+        return True
+    status_code = getattr(error, 'status_code', None)
+    return status_code in RETRYABLE_STATUS_CODES or (status_code is not None and status_code >= 500)
+
+def backoff_delay(attempt, error=None, base_delay=1.0, max_delay=60.0):
+    """
+    Delay before the next attempt: the server's Retry-After if given,
+    otherwise exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of the attempt that failed, starting at 0
+        error (Exception, optional): The error, whose response headers may hold Retry-After
+        base_delay (float): Backoff for the first retry in seconds
+        max_delay (float): Upper bound for the backoff in seconds
+
+    Returns:
+        float: Seconds to wait
+    """
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    retry_after = retry_after_seconds(headers)
+    if retry_after is not None:
+        return min(retry_after, max_delay)
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+def count_retries(attempts):
+    """
+    Count the retries in a list of attempt records.
+
+    Args:
+        attempts (list): Attempt records as produced by ResilientCaller.call
+
+    Returns:
+        int: Attempts made after the first; hedged duplicates are not retries
+    """
+    return max(len({attempt['attempt'] for attempt in attempts}) - 1, 0)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a model's circuit breaker rejects a call."""
+
+
+class CallFailedError(Exception):
+    """Raised when every attempt of a call failed."""
+
+    def __init__(self, last_error, attempts):
+        super().__init__(str(last_error))
+        self.last_error = last_error
+        self.attempts = attempts
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker for one model.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for reset_timeout seconds; then a single trial call is let
+    through, closing the circuit on success and reopening it on failure.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        Check whether a call may go ahead.
+
+        Returns:
+            bool: False while the circuit is open or a trial call is in flight
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                return True
+            return False
+
+    def record_success(self):
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or after a failed trial."""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+
+class ResilientCaller:
+    """
+    Runs model calls with retries, per-model circuit breakers and optional hedging.
+    """
+
+    def __init__(self, max_retries=4, base_delay=1.0, max_delay=60.0, failure_threshold=5,
+                 reset_timeout=30.0, hedge=False, hedge_min_samples=20, hedge_workers=8):
+        """
+        Initialize the caller.
+
+        Args:
+            max_retries (int): Retries after the first attempt for retryable errors
+            base_delay (float): Backoff for the first retry in seconds
+            max_delay (float): Upper bound for a single backoff in seconds
+            failure_threshold (int): Consecutive failures that open a model's circuit
+            reset_timeout (float): Seconds a circuit stays open before a trial call
+            hedge (bool): Fire a second request when a call runs past the model's p95 latency
+            hedge_min_samples (int): Successful calls needed before hedging a model
+            hedge_workers (int): Threads available for hedged calls
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+
+        self._breakers = {}
+        self._latencies = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=hedge_workers) if hedge else None
+
+    def breaker(self, model):
+        """
+        Get the circuit breaker of a model.
+
+        Args:
+            model (str): Model name
+
+        Returns:
+            CircuitBreaker: The model's breaker
+        """
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def hedge_delay(self, model):
+        """
+        Delay after which a call to a model is hedged.
+
+        Args:
+            model (str): Model name
+
+        Returns:
+            float: p95 of recent successful latencies, or None without enough samples
+        """
+        with self._lock:
+            latencies = sorted(self._latencies.get(model, ()))
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def _record_latency(self, model, latency):
+        """Keep a rolling window of successful call latencies."""
+        with self._lock:
+            self._latencies.setdefault(model, deque(maxlen=200)).append(latency)
+
+    def call(self, model, request):
+        """
+        Run a model call with retries, circuit breaking and hedging.
+
+        Args:
+            model (str): Model the request goes to
+            request (callable): Zero-argument function making the request
+
+        Returns:
+            tuple: (response, attempts) where attempts lists a dict per attempt
+                with attempt, model, hedged, latency, outcome and error
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open
+            CallFailedError: If every attempt failed; holds the attempts
+        """
+        breaker = self.breaker(model)
+        attempts = []
+
+        for attempt in range(self.max_retries + 1):
+            if not breaker.allow():
+                if attempts:
+                    raise CallFailedError(CircuitOpenError(f"Circuit open for {model}"), attempts)
+                raise CircuitOpenError(f"Circuit open for {model}")
+
+            try:
+                response = self._attempt(model, request, attempt, attempts)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The model answered; the request itself was rejected
+                    breaker.record_success()
+                    raise CallFailedError(e, attempts)
+
+                breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise CallFailedError(e, attempts)
+
+                delay = backoff_delay(attempt, e, self.base_delay, self.max_delay)
+                logger.warning(f"Call to {model} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            breaker.record_success()
+            return response, attempts
+
+    def _attempt(self, model, request, attempt, attempts):
+        """
+        Make one attempt, hedged if the model's latency history allows.
+
+        Args:
+            model (str): Model name
+            request (callable): Zero-argument function making the request
+            attempt (int): Attempt number
+            attempts (list): Attempt records to append to
+
+        Returns:
+            The response of the first request to succeed
+        """
+        delay = self.hedge_delay(model) if self.hedge else None
+        if delay is None:
+            started = time.monotonic()
+            try:
+                response = request()
+            except Exception as e:
+                attempts.append(self._attempt_record(model, attempt, False, started, 'error', e))
+                raise
+            self._record_latency(model, time.monotonic() - started)
+            attempts.append(self._attempt_record(model, attempt, False, started, 'success'))
+            return response
+
+        started = time.monotonic()
+        futures = {self._executor.submit(request): (False, started)}
+        done, _ = wait(futures, timeout=delay)
+        if not done:
+            logger.info(f"Hedging call to {model} after {delay:.2f}s")
+            futures[self._executor.submit(request)] = (True, time.monotonic())
+
+        # First success wins; the slower request finishes in the background
+        pending = set(futures)
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                hedged, future_started = futures[future]
+                try:
+                    response = future.result()
+                except Exception as e:
+                    attempts.append(self._attempt_record(model, attempt, hedged, future_started, 'error', e))
+                    last_error = e
+                    continue
+                self._record_latency(model, time.monotonic() - future_started)
+                attempts.append(self._attempt_record(model, attempt, hedged, future_started, 'success'))
+                for other in pending:
+                    hedged, other_started = futures[other]
+                    attempts.append(self._attempt_record(model, attempt, hedged, other_started, 'abandoned'))
+                return response
+
+        raise last_error
+
+    async def attempt_async(self, model, request, attempt, attempts):
+        """
+        Make one attempt of an async call under the model's circuit breaker,
+        hedged if the model's latency history allows. Retries are left to the
+        caller, e.g. analyzer.rate_limit.run_concurrently, so they go back
+        through its rate limiter.
+
+        Args:
+            model (str): Model the request goes to
+            request (callable): Zero-argument coroutine function making the request
+            attempt (int): Attempt number
+            attempts (list): Attempt records to append to
+
+        Returns:
+            The response of the first request to succeed
+
+        Raises:
+            CircuitOpenError: If the model's circuit is open
+            Exception: The request's error, after the breaker has counted it
+        """
+        breaker = self.breaker(model)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {model}")
+
+        try:
+            response = await self._attempt_async(model, request, attempt, attempts)
+        except Exception as e:
+            if is_retryable(e):
+                breaker.record_failure()
+            else:
+                # The model answered; the request itself was rejected
+                breaker.record_success()
+            raise
+
+        breaker.record_success()
+        return response
+
+    async def _attempt_async(self, model, request, attempt, attempts):
+        """Async counterpart of _attempt; the slower of two hedged requests is cancelled."""
+        delay = self.hedge_delay(model) if self.hedge else None
+        started = time.monotonic()
+        tasks = {asyncio.ensure_future(request()): (False, started)}
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                logger.info(f"Hedging call to {model} after {delay:.2f}s")
+                tasks[asyncio.ensure_future(request())] = (True, time.monotonic())
+
+        pending = set(tasks)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    hedged, task_started = tasks[task]
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        attempts.append(self._attempt_record(model, attempt, hedged, task_started, 'error', e))
+                        last_error = e
+                        continue
+                    self._record_latency(model, time.monotonic() - task_started)
+                    attempts.append(self._attempt_record(model, attempt, hedged, task_started, 'success'))
+                    for other in pending:
+                        hedged, other_started = tasks[other]
+                        attempts.append(self._attempt_record(model, attempt, hedged, other_started, 'abandoned'))
+                    return response
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    def _attempt_record(self, model, attempt, hedged, started, outcome, error=None):
+        """Describe one attempt for the result metadata."""
+        return {
+            'attempt': attempt,
+            'model': model,
+            'hedged': hedged,
+            'latency': round(time.monotonic() - started, 3),
+            'outcome': outcome,
+            'error': str(error) if error is not None else None
+        }
+
+
+def get_resilient_caller(resilience_config=None):
+    """
+    Get the process-wide resilient caller for a configuration, so circuit
+    breaker and latency state are shared by every analyzer.
+
+    Args:
+        resilience_config (dict, optional): Settings matching ResilientCaller's arguments
+
+    Returns:
+        ResilientCaller: Shared caller
+    """
+    resilience_config = resilience_config or {}
+    key = tuple(sorted(resilience_config.items()))
+
+    with _callers_lock:
+        if key not in _callers:
+            _callers[key] = ResilientCaller(**resilience_config)
+        return _callers[key]
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache Module
+
+This module provides a content-addressed, SQLite-backed cache of model
+responses. Entries are keyed by a hash of the model, prompts and analyzer
+version, so an unchanged listing is never sent to the API twice, and the
+same cache file is shared by the Streamlit app, the OpenAI test script and
+the batch pipeline.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default location shared by every entry point
+DEFAULT_CACHE_PATH = 'data/llm_cache.sqlite'
+
+# Process-wide cache instances by database path
+_shared_caches = {}
+_shared_lock = threading.Lock()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of model response content with TTL and size-based eviction.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_seconds=None, max_entries=None):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): SQLite database file
+            ttl_seconds (float, optional): Entries older than this are treated as missing
+            max_entries (int, optional): Least recently used entries are evicted above this count
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._lock:
+            # WAL lets the app and the batch pipeline use the file at the same time
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)"
+            )
+            self._connection.commit()
+
+    @staticmethod
+    def make_key(model, system_prompt, user_prompt, analyzer_version):
+        """
+        Compute the content-addressed key for a request.
+
+        Args:
+            model (str): Model name
+            system_prompt (str): System prompt
+            user_prompt (str): User prompt
+            analyzer_version (str): Version of the analyzer's prompt and parsing logic
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        digest = hashlib.sha256()
+        for part in (model, system_prompt, user_prompt, analyzer_version):
+            digest.update((part or '').encode('utf-8'))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    @classmethod
+    def key_for_params(cls, params, analyzer_version):
+        """
+        Compute the key for chat completion parameters.
+
+        Args:
+            params (dict): Chat completion parameters with model and messages
+            analyzer_version (str): Version of the analyzer's prompt and parsing logic
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        system_prompt = "\n".join(
+            message['content'] for message in params['messages'] if message['role'] in ('system', 'developer')
+        )
+        user_prompt = "\n".join(
+            message['content'] for message in params['messages'] if message['role'] == 'user'
+        )
+        return cls.make_key(params['model'], system_prompt, user_prompt, analyzer_version)
+
+    def get(self, key):
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): Request key
+
+        Returns:
+            str: Cached response content, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT content, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, model, content):
+        """
+        Store a response.
+
+        Args:
+            key (str): Request key
+            model (str): Model that produced the response
+            content (str): Response content
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, content, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, content, now, now)
+            )
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now):
+        """Drop expired entries and the least recently used ones above max_entries."""
+        if self.ttl_seconds is not None:
+            self._connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        if self.max_entries is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: Hits, misses and number of stored entries
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def get_response_cache(cache_config=None):
+    """
+    Get the process-wide response cache for a configuration.
+
+    Args:
+        cache_config (dict, optional): Cache configuration with 'enabled', 'path',
+            'ttl_hours' and 'max_entries'
+
+    Returns:
+        ResponseCache: Shared cache instance, or None if caching is disabled
+    """
+    cache_config = cache_config or {}
+    if not cache_config.get('enabled', True):
+        return None
+
+    path = cache_config.get('path', DEFAULT_CACHE_PATH)
+    ttl_hours = cache_config.get('ttl_hours')
+
+    with _shared_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = ResponseCache(
+                path,
+                ttl_seconds=ttl_hours * 3600 if ttl_hours is not None else None,
+                max_entries=cache_config.get('max_entries')
+            )
+            logger.info(f"Using LLM response cache at {path}")
+        return _shared_caches[path]
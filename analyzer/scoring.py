@@ -56,3 +56,89 @@ def score_listing(analysis_results, scoring_config):
     }
     
     return results
+
+def analysis_failed(listing):
+    """
+    Check whether a listing's analysis failed, as opposed to finding nothing.
+    
+    Args:
+        listing (dict): Analyzed listing
+        
+    Returns:
+        bool: True if 'analysis_metadata' marks the analysis as failed
+    """
+    return bool((listing.get('analysis_metadata') or {}).get('failed'))
+
+def score_listings(listings, scoring_config):
+    """
+    Add weighted investment scores to analyzed listings.
+    
+    Args:
+        listings (list): Listings with NLP analysis results
+        scoring_config (dict): Scoring configuration
+        
+    Returns:
+        list: Listings with 'total_investment_score' (0-10) added; None for
+            listings whose analysis failed, so they never rank as low scores
+    """
+    weights = {
+        'seller_motivation': scoring_config.get('seller_motivation_weight', 0.4),
+        'transaction_complexity': scoring_config.get('transaction_complexity_weight', 0.3),
+        'property_characteristics': scoring_config.get('property_characteristics_weight', 0.3)
+    }
+    
+    failed = 0
+    for listing in listings:
+        if analysis_failed(listing):
+            listing['total_investment_score'] = None
+            failed += 1
+            continue
+        
+        total_score = 0
+        for category, weight in weights.items():
+            analysis = listing.get(category)
+            score = analysis.get('score', 0) if isinstance(analysis, dict) else 0
+            total_score += (score or 0) * weight
+        listing['total_investment_score'] = round(total_score, 1)
+    
+    if failed:
+        logger.warning(f"Not scoring {failed} listings whose analysis failed")
+    return listings
+
+def add_highlight_flags(listings, threshold=7):
+    """
+    Flag listings whose investment score reaches the highlight threshold.
+    
+    Args:
+        listings (list): Scored listings
+        threshold (float): Minimum total investment score to highlight
+        
+    Returns:
+        list: Listings with 'highlight' added
+    """
+    for listing in listings:
+        listing['highlight'] = (listing.get('total_investment_score') or 0) >= threshold
+    return listings
+
+def generate_investment_summary(listing):
+    """
+    Summarize why a listing scored as it did.
+    
+    Args:
+        listing (dict): Scored listing
+        
+    Returns:
+        str: One line with the total score and each category's score and factors
+    """
+    if analysis_failed(listing):
+        return f"Analysis failed: {listing['analysis_metadata'].get('error') or 'unknown error'}"
+    
+    parts = [f"Investment score {listing.get('total_investment_score', 0)}/10"]
+    for category in ['seller_motivation', 'transaction_complexity', 'property_characteristics']:
+        analysis = listing.get(category)
+        if not isinstance(analysis, dict):
+            continue
+        label = category.replace('_', ' ').capitalize()
+        factors = ", ".join(str(factor) for factor in analysis.get('factors', [])[:3])
+        parts.append(f"{label} {analysis.get('score', 0)}" + (f" ({factors})" if factors else ""))
+    return "; ".join(parts)
@@ -8,127 +8,295 @@ to analyze commercial real estate listings without requiring external APIs.
 
 import re
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Categories reported by analyze_listing_text
+CATEGORIES = ['seller_motivation', 'transaction_complexity', 'property_characteristics']
+
+# Contextual clues beyond simple keyword matching: each group adds its label
+# to a category when any of its patterns is found in the lowercase text
+CLUE_PATTERNS = [
+    # Price reduction mentions
+    ('seller_motivation_matches', 'price reduced', [
+        r"price reduced", r"reduced price", r"price cut", r"discount", r"below market"
+    ]),
+    # Urgency expressions
+    ('seller_motivation_matches', 'urgency', [
+        r"won'?t last", r"selling (?:fast|quickly)", r"immediate", r"limited time",
+        r"act (?:fast|quickly|now)"
+    ]),
+    # Redevelopment potential
+    ('property_characteristics_matches', 'redevelopment potential', [
+        r"potential (?:for|to) (?:develop|redevelop|build)", r"development opportunity",
+        r"zoned for", r"build to suit", r"highest and best use"
+    ]),
+    # Below market indicators
+    ('property_characteristics_matches', 'below market', [
+        r"below market", r"undervalued", r"good deal", r"bargain", r"priced to sell",
+        r"competitive price", r"great price", r"favorable (?:terms|pricing)"
+    ]),
+]
+
+# Characters that end the literal prefix of a clue pattern
+REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+# Keywords plus clue patterns from which the single-pass alternation beats
+# separate substring tests and regex searches. Measured on the sample corpus
+# with `python benchmark.py clues` (per-pattern and single-pass scan columns):
+# the stock 46 keywords (65 patterns) scan about 2.5x faster one by one, and
+# the two break even between about 150 and 200 patterns
+SINGLE_PASS_MIN_PATTERNS = 180
+
+
+class ClueScanner:
+    """
+    Single-pass scanner for category keywords and contextual clue patterns.
+
+    Every keyword and clue pattern is merged into one compiled alternation with
+    a named group per pattern. Literal prefixes are factored into a trie so the
+    regex engine only explores the branches that can match at each position.
+    Below SINGLE_PASS_MIN_PATTERNS patterns, where one substring test per
+    keyword and one precompiled search per clue are cheaper, those are used.
+    """
+
+    def __init__(self, keywords=None, single_pass=None):
+        """
+        Compile the scanner.
+
+        Args:
+            keywords (dict, optional): Dictionary of keywords by category
+            single_pass (bool, optional): Force the single-pass alternation on
+                or off. Defaults to using it from SINGLE_PASS_MIN_PATTERNS patterns
+        """
+        # Group name -> lowercase keyword or clue label
+        self.group_keywords = {}
+        self.group_clues = {}
+
+        # (group name, literal prefix, regex tail) for every pattern
+        entries = []
+
+        keyword_phrases = []
+        for category_keywords in (keywords or {}).values():
+            for keyword in category_keywords:
+                phrase = keyword.lower()
+                if phrase and phrase not in keyword_phrases:
+                    keyword_phrases.append(phrase)
+
+        for phrase in keyword_phrases:
+            name = f"k{len(self.group_keywords)}"
+            self.group_keywords[name] = phrase
+            entries.append((name, phrase, ''))
+
+        for _, label, patterns in CLUE_PATTERNS:
+            for pattern in patterns:
+                name = f"c{len(self.group_clues)}"
+                self.group_clues[name] = label
+                entries.append((name,) + _split_literal_prefix(pattern))
+
+        if single_pass is None:
+            single_pass = len(entries) >= SINGLE_PASS_MIN_PATTERNS
+        self.single_pass = single_pass
+
+        # Per-pattern path: plain substring tests for keywords and one
+        # precompiled search per clue pattern, grouped by label
+        self._keyword_phrases = keyword_phrases
+        self._clue_searches = {}
+        for _, label, patterns in CLUE_PATTERNS:
+            self._clue_searches.setdefault(label, []).extend(re.compile(pattern).search for pattern in patterns)
+
+        self.pattern = re.compile(_build_trie(entries)) if entries and single_pass else None
+
+        # Only one alternative can match at a given position, so each pattern
+        # keeps the patterns that could also match where it does: those whose
+        # literal prefix is compatible with its own
+        compiled = {
+            name: re.compile(re.escape(prefix) + tail)
+            for name, prefix, tail in entries
+        }
+        self._conflicts = {}
+        for name, prefix, _ in entries:
+            self._conflicts[name] = [
+                (other_name, compiled[other_name])
+                for other_name, other_prefix, _ in entries
+                if other_name != name and (
+                    prefix.startswith(other_prefix) or other_prefix.startswith(prefix)
+                )
+            ]
+
+    def scan(self, text):
+        """
+        Find every keyword and clue in a single pass over the text.
+
+        Args:
+            text (str): The lowercase listing text
+
+        Returns:
+            dict: 'keywords' (set of lowercase keywords) and 'clues' (set of clue labels)
+        """
+        if not self.single_pass:
+            return {
+                'keywords': {phrase for phrase in self._keyword_phrases if phrase in text},
+                'clues': {
+                    label for label, searches in self._clue_searches.items()
+                    if any(search(text) for search in searches)
+                }
+            }
+
+        hits = set()
+
+        if self.pattern is not None:
+            search = self.pattern.search
+            conflicts = self._conflicts
+
+            match = search(text)
+            while match is not None:
+                start = match.start()
+                name = match.lastgroup
+                hits.add(name)
+
+                for other_name, compiled in conflicts[name]:
+                    if other_name not in hits and compiled.match(text, start):
+                        hits.add(other_name)
+
+                # Resume right after the match start so overlapping hits are found
+                match = search(text, start + 1)
+
+        return {
+            'keywords': {self.group_keywords[name] for name in hits if name in self.group_keywords},
+            'clues': {self.group_clues[name] for name in hits if name in self.group_clues}
+        }
+
+
+def _split_literal_prefix(pattern):
+    """
+    Split a clue pattern into its literal prefix and remaining regex.
+
+    Args:
+        pattern (str): Regex pattern
+
+    Returns:
+        tuple: (literal prefix, regex tail)
+    """
+    index = 0
+    while index < len(pattern) and pattern[index] not in REGEX_METACHARACTERS:
+        index += 1
+
+    # A quantifier applies to the character before it
+    if 0 < index < len(pattern) and pattern[index] in '*+?{':
+        index -= 1
+
+    return pattern[:index], pattern[index:]
+
+
+def _build_trie(entries):
+    """
+    Build a regex alternation with shared literal prefixes factored out.
+
+    Args:
+        entries (list): (group name, literal prefix, regex tail) tuples
+
+    Returns:
+        str: Regex source where each pattern ends in an empty named group
+    """
+    branches = {}
+    alternatives = []
+
+    for name, prefix, tail in entries:
+        if prefix:
+            branches.setdefault(prefix[0], []).append((name, prefix[1:], tail))
+        else:
+            tail = f"(?:{tail})" if tail else ''
+            alternatives.append(f"{tail}(?P<{name}>)")
+
+    # Longer patterns go first; shorter ones at the same start are re-checked by the scanner
+    alternatives = [
+        re.escape(character) + _build_trie(sub_entries)
+        for character, sub_entries in branches.items()
+    ] + alternatives
+
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+@lru_cache(maxsize=32)
+def _cached_scanner(keyword_items):
+    """Build a scanner for a frozen keyword configuration."""
+    return ClueScanner({category: list(keywords) for category, keywords in keyword_items})
+
+
+def get_scanner(keywords):
+    """
+    Get the compiled scanner for a keyword configuration.
+
+    Args:
+        keywords (dict): Dictionary of keywords by category
+
+    Returns:
+        ClueScanner: Scanner compiled once per distinct configuration
+    """
+    keyword_items = tuple(
+        (category, tuple(category_keywords))
+        for category, category_keywords in keywords.items()
+    )
+    return _cached_scanner(keyword_items)
+
+
+# Scanner for the contextual clues alone
+CLUE_SCANNER = ClueScanner()
+
+
 def analyze_listing_text(text, keywords):
     """
     Analyze listing text for investment criteria keywords
-    
+
     Args:
         text (str): The listing description text
         keywords (dict): Dictionary of keywords by category
-        
+
     Returns:
         dict: Analysis results with matches by category
     """
     # Convert text to lowercase for case-insensitive matching
     text_lower = text.lower()
-    
-    # Initialize results dictionary
-    results = {
-        'seller_motivation_matches': [],
-        'transaction_complexity_matches': [],
-        'property_characteristics_matches': []
-    }
-    
-    # Check for seller motivation keywords
-    for keyword in keywords['seller_motivation']:
-        if keyword.lower() in text_lower:
-            # Get the context around the keyword (up to 100 characters)
-            match_index = text_lower.find(keyword.lower())
-            start = max(0, match_index - 50)
-            end = min(len(text), match_index + len(keyword) + 50)
-            context = text[start:end]
-            
-            results['seller_motivation_matches'].append({
-                'keyword': keyword,
-                'context': context.strip()
-            })
-    
-    # Check for transaction complexity keywords
-    for keyword in keywords['transaction_complexity']:
-        if keyword.lower() in text_lower:
-            # Get the context around the keyword
-            match_index = text_lower.find(keyword.lower())
-            start = max(0, match_index - 50)
-            end = min(len(text), match_index + len(keyword) + 50)
-            context = text[start:end]
-            
-            results['transaction_complexity_matches'].append({
-                'keyword': keyword,
-                'context': context.strip()
-            })
-    
-    # Check for property characteristics keywords
-    for keyword in keywords['property_characteristics']:
-        if keyword.lower() in text_lower:
-            # Get the context around the keyword
-            match_index = text_lower.find(keyword.lower())
-            start = max(0, match_index - 50)
-            end = min(len(text), match_index + len(keyword) + 50)
-            context = text[start:end]
-            
-            results['property_characteristics_matches'].append({
-                'keyword': keyword,
-                'context': context.strip()
-            })
-    
-    # Extract simple keywords for display
-    results['seller_motivation_matches'] = [
-        match['keyword'] for match in results['seller_motivation_matches']
-    ]
-    results['transaction_complexity_matches'] = [
-        match['keyword'] for match in results['transaction_complexity_matches']
-    ]
-    results['property_characteristics_matches'] = [
-        match['keyword'] for match in results['property_characteristics_matches']
-    ]
-    
-    # Look for additional contextual clues
-    additional_clues(text_lower, results)
-    
+
+    # Find every keyword and contextual clue in one pass
+    hits = get_scanner(keywords).scan(text_lower)
+    found = hits['keywords']
+
+    # Keep matched keywords in configuration order for display
+    results = {}
+    for category in CATEGORIES:
+        results[f"{category}_matches"] = [
+            keyword for keyword in keywords[category]
+            if not keyword or keyword.lower() in found
+        ]
+
+    # Add the additional contextual clues
+    _add_clue_matches(hits['clues'], results)
+
     return results
 
 def additional_clues(text, results):
     """
     Look for additional contextual clues beyond simple keyword matching
-    
+
     Args:
         text (str): The lowercase listing text
         results (dict): Current results dictionary to update
     """
-    # Check for price reduction mentions
-    price_patterns = [
-        r"price reduced", r"reduced price", r"price cut", r"discount", r"below market"
-    ]
-    for pattern in price_patterns:
-        if re.search(pattern, text) and "price reduced" not in results['seller_motivation_matches']:
-            results['seller_motivation_matches'].append("price reduced")
-    
-    # Check for urgency expressions
-    urgency_patterns = [
-        r"won'?t last", r"selling (?:fast|quickly)", r"immediate", r"limited time", 
-        r"act (?:fast|quickly|now)"
-    ]
-    for pattern in urgency_patterns:
-        if re.search(pattern, text) and "urgency" not in results['seller_motivation_matches']:
-            results['seller_motivation_matches'].append("urgency")
-    
-    # Check for redevelopment potential
-    redevelopment_patterns = [
-        r"potential (?:for|to) (?:develop|redevelop|build)", r"development opportunity", 
-        r"zoned for", r"build to suit", r"highest and best use"
-    ]
-    for pattern in redevelopment_patterns:
-        if re.search(pattern, text) and "redevelopment potential" not in results['property_characteristics_matches']:
-            results['property_characteristics_matches'].append("redevelopment potential")
-    
-    # Check for below market indicators
-    market_patterns = [
-        r"below market", r"undervalued", r"good deal", r"bargain", r"priced to sell", 
-        r"competitive price", r"great price", r"favorable (?:terms|pricing)"
-    ]
-    for pattern in market_patterns:
-        if re.search(pattern, text) and "below market" not in results['property_characteristics_matches']:
-            results['property_characteristics_matches'].append("below market")
+    _add_clue_matches(CLUE_SCANNER.scan(text)['clues'], results)
+
+def _add_clue_matches(clues, results):
+    """
+    Add clue labels found by the scanner to the results.
+
+    Args:
+        clues (set): Clue labels found in the text
+        results (dict): Current results dictionary to update
+    """
+    for category_key, label, _ in CLUE_PATTERNS:
+        if label in clues and label not in results[category_key]:
+            results[category_key].append(label)
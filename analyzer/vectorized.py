@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Vectorized Keyword Scoring Module
+
+This module scores a whole corpus of listings at once. Keyword hits are
+collected into a sparse listings x keywords matrix, and category scores are
+computed with a matrix product against the category membership matrix.
+"""
+
+import logging
+import numpy as np
+from scipy import sparse
+
+from analyzer.keyword_matcher import KeywordMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordMatrixScorer:
+    """
+    Corpus-level keyword scorer backed by a sparse document-term matrix.
+
+    Reproduces the per-listing keyword logic (min(len(matches) * 2, 10) per
+    category) for every listing with a few sparse matrix operations.
+    """
+
+    def __init__(self, keywords, matcher=None):
+        """
+        Initialize the scorer.
+
+        Args:
+            keywords (dict): Dictionary of keyword lists by category
+            matcher (KeywordMatcher, optional): Precompiled matcher for the same keywords
+        """
+        self.keywords = keywords or {}
+        self.matcher = matcher or KeywordMatcher(self.keywords)
+        self.categories = list(self.keywords)
+
+        # Column index for every distinct lowercase keyword
+        self.phrases = list(self.matcher.phrase_categories)
+        self.phrase_index = {phrase: index for index, phrase in enumerate(self.phrases)}
+
+        # Keywords x categories membership matrix; a keyword listed twice in a
+        # category counts twice, like the per-listing loop
+        membership = np.zeros((len(self.phrases), len(self.categories)))
+        for column, category in enumerate(self.categories):
+            for keyword in self.keywords[category]:
+                membership[self.phrase_index[keyword.lower()], column] += 1
+        self.membership = sparse.csr_matrix(membership)
+
+        self.hits = None
+        self.category_scores = None
+
+    def fit(self, texts):
+        """
+        Scan every text once and build the listings x keywords hit matrix.
+
+        Args:
+            texts (list): Text for each listing
+
+        Returns:
+            KeywordMatrixScorer: self, with hits and category_scores populated
+        """
+        rows = []
+        columns = []
+        for row, text in enumerate(texts):
+            found = {match['keyword'] for match in self.matcher.find_matches(text)} if text else ()
+            for phrase in found:
+                rows.append(row)
+                columns.append(self.phrase_index[phrase])
+
+        self.hits = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, columns)),
+            shape=(len(texts), len(self.phrases))
+        )
+
+        # Matches per category, then the capped 0-10 category scores
+        counts = np.asarray((self.hits @ self.membership).todense())
+        self.category_scores = np.minimum(counts * 2, 10)
+
+        logger.info(
+            f"Built {self.hits.shape[0]} x {self.hits.shape[1]} keyword hit matrix "
+            f"with {self.hits.nnz} hits"
+        )
+        return self
+
+    def average_scores(self):
+        """
+        Total scores as used by the keyword provider: mean of category scores.
+
+        Returns:
+            numpy.ndarray: Unrounded total score per listing, capped at 10
+        """
+        if not self.categories:
+            return np.zeros(self.category_scores.shape[0])
+        return np.minimum(self.category_scores.mean(axis=1), 10)
+
+    def factors(self, row):
+        """
+        Matched keywords for one listing, in configuration order.
+
+        Args:
+            row (int): Listing index
+
+        Returns:
+            dict: Category -> list of matched keywords
+        """
+        start, end = self.hits.indptr[row], self.hits.indptr[row + 1]
+        found = {self.phrases[column] for column in self.hits.indices[start:end]}
+
+        return {
+            category: [keyword for keyword in self.keywords[category] if keyword.lower() in found]
+            for category in self.categories
+        }
+
+    def analysis(self, row, total_score):
+        """
+        Analysis results for one listing in the NLPAnalyzer format.
+
+        Args:
+            row (int): Listing index
+            total_score (float): Total score for the listing
+
+        Returns:
+            dict: Category scores and factors plus total_score
+        """
+        results = {}
+        for column, (category, matches) in enumerate(self.factors(row).items()):
+            results[category] = {
+                'score': int(self.category_scores[row, column]),
+                'factors': matches
+            }
+
+        results['total_score'] = total_score
+        return results
@@ -11,7 +11,12 @@ import json
 import yaml
 import streamlit as st
 from datetime import datetime
-from analyzer.openai_analyzer import OpenAIAnalyzer
+from analyzer.clients import get_router
+from analyzer.compaction import get_compactor, load_pipeline_keywords
+from analyzer.json_repair import InvalidResponseError, validate
+from analyzer.openai_analyzer import RESULT_SCHEMA, OpenAIAnalyzer
+from analyzer.resilience import get_resilient_caller
+from analyzer.response_cache import get_response_cache
 
 # Set page configuration
 st.set_page_config(
@@ -75,6 +80,10 @@ def create_default_config():
         'openai': {
             'model': 'o1',  # Using the most advanced model available with free credits
             'api_key': None,
+            'stream': True,
+        },
+        'cache': {
+            'path': 'data/llm_cache.sqlite'
         },
         'scoring': {
             'seller_motivation_weight': 0.4,
@@ -126,8 +135,55 @@ def save_result(listing, results):
     
     return filename
 
-def display_results(listing, results):
-    """Display analysis results in a readable format"""
+# Score boxes and analysis sections in display order: (result field, title)
+SCORE_SECTIONS = [
+    ('seller_motivation_score', 'Seller Motivation'),
+    ('transaction_complexity_score', 'Transaction Complexity'),
+    ('property_characteristics_score', 'Property Characteristics'),
+    ('total_score', 'TOTAL SCORE')
+]
+ANALYSIS_SECTIONS = [
+    ('seller_motivation_analysis', 'Seller Motivation Analysis'),
+    ('transaction_complexity_analysis', 'Transaction Complexity Analysis'),
+    ('property_characteristics_analysis', 'Property Characteristics Analysis')
+]
+
+def validated_field(field, value):
+    """Coerce one result field to its RESULT_SCHEMA type, or None if it is not usable (yet)"""
+    try:
+        return validate({field: value}, {field: RESULT_SCHEMA[field]})[field]
+    except InvalidResponseError:
+        return None
+
+def render_score(title, score):
+    """Render one score box"""
+    score_class = "high-score" if score >= 7 else "medium-score" if score >= 4 else "low-score"
+    st.markdown(f"<div class='score-container {score_class}'>"
+                f"<h4>{title}</h4>"
+                f"<h2>{score:.1f}/10</h2>"
+                f"</div>", unsafe_allow_html=True)
+
+def render_analysis(title, analysis):
+    """Render one detailed analysis section"""
+    with st.expander(title, expanded=True):
+        st.write(analysis['explanation'])
+        st.write("**Keywords detected:**")
+        keywords = analysis['keywords']
+        if keywords:
+            for keyword in keywords:
+                st.markdown(f"- {keyword}")
+        else:
+            st.write("No specific keywords detected")
+
+def display_results(listing, results=None, updates=None):
+    """
+    Display analysis results in a readable format
+    
+    Every section gets a placeholder up front. With updates, an iterator of
+    partial results such as OpenAIAnalyzer.analyze_listing_stream yields, each
+    section is drawn as soon as its field arrives in a usable form; every
+    section is then redrawn from the final result. Returns the final results.
+    """
     # Main info
     st.markdown(f"<h2 class='subheader'>Analysis Results for: {listing['name']}</h2>", unsafe_allow_html=True)
     
@@ -142,80 +198,55 @@ def display_results(listing, results):
     # Scores section
     st.markdown("### Scores")
     
-    score_cols = st.columns(4)
-    
-    with score_cols[0]:
-        seller_score = results['seller_motivation_score']
-        score_class = "high-score" if seller_score >= 7 else "medium-score" if seller_score >= 4 else "low-score"
-        st.markdown(f"<div class='score-container {score_class}'>"
-                    f"<h4>Seller Motivation</h4>"
-                    f"<h2>{seller_score:.1f}/10</h2>"
-                    f"</div>", unsafe_allow_html=True)
-    
-    with score_cols[1]:
-        transaction_score = results['transaction_complexity_score']
-        score_class = "high-score" if transaction_score >= 7 else "medium-score" if transaction_score >= 4 else "low-score"
-        st.markdown(f"<div class='score-container {score_class}'>"
-                    f"<h4>Transaction Complexity</h4>"
-                    f"<h2>{transaction_score:.1f}/10</h2>"
-                    f"</div>", unsafe_allow_html=True)
-    
-    with score_cols[2]:
-        property_score = results['property_characteristics_score']
-        score_class = "high-score" if property_score >= 7 else "medium-score" if property_score >= 4 else "low-score"
-        st.markdown(f"<div class='score-container {score_class}'>"
-                    f"<h4>Property Characteristics</h4>"
-                    f"<h2>{property_score:.1f}/10</h2>"
-                    f"</div>", unsafe_allow_html=True)
-    
-    with score_cols[3]:
-        total_score = results['total_score']
-        score_class = "high-score" if total_score >= 7 else "medium-score" if total_score >= 4 else "low-score"
-        st.markdown(f"<div class='score-container {score_class}'>"
-                    f"<h4>TOTAL SCORE</h4>"
-                    f"<h2>{total_score:.1f}/10</h2>"
-                    f"</div>", unsafe_allow_html=True)
+    score_cols = st.columns(len(SCORE_SECTIONS))
+    slots = {}
+    for column, (field, _) in zip(score_cols, SCORE_SECTIONS):
+        slots[field] = column.empty()
     
     # Detailed analysis sections with expandable areas
     st.markdown("### Detailed Analysis")
+    for field, _ in ANALYSIS_SECTIONS:
+        slots[field] = st.empty()
     
-    with st.expander("Seller Motivation Analysis", expanded=True):
-        st.write(results['seller_motivation_analysis']['explanation'])
-        st.write("**Keywords detected:**")
-        keywords = results['seller_motivation_analysis']['keywords']
-        if keywords:
-            for keyword in keywords:
-                st.markdown(f"- {keyword}")
-        else:
-            st.write("No specific keywords detected")
+    # Summary recommendation
+    st.markdown("### Investment Recommendation")
+    slots['summary'] = st.empty()
     
-    with st.expander("Transaction Complexity Analysis", expanded=True):
-        st.write(results['transaction_complexity_analysis']['explanation'])
-        st.write("**Keywords detected:**")
-        keywords = results['transaction_complexity_analysis']['keywords']
-        if keywords:
-            for keyword in keywords:
-                st.markdown(f"- {keyword}")
-        else:
-            st.write("No specific keywords detected")
+    for slot in slots.values():
+        slot.caption("Waiting for analysis...")
     
-    with st.expander("Property Characteristics Analysis", expanded=True):
-        st.write(results['property_characteristics_analysis']['explanation'])
-        st.write("**Keywords detected:**")
-        keywords = results['property_characteristics_analysis']['keywords']
-        if keywords:
-            for keyword in keywords:
-                st.markdown(f"- {keyword}")
-        else:
-            st.write("No specific keywords detected")
+    drawn = set()
     
-    # Summary recommendation
-    st.markdown("### Investment Recommendation")
-    st.info(results['summary'])
+    def draw(partial, final=False):
+        # Partial results draw each section once it is usable; the final result redraws them all
+        for field, title in SCORE_SECTIONS + ANALYSIS_SECTIONS + [('summary', None)]:
+            if field in drawn and not final:
+                continue
+            value = validated_field(field, partial[field]) if field in partial else None
+            if value is None:
+                if final:
+                    slots[field].caption("Not available")
+                continue
+            if field == 'summary':
+                slots[field].info(value)
+            elif field in dict(SCORE_SECTIONS):
+                with slots[field].container():
+                    render_score(title, value)
+            else:
+                with slots[field].container():
+                    render_analysis(title, value)
+            drawn.add(field)
+    
+    for partial in updates if updates is not None else []:
+        results = partial
+        draw(results)
+    draw(results, final=True)
     
     # Show JSON option
     if st.button("View Raw JSON Results"):
         st.json(results)
+    
+    return results
 
 def main():
     """Main application function"""
@@ -241,6 +272,7 @@ def main():
     
     # OpenAI model selection
     model_options = [
+        "auto",
         "o1",
         "gpt-4o",
         "gpt-4o-mini",
@@ -251,7 +283,13 @@ def main():
         "OpenAI Model",
         options=model_options,
         index=model_options.index(config['openai'].get('model', 'o1')) if config['openai'].get('model') in model_options else 0,
-        help="Select the OpenAI model to use. o1 is the most advanced model available with free credits."
+        help="Select the OpenAI model to use. o1 is the most advanced model available with free credits. "
+             "'auto' sends each request to the fastest healthy model meeting the configured quality tier."
+    )
+    stream_results = st.sidebar.checkbox(
+        "Stream results",
+        value=config['openai'].get('stream', True),
+        help="Show each score and explanation as soon as the model has written it."
     )
     
     # Source selection
@@ -307,26 +345,47 @@ def main():
         elif not listing or not listing.get('description'):
             st.error("Please provide a property listing to analyze.")
         else:
-            with st.spinner(f"Analyzing listing with OpenAI's {selected_model} model..."):
-                try:
-                    # Set API key in environment variable for this session
-                    os.environ["OPENAI_API_KEY"] = api_key
-                    
-                    # Create analyzer with selected model
-                    analyzer = OpenAIAnalyzer(api_key=api_key, model=selected_model)
-                    
-                    # Analyze the listing
-                    results = analyzer.analyze_listing(listing)
-                    
-                    # Save results
-                    filename = save_result(listing, results)
-                    st.success(f"Analysis complete! Results saved to {filename}")
-                    
-                    # Display results
+            try:
+                # Set API key in environment variable for this session
+                os.environ["OPENAI_API_KEY"] = api_key
+                
+                # Create analyzer with selected model, reusing results cached by any entry point
+                router_config = config.get('router', {})
+                analyzer = OpenAIAnalyzer(
+                    api_key=api_key,
+                    model=selected_model,
+                    cache=get_response_cache(config.get('cache')),
+                    compactor=get_compactor(config.get('compaction'), load_pipeline_keywords()),
+                    router=get_router(api_key, router_config) if selected_model == "auto" else None,
+                    min_quality=router_config.get('min_quality'),
+                    resilience=get_resilient_caller(config.get('resilience'))
+                )
+                
+                # Status message goes above the results once the analysis is done
+                status = st.empty()
+                
+                if stream_results:
+                    # Draw each section as soon as its field has streamed in
+                    status.info(f"Analyzing listing with OpenAI's {selected_model} model...")
+                    results = display_results(listing, updates=analyzer.analyze_listing_stream(listing))
+                else:
+                    with st.spinner(f"Analyzing listing with OpenAI's {selected_model} model..."):
+                        results = analyzer.analyze_listing(listing)
                     display_results(listing, results)
-                    
-                except Exception as e:
-                    st.error(f"Error during analysis: {str(e)}")
+                
+                # Save results
+                filename = save_result(listing, results)
+                metadata = results.get('metadata', {})
+                if metadata.get('failed'):
+                    status.warning(
+                        f"Analysis failed after {len(metadata['attempts'])} attempts; "
+                        f"the scores below are placeholders, not a real assessment."
+                    )
+                else:
+                    status.success(f"Analysis complete! Results saved to {filename}")
+                
+            except Exception as e:
+                st.error(f"Error during analysis: {str(e)}")
     
     # Add information about model
     st.sidebar.markdown("---")
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Benchmark Script for CRE Deal Finder
+
+This script runs microbenchmarks for the hot paths of the analysis pipeline
+against the sample corpus, comparing them with the previous implementations,
+and an end-to-end benchmark of main.py's pipeline that replays recorded
+Apify, OpenAI and Google Sheets responses instead of using the network.
+
+Usage:
+    python benchmark.py clues [--repeat N] [--keyword-scale 1 4 16]
+    python benchmark.py record --output data/fixtures/run.jsonl.gz
+    python benchmark.py pipeline --fixture data/fixtures/run.jsonl.gz [--listings N] [--latency-scale S]
+    python benchmark.py filter [--listings 200000] [--repeat N]
+"""
+
+import os
+import re
+import copy
+import glob
+import logging
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+import yaml
+
+from analyzer.simple_nlp import ClueScanner, analyze_listing_text
+from utils.filtering import filter_by_geography
+
+def load_config():
+    """Load the simple configuration used by the local test scripts"""
+    with open('config/simple_config.yaml', 'r') as file:
+        return yaml.safe_load(file)
+
+def load_sample_corpus(directory='sample_listings'):
+    """Load every sample listing description"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.txt'))):
+        with open(path, 'r') as file:
+            corpus.append(file.read())
+    return corpus
+
+def time_per_item(func, items, repeat):
+    """
+    Time a function over a list of items.
+
+    Args:
+        func (callable): Function taking one item
+        items (list): Items to process
+        repeat (int): Number of passes over the items
+
+    Returns:
+        float: Median time per item in microseconds
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            func(item)
+        timings.append((time.perf_counter() - start) / len(items))
+    return statistics.median(timings) * 1e6
+
+def _legacy_analyze_listing_text(text, keywords):
+    """Previous analyze_listing_text: one substring test and regex per pattern"""
+    text_lower = text.lower()
+    results = {}
+    for category in ['seller_motivation', 'transaction_complexity', 'property_characteristics']:
+        matches = []
+        for keyword in keywords[category]:
+            if keyword.lower() in text_lower:
+                match_index = text_lower.find(keyword.lower())
+                start = max(0, match_index - 50)
+                end = min(len(text), match_index + len(keyword) + 50)
+                matches.append({'keyword': keyword, 'context': text[start:end].strip()})
+        results[f"{category}_matches"] = [match['keyword'] for match in matches]
+
+    clue_groups = [
+        ('seller_motivation_matches', 'price reduced', [
+            r"price reduced", r"reduced price", r"price cut", r"discount", r"below market"]),
+        ('seller_motivation_matches', 'urgency', [
+            r"won'?t last", r"selling (?:fast|quickly)", r"immediate", r"limited time",
+            r"act (?:fast|quickly|now)"]),
+        ('property_characteristics_matches', 'redevelopment potential', [
+            r"potential (?:for|to) (?:develop|redevelop|build)", r"development opportunity",
+            r"zoned for", r"build to suit", r"highest and best use"]),
+        ('property_characteristics_matches', 'below market', [
+            r"below market", r"undervalued", r"good deal", r"bargain", r"priced to sell",
+            r"competitive price", r"great price", r"favorable (?:terms|pricing)"]),
+    ]
+    for category_key, label, patterns in clue_groups:
+        for pattern in patterns:
+            if re.search(pattern, text_lower) and label not in results[category_key]:
+                results[category_key].append(label)
+    return results
+
+def scale_keywords(keywords, scale):
+    """
+    Grow a keyword configuration with synthetic, rarely matching keywords.
+
+    Args:
+        keywords (dict): Dictionary of keywords by category
+        scale (int): Multiplier for the number of keywords per category
+
+    Returns:
+        dict: Keyword configuration with scale times as many keywords
+    """
+    return {
+        category: list(category_keywords) + [
+            f"{keyword[::-1]}{index}"
+            for index in range(1, scale)
+            for keyword in category_keywords
+        ]
+        for category, category_keywords in keywords.items()
+    }
+
+def benchmark_clues(repeat, scales):
+    """Compare the clue scanner (per-pattern below its crossover, single-pass above) with the previous implementation"""
+    base_keywords = load_config()['nlp']['keywords']
+    corpus = load_sample_corpus()
+
+    print(f"Sample corpus: {len(corpus)} listings, {sum(len(text) for text in corpus)} characters")
+    print(f"{'Keywords':>10} {'Patterns':>9} {'Legacy us/listing':>18} {'Scanner us/listing':>19} {'Speedup':>8} "
+          f"{'Per-pattern scan us':>20} {'Single-pass scan us':>20}")
+
+    for scale in scales:
+        keywords = scale_keywords(base_keywords, scale)
+
+        # Make sure both implementations agree before timing them
+        for text in corpus:
+            assert analyze_listing_text(text, keywords) == _legacy_analyze_listing_text(text, keywords)
+
+        legacy = time_per_item(lambda text: _legacy_analyze_listing_text(text, keywords), corpus, repeat)
+        scanner = time_per_item(lambda text: analyze_listing_text(text, keywords), corpus, repeat)
+
+        # Both scanning strategies on their own, which sets SINGLE_PASS_MIN_PATTERNS
+        lowered = [text.lower() for text in corpus]
+        per_pattern_scanner = ClueScanner(keywords, single_pass=False)
+        single_pass_scanner = ClueScanner(keywords, single_pass=True)
+        per_pattern = time_per_item(per_pattern_scanner.scan, lowered, repeat)
+        single_pass = time_per_item(single_pass_scanner.scan, lowered, repeat)
+
+        keyword_count = sum(len(category_keywords) for category_keywords in keywords.values())
+        pattern_count = len(per_pattern_scanner.group_keywords) + len(per_pattern_scanner.group_clues)
+        print(f"{keyword_count:>10} {pattern_count:>9} {legacy:>18.1f} {scanner:>19.1f} "
+              f"{legacy / scanner:>7.2f}x {per_pattern:>20.1f} {single_pass:>20.1f}")
+
+def _legacy_filter_by_geography(listings, target_states):
+    """Previous filter_by_geography: DataFrame round trip with a per-row apply"""
+    import pandas as pd
+
+    target_states = [state.upper() for state in target_states]
+    df = pd.DataFrame(listings)
+    if 'state' in df.columns:
+        filtered_df = df[df['state'].str.upper().isin(target_states)]
+    elif 'address' in df.columns:
+        def extract_state(address):
+            if not address or not isinstance(address, str):
+                return None
+            parts = address.strip().split()
+            if len(parts) >= 2:
+                potential_state = parts[-2].strip().upper().rstrip(',')
+                if len(potential_state) == 2 and potential_state.isalpha():
+                    return potential_state
+            return None
+
+        df['extracted_state'] = df['address'].apply(extract_state)
+        filtered_df = df[df['extracted_state'].isin(target_states)]
+    else:
+        return []
+    return filtered_df.to_dict('records')
+
+def generate_filter_listings(count, with_state, seed=0):
+    """
+    Generate scrape-like listings for the geography filter benchmark.
+
+    Args:
+        count (int): Number of listings
+        with_state (bool): Whether listings have a 'state' field, or only an address
+        seed (int): Random seed
+
+    Returns:
+        list: Listings with an ID, address, price and description
+    """
+    rng = random.Random(seed)
+    states = ["AL", "AZ", "CA", "CO", "FL", "GA", "IL", "IN", "KY", "MO", "NY", "OH", "OK", "TX", "WA"]
+    listings = []
+    for number in range(count):
+        state = rng.choice(states)
+        listing = {
+            'id': number,
+            'title': f"Property {number}",
+            'address': f"{rng.randint(1, 9999)} Main St, Springfield, {state} {rng.randint(10000, 99999)}",
+            'price': f"${rng.randint(100, 9000) * 1000:,}",
+            'description': "Value add opportunity with below market rents. " * rng.randint(1, 8)
+        }
+        if with_state:
+            listing['state'] = state
+        listings.append(listing)
+    return listings
+
+def measure(func, repeat):
+    """
+    Median wall time and peak traced memory of a function.
+
+    Args:
+        func (callable): Function taking no arguments
+        repeat (int): Number of timed runs
+
+    Returns:
+        tuple: (median seconds, peak bytes allocated during one run)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+def benchmark_filter(listings_count, repeat):
+    """Compare the streaming geography filter with the previous DataFrame implementation"""
+    # filter_by_geography logs every call at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    target_states = load_pipeline_config('config/config.example.yaml')['target_states']
+
+    print(f"{'Listings':>9} {'Field':>8} {'Legacy s':>9} {'Stream s':>9} {'Speedup':>8} {'Legacy MB':>10} {'Stream MB':>10}")
+    for with_state in (True, False):
+        listings = generate_filter_listings(listings_count, with_state)
+
+        # Make sure both implementations keep the same listings before timing them
+        expected = [listing['id'] for listing in _legacy_filter_by_geography(listings, target_states)]
+        assert [listing['id'] for listing in filter_by_geography(listings, target_states)] == expected
+
+        legacy, legacy_peak = measure(lambda: _legacy_filter_by_geography(listings, target_states), repeat)
+        streaming, streaming_peak = measure(lambda: filter_by_geography(listings, target_states), repeat)
+
+        field = 'state' if with_state else 'address'
+        print(
+            f"{listings_count:>9} {field:>8} {legacy:>9.3f} {streaming:>9.3f} {legacy / streaming:>7.1f}x "
+            f"{legacy_peak / 1e6:>10.1f} {streaming_peak / 1e6:>10.1f}"
+        )
+
+def offline_config(config):
+    """
+    Copy a configuration for recording or replaying a run.
+
+    Caches, the seen-listing index and the Batch API would skip or defer
+    the calls being recorded, and synthetic listings are near-duplicates by
+    construction, so those are turned off. Metrics are kept in memory only.
+
+    Args:
+        config (dict): Full configuration
+
+    Returns:
+        dict: Adjusted copy
+    """
+    config = copy.deepcopy(config)
+    config['seen_index'] = {'enabled': False}
+    config['dedup'] = {'enabled': False}
+    config['metrics'] = {'enabled': False}
+    config['nlp'].pop('cache', None)
+    config['nlp'].setdefault('batch', {})['enabled'] = False
+    return config
+
+def load_pipeline_config(path=None):
+    """Load the given configuration, config.yaml if it exists, or the example"""
+    path = path or ('config/config.yaml' if os.path.exists('config/config.yaml') else 'config/config.example.yaml')
+    with open(path, 'r') as file:
+        return yaml.safe_load(file)
+
+def record_pipeline(output, config_path=None):
+    """Run main.py's pipeline against the real services, recording every response"""
+    from apify_client import ApifyClient
+
+    import main as deal_finder
+    from analyzer.clients import set_transports
+    from analyzer.metrics import configure_metrics
+    from output.sheets import GoogleSheetsExporter, update_google_sheet
+    from utils.replay import (AsyncRecordingTransport, Recorder, RecordingTransport,
+                              recording_apify_client, recording_gspread_client)
+
+    config = offline_config(load_pipeline_config(config_path))
+    configure_metrics(config['metrics'])
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+
+    recorder = Recorder(output)
+    try:
+        set_transports(RecordingTransport(recorder), AsyncRecordingTransport(recorder))
+        apify_client = recording_apify_client(ApifyClient(config['apify']['api_key']), recorder)
+        sheets_client = recording_gspread_client(GoogleSheetsExporter(config['google_sheets']).client, recorder)
+
+        listings = deal_finder.iter_scraped_listings(config, client=apify_client)
+        scored_listings, _ = deal_finder.process_listings(listings, config)
+        update_google_sheet(scored_listings, config['google_sheets'], client=sheets_client)
+    finally:
+        set_transports()
+        recorder.close()
+
+    print(f"Recorded {recorder.events} calls for {len(scored_listings)} listings to {output}")
+
+def benchmark_pipeline(fixture_path, listings_count=None, latency_scale=1.0, batch_size=None,
+                       analyze_workers=None, seed=0, config_path=None):
+    """Replay a recorded run through main.py's pipeline and report throughput per stage"""
+    import main as deal_finder
+    from analyzer.clients import set_transports
+    from analyzer.metrics import configure_metrics, get_metrics, percentile
+    from output.sheets import update_google_sheet
+    from utils.replay import (AsyncReplayTransport, Fixture, ReplayGspreadClient, ReplayTransport,
+                              replay_apify_client, synthesize_listings)
+
+    # main.py logs every batch at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+
+    config = offline_config(load_pipeline_config(config_path))
+    pipeline_config = config.setdefault('pipeline', {})
+    if batch_size:
+        pipeline_config['batch_size'] = batch_size
+    if analyze_workers:
+        pipeline_config.setdefault('workers', {})['analyze'] = analyze_workers
+    configure_metrics(config['metrics'])
+
+    fixture = Fixture(fixture_path)
+    corpus = synthesize_listings(fixture.listings, listings_count or len(fixture.listings), seed=seed)
+    if not corpus:
+        raise SystemExit(f"No listings recorded in {fixture_path}")
+
+    set_transports(ReplayTransport(fixture, latency_scale), AsyncReplayTransport(fixture, latency_scale))
+    try:
+        listings = deal_finder.iter_scraped_listings(config, client=replay_apify_client(fixture, corpus, latency_scale))
+
+        # Time spent waiting on the (replayed) actor run and dataset pages
+        scrape_seconds = [0.0]
+
+        def timed(iterator):
+            while True:
+                start = time.perf_counter()
+                try:
+                    listing = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    scrape_seconds[0] += time.perf_counter() - start
+                yield listing
+
+        start = time.perf_counter()
+        scored_listings, pipeline = deal_finder.process_listings(timed(listings), config)
+        export_start = time.perf_counter()
+        update_google_sheet(scored_listings, config['google_sheets'], client=ReplayGspreadClient(fixture, latency_scale))
+        end = time.perf_counter()
+    finally:
+        set_transports()
+
+    elapsed = end - start
+    print(f"Fixture: {fixture_path} ({len(fixture.listings)} recorded listings, latency x{latency_scale})")
+    print(f"Listings: {len(corpus)} scraped, {len(scored_listings)} exported")
+    print(f"Wall time: {elapsed:.2f}s, {len(corpus) / elapsed:.1f} listings/s")
+    print(f"{'Stage':<8} {'Workers':>7} {'Batches':>7} {'In':>7} {'Out':>7} {'Busy s':>8} {'p50 s':>8} {'p95 s':>8}")
+    print(f"{'scrape':<8} {1:>7} {'-':>7} {'-':>7} {len(corpus):>7} {scrape_seconds[0]:>8.2f} {'-':>8} {'-':>8}")
+    for stage in pipeline.stages:
+        print(
+            f"{stage.name:<8} {stage.workers:>7} {stage.batches:>7} {stage.items_in:>7} {stage.items_out:>7} "
+            f"{stage.busy_seconds:>8.2f} {percentile(stage.durations, 0.5) or 0:>8.3f} "
+            f"{percentile(stage.durations, 0.95) or 0:>8.3f}"
+        )
+    print(f"{'export':<8} {1:>7} {1:>7} {len(scored_listings):>7} {len(scored_listings):>7} {end - export_start:>8.2f} {'-':>8} {'-':>8}")
+    print(get_metrics().format_summary())
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="CRE Deal Finder microbenchmarks")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    clues_parser = subparsers.add_parser('clues', help="simple_nlp keyword and clue matching")
+    clues_parser.add_argument('--repeat', type=int, default=500)
+    clues_parser.add_argument('--keyword-scale', type=int, nargs='+', default=[1, 4, 16],
+                              help="keyword list multipliers to benchmark")
+
+    record_parser = subparsers.add_parser('record', help="record Apify, OpenAI and Sheets responses of a real run")
+    record_parser.add_argument('--output', default='data/fixtures/pipeline.jsonl.gz')
+    record_parser.add_argument('--config', help="configuration file (default: config/config.yaml)")
+
+    pipeline_parser = subparsers.add_parser('pipeline', help="end-to-end pipeline throughput on a recorded run")
+    pipeline_parser.add_argument('--fixture', default='data/fixtures/pipeline.jsonl.gz')
+    pipeline_parser.add_argument('--listings', type=int, help="corpus size, synthesized from the recorded listings")
+    pipeline_parser.add_argument('--latency-scale', type=float, default=1.0,
+                                 help="multiplier for recorded latencies (0 for none)")
+    pipeline_parser.add_argument('--batch-size', type=int)
+    pipeline_parser.add_argument('--analyze-workers', type=int)
+    pipeline_parser.add_argument('--seed', type=int, default=0)
+    pipeline_parser.add_argument('--config', help="configuration file (default: config/config.yaml)")
+
+    filter_parser = subparsers.add_parser('filter', help="geography filter against the previous DataFrame version")
+    filter_parser.add_argument('--listings', type=int, default=200000)
+    filter_parser.add_argument('--repeat', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'clues':
+        benchmark_clues(args.repeat, args.keyword_scale)
+    elif args.benchmark == 'record':
+        record_pipeline(args.output, args.config)
+    elif args.benchmark == 'filter':
+        benchmark_filter(args.listings, args.repeat)
+    elif args.benchmark == 'pipeline':
+        benchmark_pipeline(args.fixture, args.listings, args.latency_scale, args.batch_size,
+                           args.analyze_workers, args.seed, args.config)
+
+if __name__ == "__main__":
+    main()
@@ -8,10 +8,14 @@ This script orchestrates the entire workflow:
 3. Analyzes listings with NLP
 4. Scores based on investment criteria
 5. Exports results to Google Sheets
+
+Steps 2-4 run as a pipeline on batches of listings while scraping continues.
 """
 
 import os
 import sys
+import json
+import hashlib
 import logging
 import yaml
 from datetime import datetime
@@ -19,11 +23,16 @@ from datetime import datetime
 # Internal imports
 from scraper.loopnet import LoopNetScraper
 from utils.filtering import filter_by_geography
-from analyzer.nlp import analyze_listings
+from utils.dedup import analyze_unique, open_dedup_index
+from utils.seen_index import analyze_incremental, open_seen_index
+from utils.pipeline import Pipeline, Stage
+from analyzer.nlp import NLPAnalyzer, analyze_listings
+from analyzer.metrics import configure_metrics, get_metrics
 from analyzer.scoring import score_listings
 from output.sheets import update_google_sheet
 
 # Configure logging
+os.makedirs('logs', exist_ok=True)
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -43,6 +52,100 @@ def load_config():
         logger.error(f"Error loading configuration: {e}")
         sys.exit(1)
 
+def iter_scraped_listings(config, client=None):
+    """
+    Start the configured scrape and iterate over its listings.
+    
+    Args:
+        config (dict): Full configuration
+        client (optional): Apify client to use instead of the real one, e.g.
+            a replaying client for benchmarks
+        
+    Returns:
+        iterator: Scraped listings, read lazily from the actor's dataset
+    """
+    apify_config = config['apify']
+    scraper = LoopNetScraper(apify_config['api_key'], apify_config.get('actor_id', "epctex/loopnet-scraper"), client=client)
+    search_params = apify_config.get('search_params', {})
+    return scraper.iter_listings(
+        property_types=search_params.get('property_types'),
+        search_terms=search_params.get('search_terms'),
+        page_size=apify_config.get('page_size', 1000),
+        shards=apify_config.get('shards', 1),
+        poll_interval=apify_config.get('poll_interval_seconds', 10),
+        run_timeout=apify_config.get('run_timeout_seconds')
+    )
+
+def process_listings(listings, config):
+    """
+    Filter, analyze and score listings as a pipeline.
+    
+    Bounded queues between the stages let each stage work on the next batch
+    while later stages are busy, and a slow stage holds back the scrape.
+    Batch API mode submits one job for all listings, so the pipeline runs
+    as a single batch then.
+    
+    Args:
+        listings (iterable): Scraped listings
+        config (dict): Full configuration
+        
+    Returns:
+        tuple: (scored listings, Pipeline with per-stage statistics)
+    """
+    pipeline_config = config.get('pipeline', {})
+    workers = pipeline_config.get('workers', {})
+    batch_size = pipeline_config.get('batch_size', 50)
+    if batch_size and config['nlp'].get('batch', {}).get('enabled'):
+        # Batches would each submit (and resume) their own job from the same state file
+        logger.warning("Batch API mode analyzes all listings in one job; ignoring pipeline.batch_size")
+        batch_size = None
+    
+    analysis_version = hashlib.sha256(json.dumps(config['nlp'], sort_keys=True).encode('utf-8')).hexdigest()
+    seen_index = open_seen_index(config.get('seen_index'))
+    # Near-duplicates are found across the whole run, not just within a batch
+    dedup_index = open_dedup_index(config.get('dedup'))
+    
+    def make_analysis_worker():
+        # Each analysis worker loads its models and clients once
+        analyzer = NLPAnalyzer(config['nlp'])
+        
+        # New and changed listings only, once per cluster of near-duplicates;
+        # unchanged listings keep their previous results
+        def analyze_batch(batch):
+            return analyze_incremental(
+                batch,
+                lambda changed_listings: analyze_unique(
+                    changed_listings,
+                    lambda unique_listings: analyze_listings(unique_listings, config['nlp'], analyzer),
+                    config.get('dedup'),
+                    index=dedup_index
+                ),
+                config.get('seen_index'),
+                version=analysis_version,
+                index=seen_index
+            )
+        return analyze_batch
+    
+    pipeline = Pipeline(
+        [
+            Stage('filter', lambda batch: filter_by_geography(batch, config['target_states']),
+                  workers=workers.get('filter', 1)),
+            Stage('analyze', worker_factory=make_analysis_worker, workers=workers.get('analyze', 1)),
+            Stage('score', lambda batch: score_listings(batch, config['scoring']),
+                  workers=workers.get('score', 1))
+        ],
+        batch_size=batch_size,
+        queue_size=pipeline_config.get('queue_size', 4)
+    )
+    
+    try:
+        scored_listings = pipeline.run(listings)
+    finally:
+        if seen_index:
+            seen_index.prune()
+            seen_index.close()
+    return scored_listings, pipeline
+
 def main():
     """Main execution function"""
     try:
@@ -55,26 +158,17 @@ def main():
         config = load_config()
         logger.info("Configuration loaded successfully")
         
-        # 1. Scrape LoopNet listings
-        logger.info("Initiating LoopNet scraping")
-        scraper = LoopNetScraper(config['apify']['api_key'])
-        listings = scraper.scrape_listings()
-        logger.info(f"Successfully scraped {len(listings)} listings")
-        
-        # 2. Filter listings by geography
-        logger.info("Filtering listings by geography")
-        filtered_listings = filter_by_geography(listings, config['target_states'])
-        logger.info(f"Filtered to {len(filtered_listings)} listings in target states")
+        # Per-call token, cost and latency records for every analyzer
+        configure_metrics(config.get('metrics'))
         
-        # 3. Analyze listings with NLP
-        logger.info("Analyzing listings with NLP")
-        analyzed_listings = analyze_listings(filtered_listings, config['nlp'])
-        logger.info("NLP analysis complete")
+        # 1. Scrape LoopNet listings, reading the dataset lazily as the pipeline has room
+        logger.info("Initiating LoopNet scraping")
+        listings = iter_scraped_listings(config)
         
-        # 4. Score listings based on investment criteria
-        logger.info("Scoring listings")
-        scored_listings = score_listings(analyzed_listings, config['scoring'])
-        logger.info("Scoring complete")
+        # 2-4. Filter, analyze and score batches of listings concurrently
+        logger.info("Filtering, analyzing and scoring listings")
+        scored_listings, pipeline = process_listings(listings, config)
+        logger.info(f"Pipeline complete with {len(scored_listings)} listings:\n{pipeline.summary()}")
         
         # 5. Export results to Google Sheets
         logger.info("Exporting results to Google Sheets")
@@ -86,6 +180,12 @@ def main():
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
         sys.exit(1)
+        
+    finally:
+        # Report what the analysis cost, including for failed runs
+        metrics = get_metrics()
+        logger.info(f"Analyzer metrics summary:\n{metrics.format_summary()}")
+        metrics.close()
 
 if __name__ == "__main__":
     main()
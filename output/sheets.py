@@ -17,12 +17,14 @@ logger = logging.getLogger(__name__)
 class GoogleSheetsExporter:
     """Class for exporting data to Google Sheets."""
     
-    def __init__(self, config):
+    def __init__(self, config, client=None):
         """
         Initialize the Google Sheets exporter with configuration.
         
         Args:
             config (dict): Google Sheets configuration
+            client (optional): gspread client to use instead of authorizing one,
+                e.g. utils.replay.ReplayGspreadClient for benchmarking offline
         """
         self.config = config
         self.credentials_file = config.get('credentials_file')
@@ -30,7 +32,9 @@ class GoogleSheetsExporter:
         self.worksheet_name = config.get('worksheet_name', 'Opportunities')
         
         # Initialize client
-        self._init_client()
+        self.client = client
+        if self.client is None:
+            self._init_client()
     
     def _init_client(self):
         """
@@ -119,9 +123,20 @@ class GoogleSheetsExporter:
             data_rows = []
             for listing in listings:
                 # Create investment summary
-                from analyzer.scoring import generate_investment_summary
+                from analyzer.scoring import analysis_failed, generate_investment_summary
                 investment_summary = generate_investment_summary(listing)
                 
+                # Failed analyses are marked instead of showing zeros as low scores
+                if analysis_failed(listing):
+                    scores = ['FAILED'] * 4
+                else:
+                    scores = [
+                        listing.get('seller_motivation', {}).get('score', 0),
+                        listing.get('transaction_complexity', {}).get('score', 0),
+                        listing.get('property_characteristics', {}).get('score', 0),
+                        listing.get('total_investment_score', 0)
+                    ]
+                
                 row = [
                     listing.get('id', ''),
                     listing.get('title', ''),
@@ -129,10 +144,7 @@ class GoogleSheetsExporter:
                     listing.get('state', ''),
                     listing.get('propertyType', ''),
                     listing.get('price', ''),
-                    listing.get('seller_motivation', {}).get('score', 0),
-                    listing.get('transaction_complexity', {}).get('score', 0),
-                    listing.get('property_characteristics', {}).get('score', 0),
-                    listing.get('total_investment_score', 0),
+                    *scores,
                     listing.get('description', '')[:500] + ('...' if len(listing.get('description', '')) > 500 else ''),
                     investment_summary,
                     listing.get('url', ''),
@@ -228,13 +240,14 @@ class GoogleSheetsExporter:
         except Exception as e:
             logger.error(f"Error applying conditional formatting: {e}")
 
-def update_google_sheet(listings, sheet_config):
+def update_google_sheet(listings, sheet_config, client=None):
     """
     Update Google Sheet with scored listings.
     
     Args:
         listings (list): List of scored listings
         sheet_config (dict): Google Sheets configuration
+        client (optional): gspread client to use instead of authorizing one
         
     Returns:
         bool: True if update successful, False otherwise
@@ -243,7 +256,7 @@ def update_google_sheet(listings, sheet_config):
         logger.info("Updating Google Sheet with scored listings")
         
         # Initialize exporter
-        exporter = GoogleSheetsExporter(sheet_config)
+        exporter = GoogleSheetsExporter(sheet_config, client)
         
         # Export listings
         success = exporter.export_listings(listings)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Local Apify Client
+
+This module provides an in-memory stand-in for the parts of the Apify client
+LoopNetScraper uses, for testing offline. Actor runs take a configurable
+time to finish and each gets its own dataset, paged exactly like the real
+dataset endpoint. A run's items are a fixed list, the listings of a raw file
+saved by an earlier run, or whatever a responder returns for the run input.
+"""
+
+import time
+import logging
+import threading
+
+from scraper.loopnet import read_raw_listings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalListPage:
+    """
+    One page of dataset items, with the attributes of apify_client's ListPage.
+    """
+
+    def __init__(self, items, offset, limit, total):
+        """
+        Initialize the page.
+
+        Args:
+            items (list): Items on the page
+            offset (int): Index of the first item
+            limit (int): Requested page size
+            total (int): Items in the whole dataset
+        """
+        self.items = items
+        self.offset = offset
+        self.limit = limit
+        self.count = len(items)
+        self.total = total
+        self.desc = False
+
+
+class LocalDatasetClient:
+    """
+    Dataset client serving pages from a list of items.
+
+    Every list_items request is recorded in 'requests' as (offset, limit), so
+    callers can check how a dataset was paged.
+    """
+
+    def __init__(self, items, latency=0.0):
+        """
+        Initialize the dataset.
+
+        Args:
+            items (list): Dataset items
+            latency (float): Seconds each list_items request takes
+        """
+        self._items = items
+        self.latency = latency
+        self.requests = []
+
+    def list_items(self, offset=0, limit=None, **kwargs):
+        """
+        Get one page of items.
+
+        Args:
+            offset (int): Index of the first item
+            limit (int, optional): Maximum items to return; all remaining if None
+
+        Returns:
+            LocalListPage: The page
+        """
+        offset = offset or 0
+        self.requests.append((offset, limit))
+        if self.latency:
+            time.sleep(self.latency)
+        end = len(self._items) if limit is None else offset + limit
+        return LocalListPage(self._items[offset:end], offset, limit, len(self._items))
+
+
+class LocalRunClient:
+    """
+    Run client reporting a local run's status from the time it has been running.
+    """
+
+    def __init__(self, client, run_id):
+        """
+        Initialize the run client.
+
+        Args:
+            client (LocalApifyClient): Client holding the run
+            run_id (str): Run ID
+        """
+        self.client = client
+        self.run_id = run_id
+
+    def get(self):
+        """
+        Get the run's details.
+
+        Returns:
+            dict: Run details with 'id', 'status' and 'defaultDatasetId', or
+                None for an unknown run
+        """
+        with self.client.lock:
+            run = self.client.runs.get(self.run_id)
+            if run is None:
+                return None
+            if run['status'] == 'RUNNING' and time.monotonic() >= run['finishes_at']:
+                run['status'] = 'SUCCEEDED'
+            return self.client.run_details(run)
+
+    def wait_for_finish(self, **kwargs):
+        """Block until the run has finished and return its details."""
+        with self.client.lock:
+            finishes_at = self.client.runs[self.run_id]['finishes_at']
+        time.sleep(max(finishes_at - time.monotonic(), 0))
+        return self.get()
+
+    def abort(self, **kwargs):
+        """Abort the run if it is still running and return its details."""
+        with self.client.lock:
+            run = self.client.runs[self.run_id]
+            if run['status'] == 'RUNNING':
+                run['status'] = 'ABORTED'
+        return self.get()
+
+
+class LocalActorClient:
+    """
+    Actor client starting local runs.
+    """
+
+    def __init__(self, client, actor_id):
+        """
+        Initialize the actor client.
+
+        Args:
+            client (LocalApifyClient): Client holding the runs
+            actor_id (str): Actor ID
+        """
+        self.client = client
+        self.actor_id = actor_id
+
+    def start(self, run_input=None, **kwargs):
+        """
+        Start a run without waiting for it.
+
+        Args:
+            run_input (dict, optional): Actor input
+
+        Returns:
+            dict: Run details with 'id', 'status' and 'defaultDatasetId'
+        """
+        return self.client.start_run(self.actor_id, run_input)
+
+    def call(self, run_input=None, **kwargs):
+        """
+        Start a run and wait for it to finish.
+
+        Args:
+            run_input (dict, optional): Actor input
+
+        Returns:
+            dict: Final run details
+        """
+        run = self.start(run_input)
+        return self.client.run(run['id']).wait_for_finish()
+
+
+class LocalApifyClient:
+    """
+    In-memory stand-in for ApifyClient.
+    """
+
+    def __init__(self, items=None, path=None, responder=None, duration=0.0, page_latency=0.0):
+        """
+        Initialize the client.
+
+        Args:
+            items (list, optional): Listings every run returns
+            path (str, optional): Raw listings file (.json, .jsonl or .jsonl.gz)
+                to load the listings from instead
+            responder (callable, optional): Takes a run input and returns that
+                run's listings; overrides items and path
+            duration (float or callable): Seconds a run takes, or a callable
+                taking the run input and returning them
+            page_latency (float): Seconds each dataset page request takes
+        """
+        if items is None:
+            items = list(read_raw_listings(path)) if path else []
+        self.responder = responder or (lambda run_input: items)
+        self.duration = duration
+        self.page_latency = page_latency
+        self.runs = {}
+        self.datasets = {}
+        self.lock = threading.Lock()
+
+    def start_run(self, actor_id, run_input):
+        """
+        Create a run and its dataset.
+
+        Args:
+            actor_id (str): Actor ID
+            run_input (dict): Actor input
+
+        Returns:
+            dict: Run details
+        """
+        duration = self.duration(run_input) if callable(self.duration) else self.duration
+        items = list(self.responder(run_input))
+
+        with self.lock:
+            number = len(self.runs) + 1
+            run = {
+                'id': f"run_local_{number}",
+                'actor_id': actor_id,
+                'run_input': run_input,
+                'status': 'RUNNING',
+                'finishes_at': time.monotonic() + duration,
+                'dataset_id': f"dataset_local_{number}"
+            }
+            self.runs[run['id']] = run
+            self.datasets[run['dataset_id']] = LocalDatasetClient(items, self.page_latency)
+
+        logger.info(f"Local run {run['id']} of {actor_id} with {len(items)} items")
+        return self.run_details(run)
+
+    def run_details(self, run):
+        """Details of a run in the shape the Apify API returns."""
+        return {'id': run['id'], 'status': run['status'], 'defaultDatasetId': run['dataset_id']}
+
+    def actor(self, actor_id):
+        """Get a client for an actor."""
+        return LocalActorClient(self, actor_id)
+
+    def run(self, run_id):
+        """Get a client for a run."""
+        return LocalRunClient(self, run_id)
+
+    def dataset(self, dataset_id):
+        """Get a client for a dataset."""
+        return self.datasets[dataset_id]
@@ -3,90 +3,382 @@
 LoopNet Scraper Module
 
 This module integrates with the Apify LoopNet Scraper to extract
-commercial real estate listings from LoopNet.
+commercial real estate listings from LoopNet. Results are paged out of the
+run's dataset and yielded lazily, with each page appended to a compressed
+JSONL file, so memory use does not grow with the size of the run. Large
+scrapes can be split into shards that run as concurrent actor runs.
 """
 
 import os
+import gzip
+import time
+import uuid
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import json
 from apify_client import ApifyClient
 
 logger = logging.getLogger(__name__)
 
+# Dataset items fetched per request when paging through a run's results
+DEFAULT_PAGE_SIZE = 1000
+
+# Retries of a failed dataset page, and the delay before the first (doubled per retry)
+PAGE_RETRIES = 4
+PAGE_RETRY_DELAY = 2.0
+
+# Run statuses after which an actor run will not change
+TERMINAL_STATUSES = {'SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT'}
+
 class LoopNetScraper:
     """
     Class for interacting with Apify's LoopNet Scraper to extract commercial real estate listings.
     """
     
-    def __init__(self, apify_api_key, actor_id="epctex/loopnet-scraper"):
+    def __init__(self, apify_api_key, actor_id="epctex/loopnet-scraper", client=None):
         """
         Initialize the LoopNet scraper with API credentials.
         
         Args:
             apify_api_key (str): Apify API key
             actor_id (str): ID of the Apify actor to use (default: epctex/loopnet-scraper)
+            client (optional): Apify client to use instead of creating one, e.g.
+                scraper.local.LocalApifyClient for testing offline
         """
-        self.client = ApifyClient(apify_api_key)
+        self.client = client or ApifyClient(apify_api_key)
         self.actor_id = actor_id
         self.output_dir = "data"
         
         # Create output directory if it doesn't exist
         os.makedirs(self.output_dir, exist_ok=True)
     
-    def scrape_listings(self, property_types=None, search_terms=None, max_items=None):
+    def scrape_listings(self, property_types=None, search_terms=None, max_items=None, shards=1):
         """
         Scrape LoopNet listings using the Apify actor.
         
+        Collects iter_listings into a list; prefer iter_listings for large runs.
+        
         Args:
             property_types (list): List of property types to scrape (e.g., "office", "industrial")
             search_terms (list): Additional search terms (e.g., "for sale")
             max_items (int): Maximum number of items to scrape (None for all)
+            shards (int): Concurrent actor runs to split the start URLs across
             
         Returns:
             list: List of scraped listings
         """
-        try:
-            # Default values if none provided
-            property_types = property_types or ["office", "industrial", "retail", "multifamily", "land", "specialty"]
-            search_terms = search_terms or ["for sale"]
+        return list(self.iter_listings(property_types, search_terms, max_items, shards=shards))
+    
+    def iter_listings(self, property_types=None, search_terms=None, max_items=None, page_size=DEFAULT_PAGE_SIZE,
+                      shards=1, poll_interval=10, run_timeout=None):
+        """
+        Run the Apify actor and yield its listings page by page.
+        
+        Only one page of the dataset is held in memory at a time. Each page is
+        appended to a gzip-compressed JSONL file in the output directory before
+        its listings are yielded. With more than one shard the start URLs are
+        split across concurrent actor runs (see iter_sharded_listings).
+        
+        Args:
+            property_types (list): List of property types to scrape (e.g., "office", "industrial")
+            search_terms (list): Additional search terms (e.g., "for sale")
+            max_items (int): Maximum number of items to scrape (None for all)
+            page_size (int): Dataset items fetched per request
+            shards (int): Concurrent actor runs to split the start URLs across
+            poll_interval (float): Seconds between status checks of sharded runs
+            run_timeout (float, optional): Seconds to wait for sharded runs before
+                aborting them (None to wait indefinitely)
             
-            logger.info(f"Starting LoopNet scrape for {', '.join(property_types)} properties")
+        Yields:
+            dict: Scraped listings in dataset order
+        """
+        if shards > 1:
+            yield from self.iter_sharded_listings(
+                property_types, search_terms, max_items, shards=shards, page_size=page_size,
+                poll_interval=poll_interval, run_timeout=run_timeout
+            )
+            return
+        
+        try:
+            dataset_id = self._run_actor(property_types, search_terms, max_items)
+        except Exception as e:
+            logger.error(f"Error scraping LoopNet listings: {e}")
+            return
+        
+        yield from self.iter_dataset(dataset_id, page_size=page_size, output_path=self._raw_output_path())
+    
+    def iter_sharded_listings(self, property_types=None, search_terms=None, max_items=None, shards=4,
+                              page_size=DEFAULT_PAGE_SIZE, poll_interval=10, run_timeout=None):
+        """
+        Scrape with concurrent actor runs, one per shard of the start URLs.
+        
+        Runs are launched with start() rather than call(), then polled from a
+        thread pool. Each run's dataset is paged through as soon as that run
+        finishes, so wall time is set by the slowest shard rather than the sum
+        of all of them. Listings seen in an earlier shard (by 'id', or 'url' if
+        there is no ID) are skipped. The merged listings are written to one
+        gzip-compressed JSONL file.
+        
+        Args:
+            property_types (list): List of property types to scrape
+            search_terms (list): Additional search terms
+            max_items (int): Maximum number of unique listings to return (None for all);
+                each run is also limited to this many items
+            shards (int): Maximum number of concurrent actor runs
+            page_size (int): Dataset items fetched per request
+            poll_interval (float): Seconds between status checks of a run
+            run_timeout (float, optional): Seconds to wait for a run before aborting
+                it (None to wait indefinitely)
             
-            # Prepare run input
-            run_input = {
-                "startUrls": self._generate_start_urls(property_types, search_terms),
-                "maxItems": max_items,
-                "extendOutputFunction": """
-                    ({ data, item, itemIndex, page, request, customData, label }) => {
-                        return {
-                            ...item,
-                            scraped_at: new Date().toISOString()
-                        }
-                    }
-                """
+        Yields:
+            dict: Unique listings, grouped by run in order of completion
+        """
+        property_types, search_terms = self._search_defaults(property_types, search_terms)
+        start_urls = self._generate_start_urls(property_types, search_terms)
+        shard_urls = [urls for urls in (start_urls[index::shards] for index in range(shards)) if urls]
+        
+        logger.info(f"Starting sharded LoopNet scrape: {len(start_urls)} start URLs in {len(shard_urls)} runs")
+        
+        runs = []
+        for urls in shard_urls:
+            try:
+                run = self.client.actor(self.actor_id).start(run_input=self._build_run_input(urls, max_items))
+                runs.append(run["id"])
+            except Exception as e:
+                logger.error(f"Error starting actor run for {len(urls)} start URLs: {e}")
+        if not runs:
+            return
+        
+        filename = self._raw_output_path()
+        
+        seen = set()
+        count = 0
+        stop = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=len(runs))
+        try:
+            futures = {
+                executor.submit(self._wait_for_run, run_id, poll_interval, run_timeout, stop): run_id
+                for run_id in runs
             }
+            with gzip.open(filename, 'wt', encoding='utf-8') as output:
+                for future in as_completed(futures):
+                    run_id = futures[future]
+                    try:
+                        run = future.result()
+                    except Exception as e:
+                        logger.error(f"Error waiting for actor run {run_id}: {e}")
+                        continue
+                    
+                    if run.get("status") != 'SUCCEEDED':
+                        # Failed and aborted runs keep whatever they scraped before stopping
+                        logger.warning(f"Actor run {run_id} ended with status {run.get('status')}")
+                    if not run.get("defaultDatasetId"):
+                        continue
+                    
+                    for listing in self.iter_dataset(run["defaultDatasetId"], page_size=page_size):
+                        key = listing.get('id', listing.get('url'))
+                        if key is not None:
+                            if key in seen:
+                                continue
+                            seen.add(key)
+                        
+                        output.write(json.dumps(listing) + "\n")
+                        count += 1
+                        yield listing
+                        if max_items and count >= max_items:
+                            return
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.info(f"Read {count} unique listings from {len(runs)} actor runs")
+            if count:
+                logger.info(f"Raw data saved to {filename}")
+    
+    def iter_dataset(self, dataset_id, page_size=DEFAULT_PAGE_SIZE, output_path=None,
+                     retries=PAGE_RETRIES, retry_delay=PAGE_RETRY_DELAY):
+        """
+        Page through a dataset, yielding its items lazily.
+        
+        A page that can't be read is retried with exponential backoff; if it
+        still fails, the error is raised rather than ending the dataset early,
+        so a run never silently carries on with a truncated dataset.
+        
+        Args:
+            dataset_id (str): Apify dataset ID
+            page_size (int): Items fetched per request
+            output_path (str, optional): gzip-compressed JSONL file each page is
+                written to before its items are yielded
+            retries (int): Retries of a failed page request
+            retry_delay (float): Seconds before the first retry, doubled per retry
+            
+        Yields:
+            dict: Dataset items in order
+            
+        Raises:
+            Exception: The last error reading a page, once its retries are used up
+        """
+        dataset = self.client.dataset(dataset_id)
+        output = gzip.open(output_path, 'wt', encoding='utf-8') if output_path else None
+        
+        offset = 0
+        try:
+            while True:
+                page = self._read_page(dataset, dataset_id, offset, page_size, retries, retry_delay)
+                
+                items = page.items
+                if not items:
+                    break
+                
+                if output:
+                    output.write("".join(json.dumps(item) + "\n" for item in items))
+                
+                offset += len(items)
+                logger.debug(f"Read {offset} of {page.total} dataset items")
+                yield from items
+                
+                if page.total is not None and offset >= page.total:
+                    break
+        finally:
+            if output:
+                output.close()
+            logger.info(f"Read {offset} listings from dataset {dataset_id}")
+            if output and offset:
+                logger.info(f"Raw data saved to {output_path}")
+    
+    def _read_page(self, dataset, dataset_id, offset, page_size, retries, retry_delay):
+        """
+        Read one dataset page, retrying failed requests with exponential backoff.
+        
+        Args:
+            dataset: Apify dataset client
+            dataset_id (str): Apify dataset ID, for logging
+            offset (int): Index of the first item
+            page_size (int): Items fetched per request
+            retries (int): Retries of a failed request
+            retry_delay (float): Seconds before the first retry, doubled per retry
+            
+        Returns:
+            ListPage: The page
+        """
+        for attempt in range(retries + 1):
+            try:
+                return dataset.list_items(offset=offset, limit=page_size)
+            except Exception as e:
+                if attempt == retries:
+                    logger.error(f"Giving up on dataset {dataset_id} at offset {offset} after {attempt + 1} attempts: {e}")
+                    raise
+                delay = retry_delay * 2 ** attempt
+                logger.warning(f"Error reading dataset {dataset_id} at offset {offset}, retrying in {delay:.0f}s: {e}")
+                time.sleep(delay)
+    
+    def _raw_output_path(self):
+        """
+        Build a new raw data file path.
+        
+        The random suffix keeps scrapes started within the same second, e.g.
+        by concurrent processes, from writing to the same file.
+        
+        Returns:
+            str: gzip-compressed JSONL path in the output directory
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return f"{self.output_dir}/loopnet_raw_{timestamp}_{uuid.uuid4().hex[:8]}.jsonl.gz"
+    
+    def _wait_for_run(self, run_id, poll_interval=10, run_timeout=None, stop=None):
+        """
+        Poll an actor run until it finishes.
+        
+        Args:
+            run_id (str): Actor run ID
+            poll_interval (float): Seconds between status checks
+            run_timeout (float, optional): Seconds to wait before aborting the run
+            stop (threading.Event, optional): Set to stop waiting early, aborting the run
             
-            # Run the Apify actor
-            logger.info(f"Running Apify actor {self.actor_id} with {len(run_input['startUrls'])} start URLs")
-            run = self.client.actor(self.actor_id).call(run_input=run_input)
+        Returns:
+            dict: Final run details
+        """
+        run_client = self.client.run(run_id)
+        deadline = time.monotonic() + run_timeout if run_timeout else None
+        
+        while True:
+            run = run_client.get()
+            if run is None:
+                raise RuntimeError(f"Actor run {run_id} not found")
+            if run.get("status") in TERMINAL_STATUSES:
+                return run
             
-            # Get dataset items
-            dataset_items = self.client.dataset(run["defaultDatasetId"]).list_items().items
-            logger.info(f"Scraped {len(dataset_items)} listings successfully")
+            if (deadline and time.monotonic() >= deadline) or (stop and stop.is_set()):
+                logger.warning(f"Aborting actor run {run_id}")
+                return run_client.abort()
             
-            # Save raw data to file
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{self.output_dir}/loopnet_raw_{timestamp}.json"
-            with open(filename, 'w') as f:
-                json.dump(dataset_items, f)
-            logger.info(f"Raw data saved to {filename}")
+            if stop:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+    
+    def _run_actor(self, property_types=None, search_terms=None, max_items=None):
+        """
+        Run the Apify actor and wait for it to finish.
+        
+        Args:
+            property_types (list): List of property types to scrape
+            search_terms (list): Additional search terms
+            max_items (int): Maximum number of items to scrape (None for all)
             
-            return dataset_items
+        Returns:
+            str: ID of the run's default dataset
+        """
+        property_types, search_terms = self._search_defaults(property_types, search_terms)
+        
+        logger.info(f"Starting LoopNet scrape for {', '.join(property_types)} properties")
+        
+        run_input = self._build_run_input(self._generate_start_urls(property_types, search_terms), max_items)
+        
+        # Run the Apify actor
+        logger.info(f"Running Apify actor {self.actor_id} with {len(run_input['startUrls'])} start URLs")
+        run = self.client.actor(self.actor_id).call(run_input=run_input)
+        return run["defaultDatasetId"]
+    
+    def _search_defaults(self, property_types, search_terms):
+        """
+        Fill in the default property types and search terms.
+        
+        Args:
+            property_types (list): Property types, or None for all
+            search_terms (list): Search terms, or None for "for sale"
             
-        except Exception as e:
-            logger.error(f"Error scraping LoopNet listings: {e}")
-            return []
+        Returns:
+            tuple: (property_types, search_terms)
+        """
+        property_types = property_types or ["office", "industrial", "retail", "multifamily", "land", "specialty"]
+        search_terms = search_terms or ["for sale"]
+        return property_types, search_terms
+    
+    def _build_run_input(self, start_urls, max_items=None):
+        """
+        Build the actor input for a set of start URLs.
+        
+        Args:
+            start_urls (list): Start URL objects from _generate_start_urls
+            max_items (int): Maximum number of items to scrape (None for all)
+            
+        Returns:
+            dict: Actor run input
+        """
+        return {
+            "startUrls": start_urls,
+            "maxItems": max_items,
+            "extendOutputFunction": """
+                ({ data, item, itemIndex, page, request, customData, label }) => {
+                    return {
+                        ...item,
+                        scraped_at: new Date().toISOString()
+                    }
+                }
+            """
+        }
     
     def _generate_start_urls(self, property_types, search_terms):
         """
@@ -106,4 +398,26 @@ class LoopNetScraper:
                 url = f"https://www.loopnet.com/search/{prop_type}-for-sale/?sk={term.replace(' ', '+')}" 
                 start_urls.append({"url": url})
         
-        return start_urls
\ No newline at end of file
+        return start_urls
+
+def read_raw_listings(path):
+    """
+    Read the listings of a raw data file lazily.
+    
+    Args:
+        path (str): File saved by LoopNetScraper: gzip-compressed JSONL
+            (.jsonl.gz), JSONL (.jsonl) or a JSON list (.json)
+        
+    Yields:
+        dict: Listings in file order
+    """
+    if path.endswith('.json'):
+        with open(path, 'r') as file:
+            yield from json.load(file)
+        return
+    
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
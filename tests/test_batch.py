@@ -0,0 +1,105 @@
+"""Tests for the resumable Batch API job, run against the file-based backend."""
+
+import json
+import os
+
+import pytest
+
+from analyzer.batch import BatchJob, LocalBatchBackend, placeholder_responder
+from analyzer.json_repair import parse_response
+from analyzer.nlp import NLPAnalyzer
+from analyzer.openai_analyzer import RESULT_SCHEMA
+
+
+def make_requests(*names):
+    return {
+        name: {'model': 'gpt-4o-mini', 'messages': [{'role': 'user', 'content': name}]}
+        for name in names
+    }
+
+
+class CountingBackend(LocalBatchBackend):
+    """Local backend that counts submitted batches."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.submitted = []
+
+    def submit(self, input_path):
+        batch_id = super().submit(input_path)
+        self.submitted.append(batch_id)
+        return batch_id
+
+
+def test_run_returns_responder_content_by_custom_id(tmp_path):
+    backend = LocalBatchBackend(str(tmp_path / 'local'), responder=lambda body: body['messages'][0]['content'])
+    job = BatchJob(backend, state_dir=str(tmp_path), poll_interval=0)
+
+    results = job.run(make_requests('a', 'b'))
+
+    assert {custom_id: result['content'] for custom_id, result in results.items()} == {'a': 'a', 'b': 'b'}
+    assert all(result['error'] is None for result in results.values())
+    assert not os.path.exists(job.state_path)
+
+
+def test_interrupted_run_resumes_the_same_batch(tmp_path):
+    backend = CountingBackend(str(tmp_path / 'local'), complete_after_polls=3)
+    requests = make_requests('a', 'b')
+
+    with pytest.raises(TimeoutError):
+        BatchJob(backend, state_dir=str(tmp_path), poll_interval=0, timeout=0).run(requests)
+
+    job = BatchJob(backend, state_dir=str(tmp_path), poll_interval=0)
+    with open(job.state_path) as file:
+        assert json.load(file)['batch_id'] == backend.submitted[0]
+
+    results = job.run(requests)
+
+    assert len(backend.submitted) == 1
+    assert set(results) == {'a', 'b'}
+    assert all(result['error'] is None for result in results.values())
+
+
+def test_changed_requests_abandon_the_saved_batch(tmp_path):
+    backend = CountingBackend(str(tmp_path / 'local'), complete_after_polls=3)
+
+    with pytest.raises(TimeoutError):
+        BatchJob(backend, state_dir=str(tmp_path), poll_interval=0, timeout=0).run(make_requests('a'))
+
+    results = BatchJob(backend, state_dir=str(tmp_path), poll_interval=0).run(make_requests('b'))
+
+    assert len(backend.submitted) == 2
+    assert set(results) == {'b'}
+
+
+def test_placeholder_responder_matches_result_schema():
+    result = parse_response(placeholder_responder({}), RESULT_SCHEMA)
+
+    assert set(result) == set(RESULT_SCHEMA)
+
+
+def test_null_timeout_polls_until_the_batch_finishes(tmp_path):
+    analyzer = NLPAnalyzer({
+        'provider': 'openai',
+        'openai_api_key': 'sk-test',
+        'batch': {'enabled': True, 'backend': 'local', 'state_dir': str(tmp_path), 'timeout_hours': None}
+    })
+
+    assert analyzer.batch_job.timeout is None
+
+
+def test_cascade_tiers_keep_separate_batch_state(tmp_path):
+    analyzer = NLPAnalyzer({
+        'provider': 'cascade',
+        'openai_api_key': 'sk-test',
+        'batch': {'enabled': True, 'backend': 'local', 'state_dir': str(tmp_path)},
+        'cascade': {'tiers': [
+            {'provider': 'openai', 'model': 'gpt-4o-mini'},
+            {'provider': 'openai', 'model': 'o1'}
+        ]}
+    })
+
+    state_paths = [tier['analyzer'].batch_job.state_path for tier in analyzer.cascade_tiers]
+
+    assert len(set(state_paths)) == 2
+    assert all(os.path.dirname(os.path.dirname(path)) == str(tmp_path) for path in state_paths)
@@ -0,0 +1,47 @@
+"""Tests for compacting descriptions to a token budget."""
+
+from analyzer.compaction import DescriptionCompactor
+
+KEYWORDS = {'seller_motivation': ['motivated', 'must sell']}
+
+
+def test_description_within_budget_is_unchanged():
+    compactor = DescriptionCompactor(KEYWORDS, token_budget=100)
+    text = "Motivated seller. Vacant building."
+
+    compacted, stats = compactor.compact(text)
+
+    assert compacted == text
+    assert stats['tokens_saved'] == 0
+
+
+def test_highest_signal_sentences_are_kept():
+    compactor = DescriptionCompactor(KEYWORDS, token_budget=12)
+    text = "Built in 1985 with ample parking for tenants. Motivated seller must sell. Close to the highway exit."
+
+    compacted, stats = compactor.compact(text)
+
+    assert "Motivated seller must sell." in compacted
+    assert stats['compacted_tokens'] <= 12
+
+
+def test_description_without_sentence_breaks_is_cut_to_budget():
+    compactor = DescriptionCompactor(KEYWORDS, token_budget=20)
+    text = " ".join(["motivated seller with a large warehouse"] * 40)
+
+    compacted, stats = compactor.compact(text)
+
+    assert compacted
+    assert text.startswith(compacted)
+    assert stats['compacted_tokens'] <= 20
+    assert stats['sentences_kept'] == 1
+
+
+def test_sentences_longer_than_the_budget_keep_the_best_one():
+    compactor = DescriptionCompactor(KEYWORDS, token_budget=10)
+    text = ("The building has been well kept by the same family for decades and decades. "
+            "The motivated owner must sell the building quickly to settle the estate of the late founder.")
+
+    compacted, _ = compactor.compact(text)
+
+    assert compacted.startswith("The motivated owner must sell")
@@ -0,0 +1,97 @@
+"""Tests for analyzing one listing per cluster of near-duplicates."""
+
+import pytest
+
+from utils.dedup import NearDuplicateIndex, analyze_unique
+
+LONG_TEXT = ("Well maintained multi tenant retail center on a hard corner with strong traffic counts, "
+             "long term national tenants, recent roof replacement, ample parking and room to add a pad site. "
+             "Motivated seller is retiring and wants a quick close.")
+
+
+def analyze(listings):
+    for listing in listings:
+        listing['analyzed'] = True
+        listing['total_score'] = len(listing.get('description', ''))
+    return listings
+
+
+def test_reposted_listing_shares_the_result():
+    listings = [
+        {'id': 1, 'description': LONG_TEXT},
+        {'id': 2, 'description': LONG_TEXT},
+    ]
+
+    results = analyze_unique(listings, analyze, {'threshold': 0.85})
+
+    assert results[1]['duplicate_of'] == 1
+    assert results[1]['total_score'] == results[0]['total_score']
+
+
+def test_short_boilerplate_is_not_shared_without_matching_address():
+    listings = [
+        {'id': 1, 'description': "Contact broker for details."},
+        {'id': 2, 'description': "Contact broker for details."},
+    ]
+
+    results = analyze_unique(listings, analyze, {'threshold': 0.85})
+
+    assert 'duplicate_of' not in results[1]
+    assert results[1]['analyzed']
+
+
+def test_short_text_is_shared_when_address_and_price_match():
+    listings = [
+        {'id': 1, 'description': "Contact broker for details.", 'address': '1 Main St, Austin, TX', 'price': '$1,000,000'},
+        {'id': 2, 'description': "Contact broker for details.", 'address': '1 Main St., Austin TX', 'price': '$1,000,000'},
+    ]
+
+    results = analyze_unique(listings, analyze, {'threshold': 0.85})
+
+    assert results[1]['duplicate_of'] == 1
+
+
+def test_different_addresses_are_analyzed_separately():
+    listings = [
+        {'id': 1, 'description': LONG_TEXT, 'address': '1 Main St, Austin, TX'},
+        {'id': 2, 'description': LONG_TEXT, 'address': '9 Elm St, Dallas, TX'},
+    ]
+
+    results = analyze_unique(listings, analyze, {'threshold': 0.85})
+
+    assert 'duplicate_of' not in results[1]
+    assert results[1]['analyzed']
+
+
+def test_duplicates_in_later_batches_share_the_result():
+    index = NearDuplicateIndex(threshold=0.85)
+    calls = []
+
+    def counting(listings):
+        calls.append([listing['id'] for listing in listings])
+        return analyze(listings)
+
+    analyze_unique([{'id': 1, 'description': LONG_TEXT}], counting, index=index)
+    results = analyze_unique(
+        [{'id': 2, 'description': LONG_TEXT}, {'id': 3, 'description': "Vacant land near the highway."}],
+        counting,
+        index=index
+    )
+
+    assert calls == [[1], [3]]
+    assert results[0]['duplicate_of'] == 1
+    assert results[0]['total_score'] == len(LONG_TEXT)
+
+
+def test_duplicates_of_a_failed_batch_are_analyzed_on_their_own():
+    index = NearDuplicateIndex(threshold=0.85)
+
+    def failing(listings):
+        raise RuntimeError("analysis failed")
+
+    with pytest.raises(RuntimeError):
+        analyze_unique([{'id': 1, 'description': LONG_TEXT}], failing, index=index)
+    results = analyze_unique([{'id': 2, 'description': LONG_TEXT}], analyze, index=index)
+
+    assert 'duplicate_of' not in results[0]
+    assert results[0]['analyzed']
@@ -0,0 +1,38 @@
+"""Tests for the spaCy document cache shared by analysis workers."""
+
+import spacy
+
+from analyzer.doc_cache import DocCache
+
+
+def test_workers_share_entries_and_the_size_bound(tmp_path):
+    nlp = spacy.blank('en')
+    first = DocCache(str(tmp_path), nlp)
+    second = DocCache(str(tmp_path), nlp)
+
+    first.put("Motivated seller, priced to sell.", nlp("Motivated seller, priced to sell."))
+    doc = second.get("Motivated  seller, priced to sell.")
+
+    assert doc is not None and doc.text == "Motivated seller, priced to sell."
+    assert second.stats()['entries'] == 1
+
+    # Each cache alone would stay under the bound; together they must not exceed it
+    size = first.stats()['size_bytes']
+    first.max_bytes = second.max_bytes = int(size * 2.5)
+    for index in range(2):
+        first.put(f"First worker listing {index}", nlp(f"First worker listing {index}"))
+        second.put(f"Second worker listing {index}", nlp(f"Second worker listing {index}"))
+
+    on_disk = sum(path.stat().st_size for path in tmp_path.glob('*.spacy'))
+    assert on_disk == first.stats()['size_bytes'] <= first.max_bytes
+
+
+def test_entries_written_by_another_process_are_hits(tmp_path):
+    nlp = spacy.blank('en')
+    cache = DocCache(str(tmp_path), nlp)
+
+    # Written by another process after this one loaded the index
+    cache.put("Vacant warehouse", nlp("Vacant warehouse"))
+    cache.index.discard(cache.key("Vacant warehouse"))
+
+    assert cache.get("Vacant warehouse") is not None
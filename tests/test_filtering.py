@@ -0,0 +1,50 @@
+"""Tests for filtering listings by state."""
+
+import pytest
+
+from benchmark import _legacy_filter_by_geography
+from utils.filtering import filter_by_geography, iter_by_geography
+
+TARGET_STATES = ['tx', 'OK']
+
+WITH_STATE = [
+    {'id': 1, 'state': 'TX', 'address': '1 Main St, Dallas, TX 75201'},
+    {'id': 2, 'state': 'ok', 'address': '2 Main St, Tulsa, OK 74103'},
+    {'id': 3, 'state': 'CA', 'address': '3 Main St, Austin, TX 78701'},
+    {'id': 4, 'state': 'NM', 'address': ''},
+]
+
+ADDRESS_ONLY = [
+    {'id': 5, 'address': '5 Main St, Austin, TX 78701'},
+    {'id': 6, 'address': '6 Main St, Norman, ok, 73069'},
+    {'id': 7, 'address': '7 Main St, Denver, CO 80202'},
+    {'id': 8, 'address': 'Texas'},
+    {'id': 9, 'address': None},
+    {'id': 10, 'address': '10 Main St, Austin, Texas 78701'},
+]
+
+
+@pytest.mark.parametrize('listings', [WITH_STATE, ADDRESS_ONLY], ids=['state', 'address'])
+def test_matches_legacy_filter(listings):
+    expected = [listing['id'] for listing in _legacy_filter_by_geography(listings, TARGET_STATES)]
+
+    assert [listing['id'] for listing in iter_by_geography(listings, TARGET_STATES)] == expected
+    assert [listing['id'] for listing in filter_by_geography(listings, TARGET_STATES)] == expected
+
+
+def test_blank_state_falls_back_to_the_address():
+    listings = [
+        {'id': 1, 'state': '', 'address': '1 Main St, Austin, TX 78701'},
+        {'id': 2, 'state': '  ', 'address': '2 Main St, Tulsa, OK 74103'},
+        {'id': 3, 'state': None, 'address': '3 Main St, Dallas, TX 75201'},
+        {'id': 4, 'state': '', 'address': '4 Main St, Denver, CO 80202'},
+        {'id': 5, 'state': ' tx ', 'address': ''},
+    ]
+
+    assert [listing['id'] for listing in iter_by_geography(listings, TARGET_STATES)] == [1, 2, 3, 5]
+
+
+def test_listings_pass_through_unchanged():
+    listing = WITH_STATE[0]
+
+    assert next(iter_by_geography(iter([listing]), TARGET_STATES)) is listing
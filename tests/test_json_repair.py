@@ -0,0 +1,15 @@
+"""Tests for validating repaired model responses."""
+
+import pytest
+
+from analyzer.json_repair import InvalidResponseError, parse_response
+
+
+@pytest.mark.parametrize('number', ['NaN', 'Infinity', '-Infinity', '1e999'])
+def test_non_finite_scores_are_rejected(number):
+    with pytest.raises(InvalidResponseError):
+        parse_response(f'{{"score": {number}}}', {'score': float})
+
+
+def test_numeric_strings_are_coerced():
+    assert parse_response('{"score": "7/10"}', {'score': float}) == {'score': 7}
@@ -0,0 +1,52 @@
+"""Tests for parsing streamed JSON objects field by field."""
+
+import json
+import random
+
+import pytest
+
+from analyzer.json_stream import IncrementalJSONParser
+
+RESPONSE = json.dumps({
+    'seller_motivation_score': 7,
+    'total_score': 6.5,
+    'seller_motivation_analysis': {'explanation': 'Says "must sell", {urgent}, [retiring]', 'keywords': ['must sell']},
+    'summary': 'Escaped \\ backslash, comma, and closing } brace'
+})
+
+
+def feed_in_chunks(text, sizes):
+    parser = IncrementalJSONParser()
+    fields = []
+    position = 0
+    for size in sizes:
+        fields.extend(parser.feed(text[position:position + size]))
+        position += size
+    fields.extend(parser.feed(text[position:]))
+    return parser, fields
+
+
+def test_whole_response_gives_every_field():
+    parser = IncrementalJSONParser()
+
+    assert dict(parser.feed(RESPONSE)) == json.loads(RESPONSE)
+    assert parser.complete
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_chunked_response_gives_the_same_fields_in_order(seed):
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 12) for _ in range(len(RESPONSE))]
+
+    parser, fields = feed_in_chunks(RESPONSE, sizes)
+
+    assert fields == list(json.loads(RESPONSE).items())
+    assert parser.fields == json.loads(RESPONSE)
+
+
+def test_one_character_at_a_time_inside_a_code_fence():
+    text = "```json\n" + RESPONSE + "\n```"
+
+    parser, fields = feed_in_chunks(text, [1] * len(text))
+
+    assert dict(fields) == json.loads(RESPONSE)
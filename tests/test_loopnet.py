@@ -0,0 +1,211 @@
+"""Tests for paging LoopNet results out of the actor's dataset."""
+
+import gzip
+import json
+import time
+
+import pytest
+
+from scraper.local import LocalApifyClient
+from scraper.loopnet import LoopNetScraper, read_raw_listings
+
+PROPERTY_TYPES = ['office', 'industrial', 'retail', 'multifamily', 'land', 'specialty']
+
+
+def make_listings(count, prefix='listing'):
+    return [{'id': f"{prefix}-{number}", 'description': f"Listing number {number}"} for number in range(count)]
+
+
+def shard_number(run_input):
+    """Position of a run's first start URL among PROPERTY_TYPES."""
+    return PROPERTY_TYPES.index(run_input['startUrls'][0]['url'].split('/')[4].replace('-for-sale', ''))
+
+
+@pytest.fixture
+def make_scraper(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    def make(items=None, **kwargs):
+        client = LocalApifyClient(items=items if items is not None else make_listings(10), **kwargs)
+        scraper = LoopNetScraper(None, client=client)
+        scraper.output_dir = str(tmp_path)
+        return scraper
+    return make
+
+
+def dataset_of(scraper):
+    client = scraper.client
+    return client.datasets[next(iter(client.runs.values()))['dataset_id']]
+
+
+def test_dataset_is_paged_by_offset_and_limit(make_scraper):
+    scraper = make_scraper(make_listings(10))
+
+    listings = list(scraper.iter_listings(page_size=4))
+
+    assert [listing['id'] for listing in listings] == [f"listing-{number}" for number in range(10)]
+    assert dataset_of(scraper).requests == [(0, 4), (4, 4), (8, 4)]
+
+
+def test_exact_multiple_of_page_size_stops_at_total(make_scraper):
+    scraper = make_scraper(make_listings(8))
+
+    assert len(list(scraper.iter_listings(page_size=4))) == 8
+    assert dataset_of(scraper).requests == [(0, 4), (4, 4)]
+
+
+def test_empty_dataset_yields_nothing(make_scraper):
+    scraper = make_scraper([])
+
+    assert list(scraper.iter_listings(page_size=4)) == []
+    assert dataset_of(scraper).requests == [(0, 4)]
+
+
+def test_pages_are_written_to_gzip_jsonl(make_scraper, tmp_path):
+    scraper = make_scraper(make_listings(5))
+    output_path = str(tmp_path / 'raw.jsonl.gz')
+    client = scraper.client
+    run = client.actor('actor').call(run_input={})
+
+    listings = list(scraper.iter_dataset(run['defaultDatasetId'], page_size=2, output_path=output_path))
+
+    with gzip.open(output_path, 'rt', encoding='utf-8') as file:
+        assert [json.loads(line) for line in file] == listings
+    assert list(read_raw_listings(output_path)) == listings
+
+
+def test_iter_listings_saves_a_raw_file(make_scraper, tmp_path):
+    scraper = make_scraper(make_listings(3))
+
+    listings = list(scraper.iter_listings(page_size=2))
+
+    raw_files = list(tmp_path.glob('loopnet_raw_*.jsonl.gz'))
+    assert len(raw_files) == 1
+    assert list(read_raw_listings(str(raw_files[0]))) == listings
+
+
+def test_iter_dataset_reads_pages_only_as_consumed(make_scraper):
+    scraper = make_scraper(make_listings(10))
+    run = scraper.client.actor('actor').call(run_input={})
+    dataset = scraper.client.dataset(run['defaultDatasetId'])
+
+    listings = scraper.iter_dataset(run['defaultDatasetId'], page_size=3)
+    assert dataset.requests == []
+
+    for _ in range(3):
+        next(listings)
+    assert dataset.requests == [(0, 3)]
+
+    next(listings)
+    assert dataset.requests == [(0, 3), (3, 3)]
+    listings.close()
+
+
+def test_iter_listings_starts_the_run_on_first_use(make_scraper):
+    scraper = make_scraper(make_listings(10))
+
+    listings = scraper.iter_listings(page_size=5)
+    assert scraper.client.runs == {}
+
+    assert next(listings)['id'] == 'listing-0'
+    assert dataset_of(scraper).requests == [(0, 5)]
+    listings.close()
+
+
+def test_start_urls_are_sharded_round_robin(make_scraper):
+    scraper = make_scraper(make_listings(1))
+
+    list(scraper.iter_sharded_listings(PROPERTY_TYPES, shards=4, poll_interval=0.01))
+
+    shards = [[url['url'] for url in run['run_input']['startUrls']] for run in scraper.client.runs.values()]
+    urls = [url['url'] for url in scraper._generate_start_urls(PROPERTY_TYPES, ["for sale"])]
+    assert sorted(shards) == sorted([urls[0::4], urls[1::4], urls[2::4], urls[3::4]])
+
+
+def test_shards_are_merged_without_duplicates(make_scraper):
+    def responder(run_input):
+        shard = shard_number(run_input)
+        # Every shard returns the shared listings, plus one of its own
+        return [{'id': 'shared'}, {'url': 'https://www.loopnet.com/Listing/shared'}, {'id': f"own-{shard}"}]
+
+    scraper = make_scraper(responder=responder)
+
+    listings = list(scraper.iter_sharded_listings(PROPERTY_TYPES, shards=3, poll_interval=0.01))
+
+    keys = [listing.get('id', listing.get('url')) for listing in listings]
+    assert sorted(keys) == sorted(['shared', 'https://www.loopnet.com/Listing/shared', 'own-0', 'own-1', 'own-2'])
+
+
+def test_runs_past_the_timeout_are_aborted_and_keep_their_listings(make_scraper):
+    def duration(run_input):
+        return 0.0 if shard_number(run_input) == 0 else 30.0
+
+    scraper = make_scraper(responder=lambda run_input: [{'id': f"shard-{shard_number(run_input)}"}], duration=duration)
+
+    listings = list(scraper.iter_sharded_listings(PROPERTY_TYPES, shards=2, poll_interval=0.01, run_timeout=0.2))
+
+    statuses = sorted(run['status'] for run in scraper.client.runs.values())
+    assert statuses == ['ABORTED', 'SUCCEEDED']
+    assert sorted(listing['id'] for listing in listings) == ['shard-0', 'shard-1']
+
+
+def test_closing_the_generator_aborts_runs_still_going(make_scraper):
+    def duration(run_input):
+        return 0.0 if shard_number(run_input) == 0 else 30.0
+
+    scraper = make_scraper(make_listings(3), duration=duration)
+
+    listings = scraper.iter_sharded_listings(PROPERTY_TYPES, shards=3, poll_interval=0.01)
+    next(listings)
+    listings.close()
+
+    # The waiting threads abort their runs on their next poll
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        statuses = sorted(run['status'] for run in scraper.client.runs.values())
+        if 'RUNNING' not in statuses:
+            break
+        time.sleep(0.01)
+    assert statuses == ['ABORTED', 'ABORTED', 'SUCCEEDED']
+
+
+def test_raw_files_started_in_the_same_second_do_not_collide(make_scraper):
+    scraper = make_scraper()
+
+    assert len({scraper._raw_output_path() for _ in range(20)}) == 20
+
+
+def failing_pages(monkeypatch, failures):
+    """Make the first `failures` dataset page requests raise."""
+    from scraper.local import LocalDatasetClient
+    list_items = LocalDatasetClient.list_items
+    calls = []
+
+    def flaky(self, *args, **kwargs):
+        calls.append(kwargs.get('offset'))
+        if len(calls) <= failures:
+            raise ConnectionError("connection reset")
+        return list_items(self, *args, **kwargs)
+
+    monkeypatch.setattr(LocalDatasetClient, 'list_items', flaky)
+    return calls
+
+
+def test_failed_pages_are_retried(make_scraper, monkeypatch):
+    scraper = make_scraper(make_listings(6))
+    run = scraper.client.actor('actor').call(run_input={})
+    calls = failing_pages(monkeypatch, 2)
+
+    listings = list(scraper.iter_dataset(run['defaultDatasetId'], page_size=4, retry_delay=0))
+
+    assert len(listings) == 6
+    assert calls == [0, 0, 0, 4]
+
+
+def test_page_still_failing_after_retries_raises(make_scraper, monkeypatch):
+    scraper = make_scraper(make_listings(6))
+    run = scraper.client.actor('actor').call(run_input={})
+    failing_pages(monkeypatch, 10)
+
+    with pytest.raises(ConnectionError):
+        list(scraper.iter_dataset(run['defaultDatasetId'], page_size=4, retries=2, retry_delay=0))
@@ -0,0 +1,32 @@
+"""Tests for the Prometheus metrics file written by concurrent workers."""
+
+import threading
+
+from analyzer.metrics import MetricsRegistry, PrometheusMetricsSink
+
+
+def test_concurrent_flushes_leave_a_complete_file(tmp_path):
+    path = tmp_path / 'analyzer.prom'
+    sink = PrometheusMetricsSink(str(path), flush_interval=0)
+    registry = MetricsRegistry([sink])
+    errors = []
+
+    def worker():
+        for _ in range(50):
+            registry.record('openai', model='gpt-4o-mini', latency=0.1, prompt_tokens=10)
+            try:
+                # The registry logs sink failures, so flush directly to see them
+                sink.flush()
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.close()
+
+    assert not errors
+    assert path.read_text() == sink.render()
+    assert 'calls_total{analyzer="openai",model="gpt-4o-mini"} 400' in path.read_text()
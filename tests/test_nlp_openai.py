@@ -0,0 +1,56 @@
+"""Tests for concurrent OpenAI analysis of a batch of listings."""
+
+import asyncio
+import json
+import re
+
+import httpx
+
+from analyzer.clients import set_transports
+from analyzer.nlp import NLPAnalyzer
+from analyzer.scoring import analysis_failed
+
+
+def test_concurrent_results_keep_input_order_and_per_listing_failures():
+    async def handler(request):
+        body = json.loads(request.content)
+        number = int(re.search(r'Listing (\d+)', body['messages'][-1]['content']).group(1))
+        # Later listings answer first, so completion order is the reverse of input order
+        await asyncio.sleep(0.01 * (6 - number))
+        if number == 2:
+            return httpx.Response(400, json={'error': {'message': 'bad request'}})
+        result = {
+            'seller_motivation_score': number,
+            'transaction_complexity_score': number,
+            'property_characteristics_score': number,
+            'total_score': number,
+            'seller_motivation_analysis': {'explanation': 'e', 'keywords': []},
+            'transaction_complexity_analysis': {'explanation': 'e', 'keywords': []},
+            'property_characteristics_analysis': {'explanation': 'e', 'keywords': []},
+            'summary': f"Listing {number}"
+        }
+        completion = {
+            'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': body['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': json.dumps(result)}}],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20}
+        }
+        return httpx.Response(200, json=completion)
+
+    set_transports(async_transport=httpx.MockTransport(handler))
+    try:
+        analyzer = NLPAnalyzer({
+            'provider': 'openai', 'openai_api_key': 'concurrent-key', 'model': 'gpt-4o-mini',
+            'concurrency': {'max_concurrency': 6, 'max_retries': 0}
+        })
+        listings = [{'id': number, 'name': f"Listing {number}", 'description': 'Office building'}
+                    for number in range(1, 6)]
+
+        results = analyzer.analyze_batch(listings)
+    finally:
+        set_transports()
+
+    assert [listing['id'] for listing in results] == [1, 2, 3, 4, 5]
+    assert [analysis_failed(listing) for listing in results] == [False, True, False, False, False]
+    assert [listing['total_score'] for listing in results if not analysis_failed(listing)] == [1, 3, 4, 5]
+    assert 'bad request' in results[1]['analysis_metadata']['error']
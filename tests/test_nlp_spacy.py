@@ -0,0 +1,95 @@
+"""Tests for the spaCy provider's keyword vectors, phrase matching and nlp.pipe batches."""
+
+import numpy as np
+import pytest
+import spacy
+
+import analyzer.nlp
+from analyzer.nlp import NLPAnalyzer
+
+KEYWORDS = {
+    'seller_motivation': ['motivated', 'must sell', 'owner retiring', 'distressed'],
+    'transaction_complexity': ['short sale', 'legal issues', 'auction'],
+    'property_characteristics': ['value add', 'deferred maintenance', 'vacant']
+}
+
+# Small stand-in for en_core_web_md's vectors: "troubled" is close to
+# "distressed", "empty" to "vacant", and "parking" is unrelated to everything
+VECTORS = {
+    'distressed': [1.0, 0.0, 0.0],
+    'troubled': [0.95, 0.1, 0.0],
+    'vacant': [0.0, 1.0, 0.0],
+    'empty': [0.1, 0.9, 0.1],
+    'parking': [0.0, 0.0, 1.0],
+}
+
+LISTINGS = [
+    {'id': 1, 'description': "Motivated seller, MUST SELL. Owner retiring after 30 years."},
+    {'id': 2, 'description': "A troubled asset with deferred maintenance and an empty second floor."},
+    {'id': 3, 'description': ""},
+    {'id': 4, 'description': "Short sale subject to legal issues; plenty of parking. Value add."},
+    {'id': 5, 'description': "Auction of a vacant building, must sell."},
+]
+
+
+@pytest.fixture
+def spacy_analyzer(monkeypatch):
+    nlp = spacy.blank('en')
+    for word, vector in VECTORS.items():
+        nlp.vocab.set_vector(word, np.array(vector, dtype=np.float32))
+    monkeypatch.setattr(analyzer.nlp.spacy, 'load', lambda name: nlp)
+    return NLPAnalyzer({'provider': 'spacy', 'keywords': KEYWORDS, 'spacy': {'similarity_threshold': 0.7}})
+
+
+def copies(listings):
+    return [dict(listing) for listing in listings]
+
+
+def reference_similar_tokens(nlp, text, keywords, threshold):
+    """Tokens whose similarity to a keyword's first token passes the threshold, one pair at a time."""
+    found = []
+    for token in nlp(text):
+        if not token.has_vector:
+            continue
+        for keyword in keywords:
+            keyword_token = nlp.make_doc(keyword)[0]
+            if keyword_token.has_vector and token.similarity(keyword_token) > threshold and token.text not in found:
+                found.append(token.text)
+    return found
+
+
+def test_keyword_vectors_match_pairwise_similarity(spacy_analyzer):
+    text = LISTINGS[1]['description']
+    result = spacy_analyzer._analyze_with_spacy(text)
+
+    for category, keywords in KEYWORDS.items():
+        similar = [
+            factor for factor in result[category]['factors'] if factor.lower() not in keywords
+        ]
+        assert similar == reference_similar_tokens(spacy_analyzer.nlp, text, keywords, 0.7)
+
+    assert result['seller_motivation']['factors'] == ['troubled']
+    assert result['property_characteristics']['factors'] == ['deferred maintenance', 'empty']
+
+
+def test_phrase_matcher_finds_the_same_keywords_as_the_regex_path(spacy_analyzer):
+    for listing in LISTINGS:
+        text = listing['description']
+        if not text:
+            continue
+        phrase_hits = spacy_analyzer._analyze_with_spacy(text)
+        keyword_hits = spacy_analyzer._analyze_with_keywords(text)
+        for category, keywords in KEYWORDS.items():
+            exact = {factor.lower() for factor in phrase_hits[category]['factors'] if factor.lower() in keywords}
+            assert exact == {factor.lower() for factor in keyword_hits[category]['factors']}
+
+
+def test_pipe_batches_match_single_listing_analysis(spacy_analyzer):
+    batched = spacy_analyzer.analyze_batch(copies(LISTINGS))
+    single = [spacy_analyzer.analyze_listing(listing) for listing in copies(LISTINGS)]
+
+    assert [listing['id'] for listing in batched] == [listing['id'] for listing in LISTINGS]
+    for batch_listing, single_listing in zip(batched, single):
+        for category in KEYWORDS:
+            assert batch_listing[category] == single_listing[category]
+        assert batch_listing['total_score'] == single_listing['total_score']
@@ -0,0 +1,116 @@
+"""Tests for OpenAIAnalyzer caching and routing."""
+
+import json
+
+import httpx
+import pytest
+
+from analyzer.clients import ModelRouter, get_client, set_transports
+from analyzer.openai_analyzer import OpenAIAnalyzer
+from analyzer.response_cache import ResponseCache
+from analyzer.resilience import ResilientCaller
+
+RESULT = {
+    'seller_motivation_score': 5,
+    'transaction_complexity_score': 3,
+    'property_characteristics_score': 4,
+    'total_score': 4.1,
+    'seller_motivation_analysis': {'explanation': 'e', 'keywords': []},
+    'transaction_complexity_analysis': {'explanation': 'e', 'keywords': []},
+    'property_characteristics_analysis': {'explanation': 'e', 'keywords': []},
+    'summary': 's'
+}
+
+LISTING = {'name': 'Corner Retail', 'description': 'Retail center, motivated seller.'}
+
+
+def completion(model, content):
+    return {
+        'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': model,
+        'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': content}}],
+        'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20}
+    }
+
+
+@pytest.fixture
+def requests_sent():
+    """Answer chat completions with RESULT and record the request bodies."""
+    sent = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        sent.append(body)
+        if 'listing_id' in body['messages'][0]['content']:
+            # Packed requests run out of completion tokens mid-JSON
+            content = json.dumps({'results': [dict(RESULT, listing_id=1)]})[:150]
+            return httpx.Response(200, json=completion(body['model'], content))
+        if body.get('stream'):
+            content = json.dumps(RESULT)
+            chunks = [
+                {'id': 'x', 'object': 'chat.completion.chunk', 'created': 0, 'model': body['model'],
+                 'choices': [{'index': 0, 'delta': {'content': content[start:start + 40]}, 'finish_reason': None}]}
+                for start in range(0, len(content), 40)
+            ]
+            text = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+            return httpx.Response(200, text=text, headers={'content-type': 'text/event-stream'})
+        return httpx.Response(200, json=completion(body['model'], json.dumps(RESULT)))
+
+    set_transports(httpx.MockTransport(handler))
+    yield sent
+    set_transports()
+
+
+def routed_analyzer(cache):
+    router = ModelRouter(get_client('router-key'), models=['gpt-4o-mini', 'gpt-4o'], probe_fraction=0)
+    return OpenAIAnalyzer(
+        api_key='router-key', model='auto', cache=cache, router=router,
+        resilience=ResilientCaller(max_retries=0, base_delay=0)
+    )
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_routed_results_are_cached_under_the_model_that_answered(tmp_path, requests_sent, stream):
+    cache = ResponseCache(str(tmp_path / 'cache.sqlite'))
+    analyzer = routed_analyzer(cache)
+
+    def analyze():
+        if stream:
+            return list(analyzer.analyze_listing_stream(dict(LISTING)))[-1]
+        return analyzer.analyze_listing(dict(LISTING))
+
+    first = analyze()
+    second = analyze()
+
+    assert first['metadata']['model'] == 'gpt-4o-mini'
+    assert second['metadata'] == {'model': 'gpt-4o-mini', 'attempts': [], 'cached': True, 'failed': False}
+    assert len(requests_sent) == 1
+
+    params = analyzer.request_params(LISTING)
+    assert cache.get(analyzer.cache_key(params, 'gpt-4o-mini')) is not None
+    assert cache.get(analyzer.cache_key(params)) is None
+
+
+def test_truncated_packed_response_falls_back_to_single_requests(requests_sent):
+    analyzer = OpenAIAnalyzer(
+        api_key='packing-key', model='gpt-4o-mini', resilience=ResilientCaller(max_retries=0, base_delay=0)
+    )
+    listings = [dict(LISTING, name=f'Listing {index}') for index in range(3)]
+
+    results = analyzer.analyze_packed(listings)
+
+    assert len(requests_sent) == 4
+    assert [result['total_score'] for result in results] == [4.1] * 3
+    assert not any(result['metadata']['failed'] for result in results)
+
+
+def test_reasoning_models_are_not_packed(requests_sent):
+    analyzer = OpenAIAnalyzer(
+        api_key='packing-key', model='o3-mini', resilience=ResilientCaller(max_retries=0, base_delay=0)
+    )
+    listings = [dict(LISTING, name=f'Listing {index}') for index in range(3)]
+
+    results = analyzer.analyze_packed(listings)
+
+    assert len(requests_sent) == 3
+    assert all('listing_id' not in body['messages'][0]['content'] for body in requests_sent)
+    assert [result['total_score'] for result in results] == [4.1] * 3
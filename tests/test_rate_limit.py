@@ -0,0 +1,95 @@
+"""Tests for the process-wide OpenAI rate limiter."""
+
+import asyncio
+import json
+import threading
+
+import httpx
+
+from analyzer.clients import set_transports
+from analyzer.openai_analyzer import OpenAIAnalyzer
+from analyzer.rate_limit import AsyncRateLimiter, get_rate_limiter, run_async, run_concurrently
+
+RESULT = {
+    'seller_motivation_score': 5,
+    'transaction_complexity_score': 3,
+    'property_characteristics_score': 4,
+    'total_score': 4.1,
+    'seller_motivation_analysis': {'explanation': 'e', 'keywords': []},
+    'transaction_complexity_analysis': {'explanation': 'e', 'keywords': []},
+    'property_characteristics_analysis': {'explanation': 'e', 'keywords': []},
+    'summary': 's'
+}
+
+
+def test_limiter_is_shared_per_key_and_model():
+    limiter = get_rate_limiter('shared-key', 'gpt-4o-mini', max_concurrency=3)
+
+    assert get_rate_limiter('shared-key', 'gpt-4o-mini', max_concurrency=10) is limiter
+    assert limiter.max_concurrency == 3
+    assert get_rate_limiter('shared-key', 'gpt-4o') is not limiter
+
+
+def test_threads_and_batches_share_the_concurrency_limit():
+    in_flight = {'now': 0, 'peak': 0}
+
+    async def handler(request):
+        in_flight['now'] += 1
+        in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        await asyncio.sleep(0.02)
+        in_flight['now'] -= 1
+        completion = {
+            'id': 'x', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o-mini',
+            'choices': [{
+                'index': 0, 'finish_reason': 'stop',
+                'message': {'role': 'assistant', 'content': json.dumps(RESULT)}
+            }],
+            'usage': {'prompt_tokens': 10, 'completion_tokens': 10, 'total_tokens': 20}
+        }
+        return httpx.Response(200, json=completion)
+
+    set_transports(async_transport=httpx.MockTransport(handler))
+    try:
+        listings = [{'name': f'Listing {index}', 'description': 'Office building'} for index in range(6)]
+
+        async def collect(analyzer):
+            return [result async for result in analyzer.analyze_many(listings, max_concurrency=2)]
+
+        def worker():
+            # Each worker analyzes its own batches with its own analyzer
+            analyzer = OpenAIAnalyzer(api_key='limit-test-key', model='gpt-4o-mini')
+            for _ in range(2):
+                results = run_async(collect(analyzer))
+                assert len(results) == len(listings)
+
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        set_transports()
+
+    assert in_flight['peak'] <= 2
+
+
+def test_stopping_early_releases_in_flight_slots():
+    limiter = AsyncRateLimiter(max_concurrency=3)
+
+    def job(delay):
+        async def call():
+            await asyncio.sleep(delay)
+            return delay, None
+        return call
+
+    async def run():
+        jobs = [(index, 1, job(0 if index == 0 else 10)) for index in range(3)]
+        results = run_concurrently(jobs, limiter)
+        first = await results.__anext__()
+        await results.aclose()
+        return first
+
+    key, result, error = asyncio.run(run())
+
+    assert (key, error) == (0, None)
+    assert limiter.in_flight == 0
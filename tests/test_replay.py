@@ -0,0 +1,60 @@
+"""Tests for recording OpenAI traffic, replaying it and synthesizing corpora."""
+
+import asyncio
+import json
+
+import httpx
+
+from utils.replay import (AsyncReplayTransport, Fixture, Recorder, RecordingTransport,
+                          ReplayTransport, synthesize_listings)
+
+LISTINGS = [
+    {'id': 1, 'url': 'https://example.com/1', 'price': '$1,250,000',
+     'description': "Motivated seller. Owner retiring after 30 years. Value add opportunity."},
+    {'id': 2, 'url': 'https://example.com/2', 'price': 900000,
+     'description': "Vacant office building! Deferred maintenance throughout. Short sale?"},
+]
+
+URL = 'https://api.openai.com/v1/chat/completions'
+
+
+def record_fixture(path, requests):
+    def handler(request):
+        listing = json.loads(request.content)['listing']
+        return httpx.Response(200, json={'summary': f"Listing {listing}"})
+
+    recorder = Recorder(str(path))
+    with httpx.Client(transport=RecordingTransport(recorder, httpx.MockTransport(handler))) as client:
+        responses = [client.post(URL, json=body).json() for body in requests]
+    recorder.close()
+    return responses
+
+
+def test_synthesized_listings_are_reproducible():
+    corpus = synthesize_listings(LISTINGS, 20, seed=7)
+
+    assert corpus == synthesize_listings(LISTINGS, 20, seed=7)
+    assert corpus != synthesize_listings(LISTINGS, 20, seed=8)
+    assert corpus[:2] == LISTINGS
+    assert len({listing['id'] for listing in corpus}) == 20
+
+
+def test_replay_serves_the_recorded_responses(tmp_path):
+    path = tmp_path / 'fixture.jsonl.gz'
+    requests = [{'listing': number, 'model': 'gpt-4o-mini'} for number in range(3)]
+    recorded = record_fixture(path, requests)
+    fixture = Fixture(str(path))
+
+    # Key order in the request body does not matter
+    with httpx.Client(transport=ReplayTransport(fixture, latency_scale=0)) as client:
+        replayed = [client.post(URL, json=dict(reversed(list(body.items())))).json() for body in requests]
+        unrecorded = client.post(URL, json={'listing': 99}).json()
+
+    async def replay_async():
+        async with httpx.AsyncClient(transport=AsyncReplayTransport(fixture, latency_scale=0)) as client:
+            return [(await client.post(URL, json=body)).json() for body in requests]
+
+    assert replayed == recorded
+    assert asyncio.run(replay_async()) == recorded
+    # Unrecorded requests get one of the endpoint's recorded responses
+    assert unrecorded in recorded
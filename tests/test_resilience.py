@@ -0,0 +1,51 @@
+"""Tests for async attempts under the circuit breaker and hedging."""
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from analyzer.resilience import CircuitOpenError, ResilientCaller
+
+
+def server_error():
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    response = httpx.Response(500, request=request)
+    return openai.InternalServerError("boom", response=response, body=None)
+
+
+def test_async_failures_open_the_circuit():
+    caller = ResilientCaller(failure_threshold=2, reset_timeout=60)
+
+    async def failing():
+        raise server_error()
+
+    async def run():
+        attempts = []
+        for attempt in range(2):
+            with pytest.raises(openai.InternalServerError):
+                await caller.attempt_async('gpt-4o-mini', failing, attempt, attempts)
+        with pytest.raises(CircuitOpenError):
+            await caller.attempt_async('gpt-4o-mini', failing, 2, attempts)
+        return attempts
+
+    attempts = asyncio.run(run())
+
+    assert [attempt['outcome'] for attempt in attempts] == ['error', 'error']
+
+
+def test_slow_async_calls_are_hedged():
+    caller = ResilientCaller(hedge=True, hedge_min_samples=1)
+    caller._record_latency('gpt-4o-mini', 0.01)
+    delays = [0.5, 0.0]
+
+    async def request():
+        await asyncio.sleep(delays.pop(0))
+        return 'response'
+
+    attempts = []
+    response = asyncio.run(caller.attempt_async('gpt-4o-mini', request, 0, attempts))
+
+    assert response == 'response'
+    assert [(attempt['hedged'], attempt['outcome']) for attempt in attempts] == [(True, 'success'), (False, 'abandoned')]
@@ -0,0 +1,60 @@
+"""Tests for latency- and health-aware model ranking."""
+
+import time
+
+from analyzer.clients import ModelRouter
+
+MODELS = ['o1', 'gpt-4o', 'gpt-4o-mini']
+
+
+def make_router(**kwargs):
+    kwargs.setdefault('probe_fraction', 0.0)
+    return ModelRouter(None, models=MODELS, **kwargs)
+
+
+def test_measured_models_rank_ahead_of_untried_ones():
+    router = make_router()
+    router.record('gpt-4o-mini', 1.0, True)
+
+    assert router.rank() == ['gpt-4o-mini', 'o1', 'gpt-4o']
+
+
+def test_untried_models_are_probed_with_a_share_of_requests():
+    router = make_router(probe_fraction=1.0)
+    router.record('gpt-4o-mini', 1.0, True)
+
+    assert router.rank()[0] in ('o1', 'gpt-4o')
+
+
+def test_models_rank_by_tail_latency():
+    router = make_router()
+    for _ in range(10):
+        router.record('gpt-4o', 1.0, True)
+        router.record('gpt-4o-mini', 1.5, True)
+    # gpt-4o has the lower median but the slower tail
+    for _ in range(5):
+        router.record('gpt-4o', 20.0, True)
+
+    assert router.rank()[:2] == ['gpt-4o-mini', 'gpt-4o']
+
+
+def test_last_latency_is_kept_after_samples_expire():
+    router = make_router(window_seconds=0.05)
+    router.record('o1', 30.0, True)
+    router.record('gpt-4o-mini', 2.0, True)
+    router.rank()
+
+    time.sleep(0.1)
+
+    assert router.stats('o1')['count'] == 0
+    assert router.stats('o1')['last_p95'] == 30.0
+    assert router.rank() == ['gpt-4o-mini', 'o1', 'gpt-4o']
+
+
+def test_unhealthy_models_rank_last():
+    router = make_router()
+    for _ in range(3):
+        router.record('gpt-4o-mini', 1.0, False)
+    router.record('o1', 10.0, True)
+
+    assert router.rank() == ['o1', 'gpt-4o', 'gpt-4o-mini']
@@ -0,0 +1,28 @@
+"""Tests for scoring analyzed listings."""
+
+from analyzer.scoring import add_highlight_flags, generate_investment_summary, score_listings
+
+WEIGHTS = {'seller_motivation_weight': 0.4, 'transaction_complexity_weight': 0.3,
+           'property_characteristics_weight': 0.3}
+
+
+def analyzed(score, failed=False):
+    listing = {category: {'score': score, 'factors': []}
+               for category in ('seller_motivation', 'transaction_complexity', 'property_characteristics')}
+    if failed:
+        listing['analysis_metadata'] = {'failed': True, 'error': 'timed out'}
+    return listing
+
+
+def test_listings_are_scored_by_weighted_category_scores():
+    listing = score_listings([analyzed(5)], WEIGHTS)[0]
+
+    assert listing['total_investment_score'] == 5.0
+
+
+def test_failed_analyses_are_not_scored():
+    listing = add_highlight_flags(score_listings([analyzed(0, failed=True)], WEIGHTS))[0]
+
+    assert listing['total_investment_score'] is None
+    assert listing['highlight'] is False
+    assert generate_investment_summary(listing) == "Analysis failed: timed out"
@@ -0,0 +1,52 @@
+"""Tests for analyzing only new and changed listings."""
+
+from utils.seen_index import analyze_incremental, open_seen_index
+
+
+def make_analyze(failed_ids=()):
+    calls = []
+
+    def analyze(listings):
+        calls.append([listing['id'] for listing in listings])
+        for listing in listings:
+            listing['total_score'] = 5
+            if listing['id'] in failed_ids:
+                listing['total_score'] = 0
+                listing['analysis_metadata'] = {'failed': True, 'error': 'timed out'}
+        return listings
+    return analyze, calls
+
+
+def run(index, listings, analyze):
+    return analyze_incremental([dict(listing) for listing in listings], analyze, version='v1', index=index)
+
+
+def test_unchanged_listings_keep_their_results(tmp_path):
+    index = open_seen_index({'path': str(tmp_path / 'seen.sqlite')})
+    listings = [{'id': 1, 'description': 'Vacant warehouse'}]
+    analyze, calls = make_analyze()
+
+    run(index, listings, analyze)
+    results = run(index, listings, analyze)
+
+    assert calls == [[1]]
+    assert results[0]['listing_status'] == 'unchanged'
+    assert results[0]['total_score'] == 5
+    index.close()
+
+
+def test_failed_analyses_are_retried_next_run(tmp_path):
+    index = open_seen_index({'path': str(tmp_path / 'seen.sqlite')})
+    listings = [{'id': 1, 'description': 'Vacant warehouse'}, {'id': 2, 'description': 'Retail strip'}]
+
+    analyze, calls = make_analyze(failed_ids={2})
+    run(index, listings, analyze)
+    assert calls == [[1, 2]]
+
+    analyze, calls = make_analyze()
+    results = run(index, listings, analyze)
+
+    assert calls == [[2]]
+    assert [result['listing_status'] for result in results] == ['unchanged', 'changed']
+    assert 'analysis_metadata' not in results[1]
+    index.close()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Deduplication Utilities
+
+This module finds near-duplicate listings before they are analyzed. The
+same listing is often returned by several searches, and brokers re-post
+near-identical descriptions. Each description is reduced to a MinHash
+signature over its word shingles; LSH banding buckets signatures that
+agree on a whole band, so only likely duplicates are compared and
+clustering runs in roughly linear time. One representative per cluster is
+analyzed and its results are copied to the other members whose address and
+price match the representative's, or whose text is long enough for the
+similarity to identify the property (short boilerplate such as "contact
+broker for details" is shared by unrelated listings). A NearDuplicateIndex
+keeps the representatives of earlier batches, so listings are deduplicated
+across a whole pipelined run rather than within each batch.
+"""
+
+import copy
+import re
+import zlib
+import logging
+import threading
+
+import numpy as np
+
+from analyzer.scoring import analysis_failed
+
+logger = logging.getLogger(__name__)
+
+# Listing fields whose text is compared
+DEFAULT_TEXT_FIELDS = ['description', 'brokerDescription', 'broker_description', 'details', 'title']
+
+WORD = re.compile(r'[a-z0-9]+')
+
+# Listing fields identifying the property, compared before results are shared
+ADDRESS_FIELDS = ['address', 'location']
+PRICE_FIELDS = ['price']
+
+# Shingles a text needs for text similarity alone to count as the same property
+DEFAULT_MIN_SHINGLES = 20
+
+def shingle_hashes(text, size=5):
+    """
+    Hash the word shingles of a text.
+
+    Args:
+        text (str): Text to shingle
+        size (int): Words per shingle
+
+    Returns:
+        numpy.ndarray: Unique 32-bit shingle hashes as uint64; empty for blank text
+    """
+    words = WORD.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+
+    # Texts shorter than one shingle are a single shingle
+    count = max(len(words) - size + 1, 1)
+    hashes = {zlib.crc32(" ".join(words[start:start + size]).encode('utf-8')) for start in range(count)}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+def choose_bands(num_perm, threshold):
+    """
+    Pick an LSH banding for a similarity threshold.
+
+    Banding b x r catches pairs above roughly (1 / b) ** (1 / r). The banding
+    chosen sits at least 0.1 below the threshold, so few true duplicates are
+    missed; candidates are verified against the threshold afterwards.
+
+    Args:
+        num_perm (int): Signature length
+        threshold (float): Jaccard similarity that counts as a duplicate
+
+    Returns:
+        tuple: (bands, rows) with bands * rows == num_perm
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold - 0.1:
+            best = (bands, rows)
+    return best
+
+
+class MinHasher:
+    """
+    MinHash signatures with multiply-shift hash functions.
+    """
+
+    def __init__(self, num_perm=128, seed=1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm (int): Number of hash functions, i.e. signature length
+            seed (int): Seed for the hash function parameters
+        """
+        rng = np.random.default_rng(seed)
+        # Odd multipliers; uint64 arithmetic wraps, and the top 32 bits are kept
+        self.multipliers = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self.offsets = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, hashes):
+        """
+        Compute the MinHash signature of a set of shingle hashes.
+
+        Args:
+            hashes (numpy.ndarray): Shingle hashes from shingle_hashes
+
+        Returns:
+            numpy.ndarray: uint64 signature of length num_perm, or None for an empty set
+        """
+        if hashes.size == 0:
+            return None
+        with np.errstate(over='ignore'):
+            values = (self.multipliers[:, None] * hashes[None, :] + self.offsets[:, None]) >> np.uint64(32)
+        return values.min(axis=1)
+
+
+def find_near_duplicates(texts, threshold=0.85, num_perm=128, bands=None, shingle_size=5, seed=1):
+    """
+    Cluster texts whose estimated Jaccard similarity reaches the threshold.
+
+    Within each LSH bucket every member is compared with the bucket's first
+    member only, which keeps the work linear even for large groups of exact
+    copies; clusters are the connected components of the matches.
+
+    Args:
+        texts (list): Texts to compare
+        threshold (float): Estimated Jaccard similarity that counts as a duplicate
+        num_perm (int): Signature length
+        bands (int, optional): LSH bands; chosen from the threshold if not given
+        shingle_size (int): Words per shingle
+        seed (int): Seed for the hash functions
+
+    Returns:
+        list: Clusters as lists of indices in ascending order, one per distinct
+            text; the first index is the cluster's representative
+    """
+    if bands is None:
+        bands, rows = choose_bands(num_perm, threshold)
+    else:
+        rows = num_perm // bands
+
+    hasher = MinHasher(num_perm, seed)
+    signatures = [hasher.signature(shingle_hashes(text or "", shingle_size)) for text in texts]
+
+    parents = list(range(len(texts)))
+
+    def find(index):
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    for band in range(bands):
+        buckets = {}
+        start = band * rows
+        for index, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            key = signature[start:start + rows].tobytes()
+            first = buckets.setdefault(key, index)
+            if first == index:
+                continue
+
+            root, other = find(index), find(first)
+            if root != other and np.mean(signature == signatures[first]) >= threshold:
+                parents[max(root, other)] = min(root, other)
+
+    clusters = {}
+    for index in range(len(texts)):
+        clusters.setdefault(find(index), []).append(index)
+    return sorted(clusters.values())
+
+def listing_text(listing, text_fields=None):
+    """
+    Get the text of a listing that near-duplicates are detected on.
+
+    Args:
+        listing (dict): Listing data
+        text_fields (list, optional): Fields to join. Defaults to DEFAULT_TEXT_FIELDS
+
+    Returns:
+        str: The fields' text joined by spaces
+    """
+    return " ".join(str(listing[field]) for field in text_fields or DEFAULT_TEXT_FIELDS if listing.get(field))
+
+def property_key(listing):
+    """
+    Get the normalized address and price of a listing.
+
+    Args:
+        listing (dict): Listing data
+
+    Returns:
+        tuple: (address, price) as lowercase words, or None without an address
+    """
+    def normalized(fields):
+        value = next((listing[field] for field in fields if listing.get(field)), None)
+        return " ".join(WORD.findall(str(value).lower())) if value is not None else None
+
+    address = normalized(ADDRESS_FIELDS)
+    if not address:
+        return None
+    return address, normalized(PRICE_FIELDS)
+
+def same_property(representative, listing, shingles, min_shingles=DEFAULT_MIN_SHINGLES):
+    """
+    Check that a near-duplicate really is the representative's property
+    before its results are shared.
+
+    Args:
+        representative (dict): Cluster representative
+        listing (dict): Listing clustered with it by text
+        shingles (int): Shingles in the shorter of the two texts
+        min_shingles (int): Shingles needed to trust the text alone
+
+    Returns:
+        bool: True if the address and price match, or neither listing has an
+            address and the text is long enough to identify the property
+    """
+    keys = property_key(representative), property_key(listing)
+    if keys[0] is not None and keys[1] is not None:
+        return keys[0] == keys[1]
+    return shingles >= min_shingles
+
+def confirm_clusters(listings, texts, clusters, dedup_config=None):
+    """
+    Split listings that only share text with their cluster's representative
+    into clusters of their own.
+
+    Args:
+        listings (list): Listings
+        texts (list): Their texts, as compared by find_near_duplicates
+        clusters (list): Clusters from find_near_duplicates
+        dedup_config (dict, optional): Deduplication configuration with
+            'shingle_size' and 'min_shingles'
+
+    Returns:
+        list: Clusters as lists of indices, representative first
+    """
+    dedup_config = dedup_config or {}
+    shingle_size = dedup_config.get('shingle_size', 5)
+    min_shingles = dedup_config.get('min_shingles', DEFAULT_MIN_SHINGLES)
+
+    confirmed = []
+    for cluster in clusters:
+        first = cluster[0]
+        kept = [first]
+        for index in cluster[1:]:
+            shingles = min(
+                len(shingle_hashes(texts[first], shingle_size)),
+                len(shingle_hashes(texts[index], shingle_size))
+            )
+            if same_property(listings[first], listings[index], shingles, min_shingles):
+                kept.append(index)
+            else:
+                confirmed.append([index])
+        confirmed.append(kept)
+    return sorted(confirmed)
+
+class NearDuplicateIndex:
+    """
+    Thread-safe index of the representatives analyzed so far in a run.
+
+    Listings are matched against every earlier representative through the
+    same LSH banding as find_near_duplicates. A listing matching none becomes
+    a representative itself; its analysis is published when its batch has
+    been analyzed, and batches holding its duplicates wait for it. Listings
+    are matched and registered a whole batch at a time, so a batch only ever
+    waits on batches that registered before it.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=128, shingle_size=5, min_shingles=DEFAULT_MIN_SHINGLES,
+                 text_fields=None, seed=1):
+        """
+        Initialize the index.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity that counts as a duplicate
+            num_perm (int): Signature length
+            shingle_size (int): Words per shingle
+            min_shingles (int): Shingles needed to trust the text alone
+            text_fields (list, optional): Listing fields compared. Defaults to DEFAULT_TEXT_FIELDS
+            seed (int): Seed for the hash functions
+        """
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.text_fields = text_fields
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self.hasher = MinHasher(num_perm, seed)
+
+        self._buckets = [{} for _ in range(self.bands)]
+        self._representatives = []
+        self._lock = threading.Lock()
+
+    def claim(self, listings):
+        """
+        Match a batch of listings against the representatives so far and
+        register the rest as new representatives.
+
+        Args:
+            listings (list): Listings of one batch
+
+        Returns:
+            list: One (entry, new) pair per listing: the representative it
+                belongs to and whether the listing is that representative.
+                Listings without text get (None, True)
+        """
+        hashes = [shingle_hashes(listing_text(listing, self.text_fields), self.shingle_size) for listing in listings]
+        signatures = [self.hasher.signature(shingles) for shingles in hashes]
+
+        matches = []
+        with self._lock:
+            for listing, shingles, signature in zip(listings, hashes, signatures):
+                if signature is None:
+                    matches.append((None, True))
+                    continue
+
+                keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+                candidates = sorted({
+                    position for band, key in enumerate(keys) for position in self._buckets[band].get(key, [])
+                })
+                match = next((
+                    self._representatives[position] for position in candidates
+                    if self._matches(self._representatives[position], listing, len(shingles), signature)
+                ), None)
+                if match is not None:
+                    matches.append((match, False))
+                    continue
+
+                entry = {
+                    'signature': signature,
+                    'shingles': len(shingles),
+                    'listing': {field: listing.get(field) for field in ADDRESS_FIELDS + PRICE_FIELDS},
+                    'origin': listing.get('id', listing.get('url')),
+                    'done': threading.Event(),
+                    'added': None
+                }
+                for band, key in enumerate(keys):
+                    self._buckets[band].setdefault(key, []).append(len(self._representatives))
+                self._representatives.append(entry)
+                matches.append((entry, True))
+        return matches
+
+    def _matches(self, entry, listing, shingles, signature):
+        """Check a listing against a candidate representative."""
+        if np.mean(signature == entry['signature']) < self.threshold:
+            return False
+        return same_property(entry['listing'], listing, min(shingles, entry['shingles']), self.min_shingles)
+
+    def publish(self, entry, added):
+        """
+        Publish the analysis of a representative to the batches waiting on it.
+
+        Args:
+            entry (dict): Representative from claim
+            added (dict): Fields the analysis added, or None if it failed
+        """
+        entry['added'] = added
+        entry['done'].set()
+
+    def wait(self, entry):
+        """
+        Wait for the analysis of a representative.
+
+        Args:
+            entry (dict): Representative from claim
+
+        Returns:
+            dict: Fields the analysis added, or None if it failed
+        """
+        entry['done'].wait()
+        return entry['added']
+
+
+def open_dedup_index(dedup_config=None):
+    """
+    Create the run-wide near-duplicate index described by a configuration.
+
+    Args:
+        dedup_config (dict, optional): Deduplication configuration, see analyze_unique
+
+    Returns:
+        NearDuplicateIndex: The index, or None if deduplication is disabled
+    """
+    dedup_config = dedup_config or {}
+    if not dedup_config.get('enabled', True):
+        return None
+    return NearDuplicateIndex(
+        threshold=dedup_config.get('threshold', 0.85),
+        num_perm=dedup_config.get('num_perm', 128),
+        shingle_size=dedup_config.get('shingle_size', 5),
+        min_shingles=dedup_config.get('min_shingles', DEFAULT_MIN_SHINGLES),
+        text_fields=dedup_config.get('text_fields')
+    )
+
+def analyze_unique(listings, analyze, dedup_config=None, index=None):
+    """
+    Analyze one representative per cluster of near-duplicate listings and
+    copy its analysis to the rest of the cluster.
+
+    Fields the analysis adds to a representative are deep-copied onto each
+    duplicate, which is also marked with 'duplicate_of' (the representative's
+    'id' or 'url', if it has one). Listings with similar text but a different
+    address or price, or too little text to tell, are analyzed on their own.
+
+    Args:
+        listings (list): Listings to analyze
+        analyze (callable): Takes a list of listings and returns them analyzed, in order
+        dedup_config (dict, optional): Deduplication configuration with 'enabled',
+            'threshold', 'num_perm', 'shingle_size', 'min_shingles' and 'text_fields'
+        index (NearDuplicateIndex, optional): Index shared by the batches of a
+            run, so duplicates of listings in other batches share their results;
+            its settings are used instead of dedup_config's
+
+    Returns:
+        list: All listings with analysis results, in input order
+    """
+    dedup_config = dedup_config or {}
+    if not dedup_config.get('enabled', True):
+        return analyze(listings)
+    if index is not None:
+        return _analyze_unique_indexed(listings, analyze, index)
+    if len(listings) < 2:
+        return analyze(listings)
+
+    texts = [listing_text(listing, dedup_config.get('text_fields')) for listing in listings]
+    clusters = find_near_duplicates(
+        texts,
+        threshold=dedup_config.get('threshold', 0.85),
+        num_perm=dedup_config.get('num_perm', 128),
+        shingle_size=dedup_config.get('shingle_size', 5)
+    )
+    clusters = confirm_clusters(listings, texts, clusters, dedup_config)
+
+    duplicates = len(listings) - len(clusters)
+    logger.info(
+        f"Found {duplicates} near-duplicate listings in {len(listings)}; "
+        f"analyzing {len(clusters)} representatives"
+    )
+    if not duplicates:
+        return analyze(listings)
+
+    representatives = [listings[cluster[0]] for cluster in clusters]
+    keys_before = [set(listing) for listing in representatives]
+    analyzed = analyze(representatives)
+
+    results = list(listings)
+    for cluster, representative, keys in zip(clusters, analyzed, keys_before):
+        results[cluster[0]] = representative
+        added = {key: value for key, value in representative.items() if key not in keys}
+        origin = representative.get('id', representative.get('url'))
+        for index in cluster[1:]:
+            listings[index].update(copy.deepcopy(added))
+            listings[index]['duplicate_of'] = origin
+
+    return results
+
+def _analyze_unique_indexed(listings, analyze, index):
+    """
+    Analyze the listings of one batch that no earlier batch covers.
+
+    Representatives in this batch are analyzed and published first, then the
+    batch waits for the representatives of its other duplicates. Duplicates
+    of a representative whose analysis failed are analyzed on their own.
+
+    Args:
+        listings (list): Listings of one batch
+        analyze (callable): Takes a list of listings and returns them analyzed, in order
+        index (NearDuplicateIndex): Index shared by the batches of the run
+
+    Returns:
+        list: All listings with analysis results, in input order
+    """
+    listings = list(listings)
+    matches = index.claim(listings)
+    own = [position for position, (entry, new) in enumerate(matches) if new]
+    results = list(listings)
+
+    try:
+        keys_before = [set(listings[position]) for position in own]
+        analyzed = analyze([listings[position] for position in own]) if own else []
+        for position, result, keys in zip(own, analyzed, keys_before):
+            results[position] = result
+            entry = matches[position][0]
+            if entry is not None:
+                added = {key: value for key, value in result.items() if key not in keys}
+                index.publish(entry, None if analysis_failed(result) else added)
+    finally:
+        # Never leave other batches waiting on representatives that weren't analyzed
+        for position in own:
+            entry = matches[position][0]
+            if entry is not None and not entry['done'].is_set():
+                index.publish(entry, None)
+
+    orphans = []
+    for position, (entry, new) in enumerate(matches):
+        if new:
+            continue
+        added = index.wait(entry)
+        if added is None:
+            orphans.append(position)
+            continue
+        listings[position].update(copy.deepcopy(added))
+        listings[position]['duplicate_of'] = entry['origin']
+
+    if orphans:
+        for position, result in zip(orphans, analyze([listings[position] for position in orphans])):
+            results[position] = result
+
+    duplicates = len(listings) - len(own) - len(orphans)
+    logger.info(
+        f"Found {duplicates} near-duplicate listings in a batch of {len(listings)}; "
+        f"analyzed {len(own) + len(orphans)}"
+    )
+    return results
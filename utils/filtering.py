@@ -3,7 +3,8 @@
 Filtering Utilities
 
 This module provides functions for filtering LoopNet listings based on
-geographic location and other criteria.
+geographic location and other criteria. The geography filter works on any
+iterable of listings and passes matching listings through unchanged.
 """
 
 import logging
@@ -11,58 +12,82 @@ import pandas as pd
 
 logger = logging.getLogger(__name__)
 
+def extract_state(address):
+    """
+    Extract the state abbreviation from an address ending in state and zip code.
+    
+    Args:
+        address (str): Address such as "123 Main St, Austin, TX 78701"
+        
+    Returns:
+        str: Upper-case two-letter state, or None if the address doesn't end that way
+    """
+    if not isinstance(address, str):
+        return None
+    
+    # Only the last two words matter: the state and the zip code
+    parts = address.rsplit(None, 2)
+    if len(parts) >= 2:
+        potential_state = parts[-2].rstrip(',')
+        if len(potential_state) == 2 and potential_state.isalpha():
+            return potential_state.upper()
+    return None
+
+def listing_state(listing):
+    """
+    Get the state a listing is in.
+    
+    Args:
+        listing (dict): Listing data
+        
+    Returns:
+        str: Upper-case state from the 'state' field, or from the address if
+            the state is missing or blank; None if neither gives one
+    """
+    state = listing.get('state')
+    if isinstance(state, str) and state.strip():
+        return state.strip().upper()
+    return extract_state(listing.get('address'))
+
+def iter_by_geography(listings, target_states):
+    """
+    Lazily yield the listings that are in target states.
+    
+    Listings are yielded as they are, without copying, so this can sit
+    between the scraper's iterator and the next stage.
+    
+    Args:
+        listings (iterable): Listings from LoopNet, e.g. LoopNetScraper.iter_listings
+        target_states (list): List of state abbreviations to include
+        
+    Yields:
+        dict: Listings in target states, in input order
+    """
+    # Convert target_states to uppercase for consistent matching
+    target_states = frozenset(state.upper() for state in target_states)
+    
+    for listing in listings:
+        if listing_state(listing) in target_states:
+            yield listing
+
 def filter_by_geography(listings, target_states):
     """
     Filter listings to include only those in target states.
     
+    Each listing's 'state' field is used if it has a non-blank one; otherwise
+    the state is taken from the end of its 'address'.
+    
     Args:
-        listings (list): List of listings from LoopNet
+        listings (iterable): Listings from LoopNet, e.g. LoopNetScraper.iter_listings
         target_states (list): List of state abbreviations to include
         
     Returns:
         list: Filtered list of listings
     """
     try:
-        logger.info(f"Filtering {len(listings)} listings to include only states: {', '.join(target_states)}")
-        
-        # Convert target_states to uppercase for consistent matching
-        target_states = [state.upper() for state in target_states]
-        
-        # Create a DataFrame for easier filtering
-        df = pd.DataFrame(listings)
-        
-        # Check if 'state' column exists
-        if 'state' in df.columns:
-            # Filter by state column
-            filtered_df = df[df['state'].str.upper().isin(target_states)]
-            
-        elif 'address' in df.columns:
-            # Extract state from address if no state column
-            # This assumes addresses end with state and zip code
-            logger.info("No 'state' column found, extracting state from address")
-            
-            def extract_state(address):
-                if not address or not isinstance(address, str):
-                    return None
-                
-                # Try to extract state from address
-                parts = address.strip().split()
-                if len(parts) >= 2:
-                    # Check if second-to-last part might be a state abbreviation
-                    potential_state = parts[-2].strip().upper().rstrip(',')
-                    if len(potential_state) == 2 and potential_state.isalpha():
-                        return potential_state
-                return None
-            
-            df['extracted_state'] = df['address'].apply(extract_state)
-            filtered_df = df[df['extracted_state'].isin(target_states)]
-            
-        else:
-            # If no state or address column, return empty DataFrame
-            logger.warning("No 'state' or 'address' column found for filtering")
-            return []
+        logger.info(f"Filtering listings to include only states: {', '.join(target_states)}")
         
-        filtered_listings = filtered_df.to_dict('records')
+        filtered_listings = list(iter_by_geography(listings, target_states))
         logger.info(f"Filtered to {len(filtered_listings)} listings in target states")
         
         return filtered_listings
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Pipeline Runner
+
+This module runs the deal finder's stages concurrently instead of one after
+another. Listings from a source iterator are grouped into batches and pass
+through a chain of stages connected by bounded queues; each stage has its
+own pool of worker threads. A full queue blocks the stage feeding it, so a
+slow stage throttles everything upstream (down to the scraper's dataset
+paging) and memory stays bounded by the queue sizes. End-to-end time
+approaches that of the slowest stage rather than the sum of all of them.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a queue's input
+_DONE = object()
+
+# Seconds between checks for a stopped pipeline while blocked on a queue
+_POLL_SECONDS = 0.1
+
+
+class Stage:
+    """
+    One step of a pipeline: a function from a batch of items to a batch of items.
+    """
+
+    def __init__(self, name, function=None, workers=1, worker_factory=None):
+        """
+        Initialize the stage.
+
+        Args:
+            name (str): Stage name for logs
+            function (callable, optional): Takes a list of items and returns a list
+                of items for the next stage (possibly fewer, e.g. when filtering)
+            workers (int): Worker threads running the function concurrently
+            worker_factory (callable, optional): Called once in each worker thread
+                to create that worker's function, for functions holding state
+                that must not be shared between threads, e.g. a loaded model
+        """
+        if function is None and worker_factory is None:
+            raise ValueError(f"Stage {name} needs a function or a worker_factory")
+        self.name = name
+        self.function = function
+        self.workers = max(int(workers), 1)
+        self.worker_factory = worker_factory
+
+        self.batches = 0
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.durations = []
+        self._lock = threading.Lock()
+
+    def record(self, items_in, items_out, seconds):
+        """Add one processed batch to the stage's totals."""
+        with self._lock:
+            self.batches += 1
+            self.items_in += items_in
+            self.items_out += items_out
+            self.busy_seconds += seconds
+            self.durations.append(seconds)
+
+
+class Pipeline:
+    """
+    Runs batches of items through stages connected by bounded queues.
+    """
+
+    def __init__(self, stages, batch_size=50, queue_size=4):
+        """
+        Initialize the pipeline.
+
+        Args:
+            stages (list): Stage objects in order
+            batch_size (int, optional): Items per batch; None puts the whole
+                input in one batch, which runs the stages one after another
+            queue_size (int): Batches buffered between two stages
+        """
+        self.stages = stages
+        self.batch_size = batch_size
+        self.queue_size = max(int(queue_size), 1)
+        self.elapsed = None
+        self._stop = threading.Event()
+        self._errors = []
+
+    def run(self, source):
+        """
+        Run every item of the source through the stages.
+
+        Args:
+            source (iterable): Input items; consumed lazily, as the first stage
+                has room for another batch
+
+        Returns:
+            list: Items from the last stage, in source order
+
+        Raises:
+            Exception: The first error raised by a stage or the source, after
+                the remaining workers have stopped
+        """
+        started = time.monotonic()
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        threads = [threading.Thread(target=self._feed, args=(source, queues[0]), name="pipeline-source", daemon=True)]
+        for position, stage in enumerate(self.stages):
+            # The last worker of a stage to finish passes the end marker on
+            remaining = {'workers': stage.workers, 'lock': threading.Lock()}
+            for number in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[position], queues[position + 1], remaining),
+                    name=f"pipeline-{stage.name}-{number}",
+                    daemon=True
+                ))
+
+        for thread in threads:
+            thread.start()
+
+        results = []
+        while True:
+            item = self._get(queues[-1])
+            if item is _DONE or item is None:
+                break
+            results.append(item)
+
+        # A failed run does not wait for the source, which may be blocked on a slow page
+        for thread in threads[1:] if self._errors else threads:
+            thread.join()
+
+        self.elapsed = time.monotonic() - started
+        if self._errors:
+            raise self._errors[0]
+
+        results.sort(key=lambda item: item[0])
+        return [output for _, batch in results for output in batch]
+
+    def summary(self):
+        """
+        Format per-stage totals for logs.
+
+        Returns:
+            str: One line per stage with batches, items in and out, busy time
+                and utilization over the run
+        """
+        lines = []
+        for stage in self.stages:
+            utilization = stage.busy_seconds / (self.elapsed * stage.workers) if self.elapsed else 0.0
+            lines.append(
+                f"{stage.name:<10} workers={stage.workers} batches={stage.batches} "
+                f"in={stage.items_in} out={stage.items_out} busy={stage.busy_seconds:.1f}s "
+                f"utilization={utilization:.0%}"
+            )
+        if self.elapsed is not None:
+            lines.append(f"total {self.elapsed:.1f}s")
+        return "\n".join(lines)
+
+    def _feed(self, source, output):
+        """Group source items into numbered batches and queue them."""
+        try:
+            batch = []
+            sequence = 0
+            for item in source:
+                if self._stop.is_set():
+                    break
+                batch.append(item)
+                if self.batch_size and len(batch) >= self.batch_size:
+                    if not self._put(output, (sequence, batch)):
+                        break
+                    sequence += 1
+                    batch = []
+            else:
+                if batch:
+                    self._put(output, (sequence, batch))
+        except Exception as e:
+            self._fail("source", e)
+        finally:
+            if self._stop.is_set() and hasattr(source, 'close'):
+                # Let generators clean up, e.g. abort actor runs still going
+                source.close()
+            self._put(output, _DONE)
+
+    def _work(self, stage, source, output, remaining):
+        """Run a stage's function on batches until the input ends."""
+        try:
+            function = stage.worker_factory() if stage.worker_factory else stage.function
+            while True:
+                item = self._get(source)
+                if item is None:
+                    return
+                if item is _DONE:
+                    # Let the stage's other workers see the end too
+                    self._put(source, _DONE)
+                    return
+
+                sequence, batch = item
+                started = time.monotonic()
+                processed = list(function(batch))
+                stage.record(len(batch), len(processed), time.monotonic() - started)
+
+                if processed and not self._put(output, (sequence, processed)):
+                    return
+        except Exception as e:
+            self._fail(stage.name, e)
+        finally:
+            with remaining['lock']:
+                remaining['workers'] -= 1
+                last = remaining['workers'] == 0
+            if last:
+                self._put(output, _DONE)
+
+    def _put(self, target, item):
+        """Queue an item, waiting for room; False if the pipeline stopped first."""
+        while True:
+            try:
+                target.put(item, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+
+    def _get(self, source):
+        """Take the next item, waiting for one; None if the pipeline stopped first."""
+        while True:
+            try:
+                return source.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+
+    def _fail(self, name, error):
+        """Record a stage error and stop the pipeline."""
+        logger.error(f"Pipeline stage {name} failed: {error}")
+        self._errors.append(error)
+        self._stop.set()
@@ -0,0 +1,528 @@
+#!/usr/bin/env python3
+"""
+Record and Replay Utilities
+
+This module captures the responses of the pipeline's external services into
+a fixture file and plays them back, so the whole pipeline can be benchmarked
+offline. Apify and gspread clients are wrapped in recording proxies; OpenAI
+traffic is recorded at the HTTP layer through httpx transports, which covers
+synchronous, asynchronous and streaming requests alike. On replay every call
+takes its recorded latency, optionally scaled, and synthetic corpora of any
+size are generated by mutating the recorded listings.
+
+A fixture is a gzip-compressed JSONL file with one event per call:
+service, method, timestamp, latency and service-specific fields.
+"""
+
+import re
+import gzip
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+import statistics
+
+import httpx
+
+from scraper.local import LocalApifyClient
+from utils.dedup import DEFAULT_TEXT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Response headers that no longer apply once a body has been read and decoded
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+# gspread methods returning objects whose calls are recorded too
+GSPREAD_WRAPPED = {'open_by_key', 'open', 'worksheet', 'add_worksheet'}
+
+# Apify client methods returning sub-clients
+APIFY_WRAPPED = {'actor', 'run', 'dataset'}
+
+# Run statuses after which an Apify run will not change
+TERMINAL_STATUSES = {'SUCCEEDED', 'FAILED', 'ABORTED', 'TIMED-OUT'}
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+
+class Recorder:
+    """
+    Appends call events to a fixture file; shared by all recording wrappers.
+    """
+
+    def __init__(self, path):
+        """
+        Open the fixture file.
+
+        Args:
+            path (str): gzip-compressed JSONL file to write
+        """
+        self.path = path
+        self.events = 0
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def record(self, service, method, latency, timestamp=None, **fields):
+        """
+        Write one event.
+
+        Args:
+            service (str): 'apify', 'openai' or 'gspread'
+            method (str): Method or HTTP request line called
+            latency (float): Seconds the call took
+            timestamp (float, optional): Wall time the call started
+            **fields: Service-specific data, e.g. results or response bodies
+        """
+        event = dict(fields, service=service, method=method, latency=latency,
+                     timestamp=timestamp if timestamp is not None else time.time() - latency)
+        line = json.dumps(event, default=str) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self.events += 1
+
+    def close(self):
+        """Flush and close the fixture file."""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+        logger.info(f"Recorded {self.events} calls to {self.path}")
+
+
+def _serialize(result):
+    """Convert a client result to JSON-compatible data."""
+    if hasattr(result, 'items') and hasattr(result, 'total') and not isinstance(result, dict):
+        # Apify ListPage
+        return {'items': result.items, 'offset': result.offset, 'count': result.count, 'total': result.total}
+    if hasattr(result, 'model_dump'):
+        return result.model_dump(mode='json', by_alias=True)
+    return result
+
+
+class RecordingProxy:
+    """
+    Wraps a client object, recording the latency of each method call.
+
+    Methods named in 'wrapped' return objects that are wrapped in turn
+    instead of being recorded, e.g. an Apify dataset client or a gspread
+    worksheet.
+    """
+
+    def __init__(self, target, service, recorder, wrapped=(), keep_results=False):
+        """
+        Initialize the proxy.
+
+        Args:
+            target: Object to wrap
+            service (str): Service name for the recorded events
+            recorder (Recorder): Where events are written
+            wrapped (set): Methods whose results are wrapped
+            keep_results (bool): Whether results are stored in the events
+        """
+        self._target = target
+        self._service = service
+        self._recorder = recorder
+        self._wrapped = set(wrapped)
+        self._keep_results = keep_results
+
+    def __getattr__(self, name):
+        attribute = getattr(self._target, name)
+        if not callable(attribute):
+            return attribute
+
+        def method(*args, **kwargs):
+            timestamp = time.time()
+            started = time.monotonic()
+            result = attribute(*args, **kwargs)
+            latency = time.monotonic() - started
+
+            if name in self._wrapped:
+                return RecordingProxy(result, self._service, self._recorder, self._wrapped, self._keep_results)
+
+            fields = {'result': _serialize(result)} if self._keep_results else {}
+            self._recorder.record(self._service, name, latency, timestamp=timestamp, **fields)
+            return result
+        return method
+
+
+def recording_apify_client(client, recorder):
+    """
+    Wrap an ApifyClient so runs and dataset pages are recorded.
+
+    Args:
+        client (ApifyClient): Real client
+        recorder (Recorder): Where events are written
+
+    Returns:
+        RecordingProxy: Client to pass to LoopNetScraper
+    """
+    return RecordingProxy(client, 'apify', recorder, APIFY_WRAPPED, keep_results=True)
+
+def recording_gspread_client(client, recorder):
+    """
+    Wrap an authorized gspread client so every sheet call's latency is recorded.
+
+    Args:
+        client (gspread.Client): Real client
+        recorder (Recorder): Where events are written
+
+    Returns:
+        RecordingProxy: Client to pass to update_google_sheet
+    """
+    return RecordingProxy(client, 'gspread', recorder, GSPREAD_WRAPPED)
+
+def _request_key(request):
+    """Key matching a request to its recorded response: method, path and canonical body."""
+    body = request.content.decode('utf-8', errors='replace') if request.content else ''
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True)
+    except ValueError:
+        pass
+    return hashlib.sha256(f"{request.method} {request.url.path}\n{body}".encode('utf-8')).hexdigest()
+
+def _recorded_response(response, body):
+    """Build a response from a read one, dropping headers about the original encoding."""
+    headers = [(key, value) for key, value in response.headers.items() if key.lower() not in DROPPED_HEADERS]
+    return httpx.Response(response.status_code, headers=headers, content=body)
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """
+    httpx transport recording each OpenAI request and response.
+    """
+
+    def __init__(self, recorder, transport=None):
+        """
+        Initialize the transport.
+
+        Args:
+            recorder (Recorder): Where events are written
+            transport (httpx.BaseTransport, optional): Transport making the real
+                requests; a default HTTPTransport if not given
+        """
+        self.recorder = recorder
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        timestamp = time.time()
+        started = time.monotonic()
+        response = self.transport.handle_request(request)
+        body = response.read()
+        response.close()
+        latency = time.monotonic() - started
+
+        self.recorder.record(
+            'openai', f"{request.method} {request.url.path}", latency, timestamp=timestamp,
+            key=_request_key(request), status=response.status_code,
+            headers=dict(response.headers), body=body.decode('utf-8', errors='replace')
+        )
+        return _recorded_response(response, body)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Asynchronous httpx transport recording each OpenAI request and response.
+    """
+
+    def __init__(self, recorder, transport=None):
+        """
+        Initialize the transport.
+
+        Args:
+            recorder (Recorder): Where events are written
+            transport (httpx.AsyncBaseTransport, optional): Transport making the
+                real requests; a default AsyncHTTPTransport if not given
+        """
+        self.recorder = recorder
+        self.transport = transport or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request):
+        timestamp = time.time()
+        started = time.monotonic()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        await response.aclose()
+        latency = time.monotonic() - started
+
+        self.recorder.record(
+            'openai', f"{request.method} {request.url.path}", latency, timestamp=timestamp,
+            key=_request_key(request), status=response.status_code,
+            headers=dict(response.headers), body=body.decode('utf-8', errors='replace')
+        )
+        return _recorded_response(response, body)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class Fixture:
+    """
+    Recorded calls loaded from a fixture file, indexed for replay.
+    """
+
+    def __init__(self, path):
+        """
+        Load a fixture.
+
+        Args:
+            path (str): File written by Recorder
+        """
+        self.path = path
+        self.listings = []
+        self.responses = {}
+        self.responses_by_request = {}
+        self._latencies = {}
+        run_starts = {}
+        run_durations = []
+
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                service, method = event['service'], event['method']
+                self._latencies.setdefault((service, method), []).append(event['latency'])
+
+                if service == 'openai':
+                    self.responses[event['key']] = event
+                    self.responses_by_request.setdefault(method, []).append(event)
+                elif service == 'apify':
+                    result = event.get('result') or {}
+                    if method == 'list_items':
+                        self.listings.extend(result.get('items', []))
+                    elif method == 'call':
+                        run_durations.append(event['latency'])
+                    elif method == 'start':
+                        run_starts[result.get('id')] = event['timestamp']
+                    elif method == 'get' and result.get('status') in TERMINAL_STATUSES and result.get('id') in run_starts:
+                        finished = event['timestamp'] + event['latency']
+                        run_durations.append(finished - run_starts.pop(result['id']))
+
+        self.run_duration = statistics.mean(run_durations) if run_durations else 0.0
+        logger.info(
+            f"Loaded fixture {path}: {len(self.listings)} listings, {len(self.responses)} OpenAI responses, "
+            f"{sum(len(values) for (service, _), values in self._latencies.items() if service == 'gspread')} sheet calls"
+        )
+
+    def latency(self, service, method, default=0.0):
+        """
+        Median recorded latency of a call.
+
+        Args:
+            service (str): Service name
+            method (str): Method name
+            default (float): Latency if the call was never recorded
+
+        Returns:
+            float: Seconds
+        """
+        values = self._latencies.get((service, method))
+        return statistics.median(values) if values else default
+
+    def response_for(self, request):
+        """
+        Find the recorded response for a request.
+
+        Requests that were not recorded, e.g. for synthetic listings, get one
+        of the responses recorded for the same endpoint, chosen from the
+        request's key so replays are deterministic.
+
+        Args:
+            request (httpx.Request): Request to answer
+
+        Returns:
+            dict: Recorded event, or None if the endpoint was never recorded
+        """
+        key = _request_key(request)
+        if key in self.responses:
+            return self.responses[key]
+        candidates = self.responses_by_request.get(f"{request.method} {request.url.path}")
+        if not candidates:
+            return None
+        return candidates[int(key, 16) % len(candidates)]
+
+
+def _replayed_response(fixture, request):
+    """Recorded response for a request and the seconds to delay it by."""
+    event = fixture.response_for(request)
+    if event is None:
+        return httpx.Response(404, json={'error': {'message': f"No recorded response for {request.url.path}"}}), 0.0
+    headers = [(key, value) for key, value in event['headers'].items() if key.lower() not in DROPPED_HEADERS]
+    return httpx.Response(event['status'], headers=headers, content=event['body'].encode('utf-8')), event['latency']
+
+
+class ReplayTransport(httpx.BaseTransport):
+    """
+    httpx transport answering requests from a fixture with their recorded latency.
+    """
+
+    def __init__(self, fixture, latency_scale=1.0):
+        """
+        Initialize the transport.
+
+        Args:
+            fixture (Fixture): Recorded calls
+            latency_scale (float): Multiplier for recorded latencies; 0 for none
+        """
+        self.fixture = fixture
+        self.latency_scale = latency_scale
+
+    def handle_request(self, request):
+        response, latency = _replayed_response(self.fixture, request)
+        if latency * self.latency_scale > 0:
+            time.sleep(latency * self.latency_scale)
+        return response
+
+
+class AsyncReplayTransport(httpx.AsyncBaseTransport):
+    """
+    Asynchronous httpx transport answering requests from a fixture.
+    """
+
+    def __init__(self, fixture, latency_scale=1.0):
+        """
+        Initialize the transport.
+
+        Args:
+            fixture (Fixture): Recorded calls
+            latency_scale (float): Multiplier for recorded latencies; 0 for none
+        """
+        self.fixture = fixture
+        self.latency_scale = latency_scale
+
+    async def handle_async_request(self, request):
+        response, latency = _replayed_response(self.fixture, request)
+        if latency * self.latency_scale > 0:
+            await asyncio.sleep(latency * self.latency_scale)
+        return response
+
+
+def replay_apify_client(fixture, listings=None, latency_scale=1.0):
+    """
+    Create an Apify client replaying a fixture's runs.
+
+    Args:
+        fixture (Fixture): Recorded calls
+        listings (list, optional): Listings runs return instead of the recorded
+            ones, e.g. from synthesize_listings
+        latency_scale (float): Multiplier for the recorded run and page latencies
+
+    Returns:
+        LocalApifyClient: Client to pass to LoopNetScraper
+    """
+    return LocalApifyClient(
+        items=fixture.listings if listings is None else listings,
+        duration=fixture.run_duration * latency_scale,
+        page_latency=fixture.latency('apify', 'list_items') * latency_scale
+    )
+
+
+class ReplayGspreadClient:
+    """
+    Stand-in for a gspread client, spreadsheet and worksheet at once.
+
+    Every method call takes the median latency recorded for that method.
+    """
+
+    def __init__(self, fixture, latency_scale=1.0):
+        """
+        Initialize the client.
+
+        Args:
+            fixture (Fixture): Recorded calls
+            latency_scale (float): Multiplier for recorded latencies; 0 for none
+        """
+        self.fixture = fixture
+        self.latency_scale = latency_scale
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def method(*args, **kwargs):
+            with self._lock:
+                self.calls[name] = self.calls.get(name, 0) + 1
+            latency = self.fixture.latency('gspread', name) * self.latency_scale
+            if latency > 0:
+                time.sleep(latency)
+            if name in GSPREAD_WRAPPED:
+                return self
+            if name == 'findall':
+                return []
+            return None
+        return method
+
+
+def synthesize_listings(listings, count, seed=0, text_fields=None):
+    """
+    Generate a corpus of any size from recorded listings.
+
+    The recorded listings come first, unchanged; the rest are copies with a
+    new ID and URL, a price within 15% of the original and description
+    sentences shuffled, one of them sometimes swapped for a sentence from
+    another listing.
+
+    Args:
+        listings (list): Recorded listings
+        count (int): Listings to generate
+        seed (int): Random seed, for reproducible corpora
+        text_fields (list, optional): Description fields to mutate. Defaults to
+            utils.dedup.DEFAULT_TEXT_FIELDS
+
+    Returns:
+        list: Generated listings
+    """
+    if not listings:
+        return []
+
+    rng = random.Random(seed)
+    text_fields = text_fields or DEFAULT_TEXT_FIELDS
+    sentences = [
+        sentence
+        for listing in listings
+        for field in text_fields
+        if isinstance(listing.get(field), str)
+        for sentence in SENTENCE_END.split(listing[field])
+        if sentence
+    ]
+
+    corpus = [dict(listing) for listing in listings[:count]]
+    for number in range(len(corpus), count):
+        listing = dict(listings[number % len(listings)])
+        origin = listing.get('id', listing.get('url', number % len(listings)))
+        listing['id'] = f"{origin}-synthetic-{number}"
+        if isinstance(listing.get('url'), str):
+            listing['url'] = f"{listing['url']}#synthetic-{number}"
+
+        listing['price'] = _scale_price(listing.get('price'), rng.uniform(0.85, 1.15))
+
+        for field in text_fields:
+            if isinstance(listing.get(field), str):
+                parts = [part for part in SENTENCE_END.split(listing[field]) if part]
+                rng.shuffle(parts)
+                if parts and sentences and rng.random() < 0.5:
+                    parts[rng.randrange(len(parts))] = rng.choice(sentences)
+                listing[field] = " ".join(parts)
+                break
+
+        corpus.append(listing)
+
+    return corpus
+
+def _scale_price(price, factor):
+    """Scale a numeric or formatted price such as "$1,250,000"; other values are kept."""
+    if isinstance(price, (int, float)) and not isinstance(price, bool):
+        return round(price * factor)
+    if isinstance(price, str):
+        match = NUMBER.search(price)
+        if match:
+            value = round(float(match.group().replace(',', '')) * factor)
+            return price[:match.start()] + f"{value:,}" + price[match.end():]
+    return price
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Seen-Listing Index
+
+This module remembers every listing scraped on earlier runs so each run only
+analyzes what actually changed. A SQLite table maps listing ID to a hash of
+the scraped content, the price, when the listing was first and last seen and
+the analysis results it was given. A Bloom filter built from the stored IDs
+sits in front of the table, so listings that were never seen skip the
+database lookup. After scraping, listings are classified as new, changed or
+unchanged; only new and changed ones are analyzed, and unchanged ones get
+their previous results back.
+"""
+
+import os
+import copy
+import math
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+from analyzer.scoring import analysis_failed
+
+logger = logging.getLogger(__name__)
+
+# Default location of the index database
+DEFAULT_INDEX_PATH = 'data/seen_listings.sqlite'
+
+# Fields that change between scrapes of an unchanged listing
+VOLATILE_FIELDS = {'scraped_at'}
+
+# Listing classifications
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+# IDs per SELECT ... IN query, below SQLite's variable limit
+LOOKUP_CHUNK = 500
+
+def listing_id(listing):
+    """
+    Get the ID a listing is tracked under.
+
+    Args:
+        listing (dict): Listing data
+
+    Returns:
+        str: The listing's 'id', or its 'url' if it has none; None if it has neither
+    """
+    key = listing.get('id', listing.get('url'))
+    return str(key) if key is not None else None
+
+def content_hash(listing, ignore_fields=None):
+    """
+    Hash the scraped content of a listing.
+
+    Args:
+        listing (dict): Listing data as scraped
+        ignore_fields (set, optional): Fields left out of the hash. Defaults to VOLATILE_FIELDS
+
+    Returns:
+        str: Hex digest of the listing's fields
+    """
+    ignore_fields = VOLATILE_FIELDS if ignore_fields is None else ignore_fields
+    content = {field: value for field, value in listing.items() if field not in ignore_fields}
+    encoded = json.dumps(content, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class BloomFilter:
+    """
+    Bloom filter over strings, sized for a capacity and false positive rate.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        """
+        Initialize an empty filter.
+
+        Args:
+            capacity (int): Number of items the error rate is sized for
+            error_rate (float): False positive rate at capacity
+        """
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        """Bit positions of an item, by double hashing one digest."""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, item):
+        """
+        Add an item.
+
+        Args:
+            item (str): Item to add
+        """
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        """Whether an item may have been added; False means it definitely was not."""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class SeenListingIndex:
+    """
+    SQLite-backed index of previously scraped listings, fronted by a Bloom filter.
+
+    One index can be shared by threads analyzing batches concurrently.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, bloom_capacity=100000, bloom_error_rate=0.001, retention_days=None):
+        """
+        Open (or create) the index and load its IDs into the Bloom filter.
+
+        Args:
+            path (str): SQLite database file
+            bloom_capacity (int): Listings the Bloom filter is sized for; grown to
+                twice the stored listings if that is larger
+            bloom_error_rate (float): Bloom filter false positive rate at capacity
+            retention_days (float, optional): Default age after which prune
+                forgets listings
+        """
+        self.path = path
+        self.retention_days = retention_days
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS seen_listings (
+                listing_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                price TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                version TEXT,
+                results TEXT
+            )
+            """
+        )
+        self._connection.commit()
+
+        stored = self._connection.execute("SELECT COUNT(*) FROM seen_listings").fetchone()[0]
+        self.bloom = BloomFilter(max(bloom_capacity, stored * 2), bloom_error_rate)
+        for (key,) in self._connection.execute("SELECT listing_id FROM seen_listings"):
+            self.bloom.add(key)
+
+        logger.info(f"Loaded seen-listing index with {stored} listings from {path}")
+
+    def lookup(self, keys):
+        """
+        Fetch the stored entries for listing IDs.
+
+        IDs the Bloom filter rules out are not looked up.
+
+        Args:
+            keys (list): Listing IDs
+
+        Returns:
+            dict: Listing ID -> dict with content_hash, price, first_seen,
+                last_seen, version and results, for IDs in the index
+        """
+        with self._lock:
+            candidates = [key for key in set(keys) if key in self.bloom]
+            rows = []
+            for start in range(0, len(candidates), LOOKUP_CHUNK):
+                chunk = candidates[start:start + LOOKUP_CHUNK]
+                rows.extend(self._connection.execute(
+                    "SELECT listing_id, content_hash, price, first_seen, last_seen, version, results "
+                    f"FROM seen_listings WHERE listing_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+
+        entries = {}
+        for key, digest, price, first_seen, last_seen, version, results in rows:
+            entries[key] = {
+                'content_hash': digest,
+                'price': price,
+                'first_seen': first_seen,
+                'last_seen': last_seen,
+                'version': version,
+                'results': json.loads(results) if results else None
+            }
+        return entries
+
+    def classify(self, listings, version=None):
+        """
+        Classify listings against the index.
+
+        A listing is unchanged only if its content hash and analysis version
+        match the stored ones and successful results were stored for it;
+        listings without an ID are always new.
+
+        Args:
+            listings (list): Listings as scraped
+            version (str, optional): Version of the analysis; results stored
+                under another version are not reused
+
+        Returns:
+            list: (status, entry) per listing, in order; entry is the stored
+                entry, or None for new listings
+        """
+        keys = [listing_id(listing) for listing in listings]
+        entries = self.lookup([key for key in keys if key is not None])
+
+        classified = []
+        for listing, key in zip(listings, keys):
+            entry = entries.get(key) if key is not None else None
+            if entry is None:
+                classified.append((NEW, None))
+            elif (entry['content_hash'] != content_hash(listing) or entry['version'] != version
+                  or entry['results'] is None or analysis_failed(entry['results'])):
+                classified.append((CHANGED, entry))
+            else:
+                classified.append((UNCHANGED, entry))
+        return classified
+
+    def record(self, entries):
+        """
+        Store listings analyzed on this run.
+
+        Args:
+            entries (list): (listing, results, version) tuples, where listing
+                is the listing as scraped and results the fields its analysis
+                added; empty and failed results are stored as missing, so the
+                listing is analyzed again next run
+        """
+        now = time.time()
+        rows = []
+        for listing, results, version in entries:
+            key = listing_id(listing)
+            if key is None:
+                continue
+            price = listing.get('price')
+            if results and analysis_failed(results):
+                results = None
+            rows.append((
+                key,
+                content_hash(listing),
+                str(price) if price is not None else None,
+                now,
+                now,
+                version,
+                json.dumps(results, default=str) if results else None
+            ))
+
+        with self._lock, self._connection:
+            for row in rows:
+                self.bloom.add(row[0])
+            self._connection.executemany(
+                """
+                INSERT INTO seen_listings (listing_id, content_hash, price, first_seen, last_seen, version, results)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (listing_id) DO UPDATE SET
+                    content_hash = excluded.content_hash,
+                    price = excluded.price,
+                    last_seen = excluded.last_seen,
+                    version = excluded.version,
+                    results = excluded.results
+                """,
+                rows
+            )
+
+    def touch(self, listings):
+        """
+        Update when unchanged listings were last seen.
+
+        Args:
+            listings (list): Listings seen again on this run
+        """
+        now = time.time()
+        keys = [(now, key) for key in map(listing_id, listings) if key is not None]
+        with self._lock, self._connection:
+            self._connection.executemany("UPDATE seen_listings SET last_seen = ? WHERE listing_id = ?", keys)
+
+    def prune(self, max_age_seconds=None):
+        """
+        Forget listings not seen for a while.
+
+        The Bloom filter keeps their IDs until the index is reopened, which
+        only costs an extra lookup.
+
+        Args:
+            max_age_seconds (float, optional): Listings last seen longer ago than
+                this are removed. Defaults to retention_days; nothing is
+                removed if neither is set
+
+        Returns:
+            int: Number of listings removed
+        """
+        if max_age_seconds is None:
+            if not self.retention_days:
+                return 0
+            max_age_seconds = self.retention_days * 86400
+
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "DELETE FROM seen_listings WHERE last_seen < ?", (time.time() - max_age_seconds,)
+            )
+        if cursor.rowcount:
+            logger.info(f"Removed {cursor.rowcount} listings not seen for {max_age_seconds / 86400:g} days from the index")
+        return cursor.rowcount
+
+    def close(self):
+        """Close the database connection."""
+        self._connection.close()
+
+
+def open_seen_index(seen_config=None):
+    """
+    Open the seen-listing index described by a configuration.
+
+    Args:
+        seen_config (dict, optional): Index configuration with 'enabled', 'path',
+            'bloom_capacity', 'bloom_error_rate' and 'retention_days'
+
+    Returns:
+        SeenListingIndex: The index, or None if it is disabled
+    """
+    seen_config = seen_config or {}
+    if not seen_config.get('enabled', True):
+        return None
+    return SeenListingIndex(
+        seen_config.get('path', DEFAULT_INDEX_PATH),
+        bloom_capacity=seen_config.get('bloom_capacity', 100000),
+        bloom_error_rate=seen_config.get('bloom_error_rate', 0.001),
+        retention_days=seen_config.get('retention_days')
+    )
+
+def analyze_incremental(listings, analyze, seen_config=None, version=None, index=None):
+    """
+    Analyze only new and changed listings, carrying results forward for the rest.
+
+    Fields the analysis adds to a listing are stored in the index. Unchanged
+    listings get a deep copy of their stored fields instead of being analyzed.
+    Every listing is marked with 'listing_status' ('new', 'changed' or
+    'unchanged').
+
+    Args:
+        listings (iterable): Listings as scraped
+        analyze (callable): Takes a list of listings and returns them analyzed, in order
+        seen_config (dict, optional): Index configuration, see open_seen_index
+        version (str, optional): Version of the analysis, e.g. a hash of its
+            configuration; stored results from another version are not reused
+        index (SeenListingIndex, optional): Open index to use, e.g. one shared by
+            the batches of a pipeline; the caller prunes and closes it. If not
+            given, the configured index is opened, pruned and closed
+
+    Returns:
+        list: All listings with analysis results, in input order
+    """
+    listings = list(listings)
+    owned = index is None
+    if owned:
+        index = open_seen_index(seen_config)
+        if index is None:
+            return analyze(listings)
+
+    try:
+        classified = index.classify(listings, version)
+        counts = {status: 0 for status in (NEW, CHANGED, UNCHANGED)}
+        for status, _ in classified:
+            counts[status] += 1
+        logger.info(
+            f"Seen-listing index: {counts[NEW]} new, {counts[CHANGED]} changed, "
+            f"{counts[UNCHANGED]} unchanged of {len(listings)} listings"
+        )
+
+        pending = [position for position, (status, _) in enumerate(classified) if status != UNCHANGED]
+        # Analyzers update listings in place, so keep the scraped fields for hashing
+        scraped = [dict(listings[position]) for position in pending]
+        analyzed = analyze([listings[position] for position in pending]) if pending else []
+
+        results = list(listings)
+        entries = []
+        for position, original, listing in zip(pending, scraped, analyzed):
+            results[position] = listing
+            added = {key: value for key, value in listing.items() if key not in original}
+            entries.append((original, added, version))
+
+        unchanged = []
+        for position, (status, entry) in enumerate(classified):
+            if status == UNCHANGED:
+                unchanged.append(results[position])
+                results[position].update(copy.deepcopy(entry['results']))
+            results[position]['listing_status'] = status
+
+        index.record(entries)
+        index.touch(unchanged)
+
+        if owned:
+            index.prune()
+    finally:
+        if owned:
+            index.close()
+
+    return results